@@ -0,0 +1,73 @@
+import time
+
+from django.conf import settings
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from reviews import versions
+
+# Поля пользователя, которых достаточно для проверки прав доступа.
+CLAIM_FIELDS = ("username", "role", "is_staff")
+
+
+def add_user_claims(token, user):
+    for field in CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    return token
+
+
+def load_deferred_fields(user):
+    """Загружает одним запросом поля, отложенные при аутентификации."""
+    deferred = user.get_deferred_fields()
+    if deferred:
+        user.refresh_from_db(fields=deferred)
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Строит пользователя из claims токена без запроса к БД: id, username,
+    role и is_staff загружены, остальные поля отложены и читаются из БД
+    при первом обращении.
+
+    Claims не используются, если токен старше JWT_CLAIMS_TTL секунд или
+    выдан до изменения пользователя (versions.revoke_claims), - тогда
+    пользователь, как и раньше, читается из БД.
+    """
+
+    def get_user(self, validated_token):
+        if not self.claims_trusted(validated_token):
+            return super().get_user(validated_token)
+        claims = {
+            api_settings.USER_ID_FIELD: validated_token[
+                api_settings.USER_ID_CLAIM
+            ],
+            # Деактивация отзывает claims, поэтому они есть только у
+            # активных пользователей.
+            "is_active": True,
+        }
+        claims.update(
+            (field, validated_token[field]) for field in CLAIM_FIELDS
+        )
+        # from_db ждёт значения в порядке полей модели.
+        field_names = [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in claims
+        ]
+        return self.user_model.from_db(
+            router.db_for_read(self.user_model),
+            field_names,
+            [claims[name] for name in field_names],
+        )
+
+    def claims_trusted(self, validated_token):
+        required = (api_settings.USER_ID_CLAIM, "iat", *CLAIM_FIELDS)
+        if any(claim not in validated_token for claim in required):
+            return False
+        issued_at = validated_token["iat"]
+        if time.time() - issued_at >= settings.JWT_CLAIMS_TTL:
+            return False
+        revoked_at = versions.get_claims_revoked_at(
+            validated_token[api_settings.USER_ID_CLAIM]
+        )
+        return revoked_at is None or revoked_at < issued_at
@@ -0,0 +1,156 @@
+"""Пакетное создание произведений и отзывов с итогом по каждому элементу."""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from reviews import aggregates, dictionaries, versions
+from reviews.models import CustomUser, GenreTitle, Review, Title
+from reviews.utils import bulk_create_returning
+
+from .serializers import ReviewBulkSerializer, TitleBulkSerializer
+
+
+def get_items(request):
+    items = request.data
+    if not isinstance(items, list) or not items:
+        raise ValidationError("Ожидается непустой JSON-массив.")
+    if len(items) > settings.API_BULK_MAX_ITEMS:
+        raise ValidationError(
+            f"Не больше {settings.API_BULK_MAX_ITEMS} элементов за запрос."
+        )
+    return items
+
+
+def validate_items(serializer, items):
+    """
+    Проверяет элементы одним экземпляром сериализатора, как это делает
+    ListSerializer, но не прерывается на первом невалидном элементе.
+    """
+    valid = []
+    failed = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, serializer.run_validation(item)))
+        except ValidationError as error:
+            failed.append(failure(index, error.detail))
+    return valid, failed
+
+
+def failure(index, errors):
+    return {"index": index, "status": "error", "errors": errors}
+
+
+def bulk_response(created, failed):
+    """201 - все элементы созданы, 207 - часть, 400 - ни одного."""
+    outcomes = sorted(
+        [
+            {"index": index, "status": "created", "id": obj.pk}
+            for index, obj in created
+        ] + failed,
+        key=lambda outcome: outcome["index"],
+    )
+    if not created:
+        response_status = status.HTTP_400_BAD_REQUEST
+    elif failed:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_201_CREATED
+    return Response(outcomes, status=response_status)
+
+
+def create_titles(items):
+    valid, failed = validate_items(TitleBulkSerializer(), items)
+    genres = {
+        slug: genre.pk for slug, genre in dictionaries.genres.by_slug(
+            {slug for _, data in valid for slug in data["genre"]}
+        ).items()
+    }
+    categories = {
+        slug: category.pk
+        for slug, category in dictionaries.categories.by_slug(
+            {data["category"] for _, data in valid}
+        ).items()
+    }
+
+    created = []
+    title_genres = []
+    for index, data in valid:
+        errors = {}
+        unknown = sorted(set(data["genre"]) - genres.keys())
+        if unknown:
+            errors["genre"] = [f"Жанры не найдены: {', '.join(unknown)}."]
+        if data["category"] not in categories:
+            errors["category"] = [
+                f"Категория не найдена: {data['category']}."
+            ]
+        if errors:
+            failed.append(failure(index, errors))
+            continue
+        title = Title(
+            name=data["name"],
+            year=data["year"],
+            description=data.get("description", ""),
+            category_id=categories[data["category"]],
+        )
+        created.append((index, title))
+        title_genres.append({genres[slug] for slug in data["genre"]})
+
+    if created:
+        with transaction.atomic():
+            bulk_create_returning(Title, [title for _, title in created])
+            GenreTitle.objects.bulk_create(
+                GenreTitle(title_id=title.pk, genre_id=genre_id)
+                for (_, title), genre_ids in zip(created, title_genres)
+                for genre_id in genre_ids
+            )
+            transaction.on_commit(lambda: versions.bump_version("titles"))
+    return bulk_response(created, failed)
+
+
+def create_reviews(title, items, default_author):
+    """Отзывы без поля author создаются от имени default_author."""
+    valid, failed = validate_items(ReviewBulkSerializer(), items)
+    authors = dict(CustomUser.objects.filter(
+        username__in={data["author"] for _, data in valid if "author" in data}
+    ).values_list("username", "pk"))
+    author_ids = {authors.get(data.get("author"), default_author.pk)
+                  for _, data in valid}
+    reviewed = set(Review.objects.filter(
+        title=title, author_id__in=author_ids
+    ).values_list("author_id", flat=True))
+
+    created = []
+    for index, data in valid:
+        if "author" in data and data["author"] not in authors:
+            failed.append(failure(index, {
+                "author": [f"Пользователь не найден: {data['author']}."]
+            }))
+            continue
+        author_id = authors.get(data.get("author"), default_author.pk)
+        if author_id in reviewed:
+            failed.append(failure(index, [
+                "Вы не можете добавить более одного отзыва на произведение"
+            ]))
+            continue
+        reviewed.add(author_id)
+        created.append((index, Review(
+            title=title, author_id=author_id,
+            text=data["text"], score=data["score"],
+        )))
+
+    if created:
+        reviews = [review for _, review in created]
+        try:
+            with transaction.atomic():
+                bulk_create_returning(Review, reviews)
+                aggregates.register_created_reviews(reviews)
+                transaction.on_commit(
+                    lambda: versions.bump_version("reviews", "titles")
+                )
+        except IntegrityError:
+            raise ValidationError(
+                "Отзыв одного из авторов появился во время загрузки, "
+                "повторите запрос."
+            )
+    return bulk_response(created, failed)
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class ResponseCache:
+    """
+    Ограниченный LRU-кэш данных ответов в памяти процесса.
+
+    Ключ включает версии ресурсов из reviews.versions, которые хранятся
+    в общем кэше Django: запись через любой процесс делает устаревшими
+    ключи во всех процессах, а старые записи вытесняются по LRU или TTL.
+    """
+
+    def __init__(self, enabled=True, max_entries=1000, timeout=300):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(request, versions):
+        return (versions, request.get_full_path())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, data):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+
+cache_settings = getattr(settings, "API_RESPONSE_CACHE", {})
+response_cache = ResponseCache(
+    enabled=cache_settings.get("ENABLED", True),
+    max_entries=cache_settings.get("MAX_ENTRIES", 1000),
+    timeout=cache_settings.get("TIMEOUT", 300),
+)
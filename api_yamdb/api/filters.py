@@ -1,13 +1,91 @@
-from django_filters import CharFilter, FilterSet, NumberFilter
-from reviews.models import Title
+from django.db.models import Subquery
+from django_filters import CharFilter, ChoiceFilter, FilterSet, NumberFilter
+from reviews.models import Category, Genre, GenreTitle, Title
+from reviews.search import search_titles
+
+# Значения ?ordering= и сортировки; каждую обслуживает индекс
+# произведений, id замыкает ключ для курсорной пагинации.
+TITLE_ORDERINGS = {
+    "name": ("name", "id"),
+    "-name": ("-name", "-id"),
+    "year": ("year", "id"),
+    "-year": ("-year", "-id"),
+    "rating": ("rating", "id"),
+    "-rating": ("-rating", "-id"),
+    "newest": ("-id",),
+}
+
+
+def split_slugs(value):
+    return [slug.strip() for slug in value.split(",") if slug.strip()]
 
 
 class TitleFilter(FilterSet):
-    category = CharFilter(field_name="category__slug", lookup_expr="icontains")
-    genre = CharFilter(field_name="genre__slug", lookup_expr="icontains")
+    """
+    Фильтры произведений. genre и category принимают один или несколько
+    slug через запятую; genre_mode=all оставляет произведения со всеми
+    перечисленными жанрами, по умолчанию достаточно одного.
+    """
+
+    category = CharFilter(method="filter_category")
+    genre = CharFilter(method="filter_genre")
+    genre_mode = ChoiceFilter(
+        choices=(("any", "any"), ("all", "all")), method="filter_noop"
+    )
     name = CharFilter(field_name="name", lookup_expr="icontains")
     year = NumberFilter(field_name="year")
+    search = CharFilter(method="filter_search")
+    ordering = ChoiceFilter(
+        choices=[(value, value) for value in TITLE_ORDERINGS],
+        method="filter_ordering",
+    )
 
     class Meta:
         model = Title
-        fields = ("category", "genre", "name", "year")
+        fields = ("category", "genre", "genre_mode", "name", "year", "search",
+                  "ordering")
+
+    def filter_category(self, queryset, name, value):
+        """
+        Сравнение с id категорий без соединения с таблицей категорий.
+        Одна категория сравнивается на равенство, чтобы страница читалась
+        по индексу (category_id, ...) уже в нужном порядке.
+        """
+        slugs = split_slugs(value)
+        categories = Category.objects.filter(slug__in=slugs)
+        if len(slugs) == 1:
+            return queryset.filter(
+                category_id=Subquery(categories.order_by().values("pk")[:1])
+            )
+        return queryset.filter(category_id__in=categories.values("pk"))
+
+    def filter_genre(self, queryset, name, value):
+        """
+        Полусоединение id IN (SELECT title_id ...) по индексу
+        (genre_id, title_id) таблицы GenreTitle: произведение попадает в
+        выборку один раз, сколько бы жанров ни совпало.
+        """
+        slugs = split_slugs(value)
+        if self.form.cleaned_data.get("genre_mode") == "all":
+            for slug in slugs:
+                queryset = queryset.filter(pk__in=self.genre_links([slug]))
+            return queryset
+        return queryset.filter(pk__in=self.genre_links(slugs))
+
+    @staticmethod
+    def genre_links(slugs):
+        return GenreTitle.objects.filter(
+            genre_id__in=Genre.objects.filter(slug__in=slugs).values("pk")
+        ).values("title_id")
+
+    def filter_noop(self, queryset, name, value):
+        """genre_mode учитывается в filter_genre."""
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию с ранжированием."""
+        return search_titles(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        """Явная сортировка заменяет и сортировку по релевантности."""
+        return queryset.order_by(*TITLE_ORDERINGS[value])
@@ -0,0 +1,424 @@
+"""
+Метрики запросов по именам маршрутов в текстовом формате Prometheus.
+
+Счётчики копятся в структурах своего потока без блокировок: запрос
+меняет только счётчики своего маршрута. Блокировка берётся при первом
+запросе потока, при завершении потока и при чтении метрик. Каждый
+процесс раз в METRICS_FLUSH_INTERVAL секунд сохраняет свои счётчики в
+METRICS_DIR фоновым потоком, и /metrics/ суммирует файлы всех
+процессов. Файл, который не обновлялся METRICS_STALE_AFTER секунд,
+оставил завершившийся процесс: его счётчики переносятся в общий файл
+завершившихся процессов, чтобы суммы не уменьшались.
+
+/metrics/ отвечает только на запросы с заголовком
+"Authorization: Bearer <METRICS_TOKEN>".
+"""
+import fcntl
+import hmac
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.fields import empty
+
+from .cache import response_cache
+
+# Верхние границы корзин гистограммы длительности запроса, секунды.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+UNMATCHED_ROUTE = "unmatched"
+PREFIX = "yamdb"
+RETIRED_FILE = "retired.json"
+LOCK_FILE = "metrics.lock"
+# Счётчики кэша ответов; остальные его значения - текущие размеры.
+CACHE_COUNTERS = ("hits", "misses", "evictions")
+
+
+class RouteStats:
+    __slots__ = ("requests", "duration", "buckets", "db_queries",
+                 "db_duration", "serializer_duration", "response_bytes")
+
+    def __init__(self):
+        self.requests = 0
+        self.duration = 0.0
+        # Последняя корзина - запросы дольше BUCKETS[-1].
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.db_queries = 0
+        self.db_duration = 0.0
+        self.serializer_duration = 0.0
+        self.response_bytes = 0
+
+    def to_list(self):
+        return [self.requests, self.duration, list(self.buckets),
+                self.db_queries, self.db_duration, self.serializer_duration,
+                self.response_bytes]
+
+    def merge_list(self, values):
+        (requests, duration, buckets, db_queries, db_duration,
+         serializer_duration, response_bytes) = values
+        self.requests += requests
+        self.duration += duration
+        for index, count in enumerate(buckets):
+            self.buckets[index] += count
+        self.db_queries += db_queries
+        self.db_duration += db_duration
+        self.serializer_duration += serializer_duration
+        self.response_bytes += response_bytes
+
+
+class RequestTimer(threading.local):
+    """Счётчики текущего запроса потока."""
+
+    active = False
+    db_queries = 0
+    db_duration = 0.0
+    serializer_duration = 0.0
+    serializer_depth = 0
+
+
+class Registry:
+    def __init__(self):
+        self._local = threading.local()
+        # Поток может завершиться и вызвать _retire из сборщика мусора,
+        # пока текущий поток держит блокировку.
+        self._lock = threading.RLock()
+        self._threads = []
+        # Счётчики завершившихся потоков.
+        self._retired = {}
+        self._pid = None
+        self._flusher_pid = None
+
+    @property
+    def process_id(self):
+        """Уникален и для процессов, созданных fork после импорта."""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._process_id = f"{self._pid}-{time.time_ns()}"
+        return self._process_id
+
+    def thread_routes(self):
+        routes = getattr(self._local, "routes", None)
+        if routes is None:
+            routes = self._local.routes = {}
+            with self._lock:
+                self._threads.append(routes)
+            weakref.finalize(threading.current_thread(), self._retire, routes)
+        return routes
+
+    def _retire(self, routes):
+        with self._lock:
+            self._threads.remove(routes)
+            merge(self._retired, snapshot_routes(routes))
+
+    def record(self, key, duration, timer, response_bytes):
+        routes = self.thread_routes()
+        stats = routes.get(key)
+        if stats is None:
+            stats = routes[key] = RouteStats()
+        stats.requests += 1
+        stats.duration += duration
+        stats.buckets[bisect_left(BUCKETS, duration)] += 1
+        stats.db_queries += timer.db_queries
+        stats.db_duration += timer.db_duration
+        stats.serializer_duration += timer.serializer_duration
+        stats.response_bytes += response_bytes
+
+    def snapshot(self):
+        """Счётчики процесса: {(маршрут, метод): список значений}."""
+        with self._lock:
+            threads = list(self._threads)
+            result = {key: list(values)
+                      for key, values in self._retired.items()}
+        for routes in threads:
+            merge(result, snapshot_routes(routes))
+        return result
+
+    def process_snapshot(self):
+        return {
+            "routes": [[*key, values]
+                       for key, values in self.snapshot().items()],
+            "cache": response_cache.stats(),
+            "mail_queue_depth": mail_queue_depth(),
+        }
+
+    def ensure_flusher(self):
+        """
+        Запускает поток, сохраняющий счётчики раз в METRICS_FLUSH_INTERVAL
+        секунд, в том числе пока процесс не получает запросов: иначе его
+        файл сочли бы оставленным. После fork поток запускается заново.
+        """
+        if not settings.METRICS_DIR or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(
+                target=self._flush_forever, name="metrics-flush", daemon=True
+            ).start()
+
+    def _flush_forever(self):
+        while settings.METRICS_DIR:
+            try:
+                self.flush()
+            except OSError:
+                pass
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+        self._flusher_pid = None
+
+    def flush(self):
+        """Атомарно перезаписывает файл счётчиков процесса."""
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"metrics-{self.process_id}.json"
+        temporary = path.with_suffix(f".{threading.get_ident()}.tmp")
+        temporary.write_text(json.dumps(self.process_snapshot()))
+        os.replace(temporary, path)
+
+    def collect(self):
+        """Снимки всех процессов: из METRICS_DIR или только текущего."""
+        if not settings.METRICS_DIR:
+            return [self.process_snapshot()]
+        self.flush()
+        directory = Path(settings.METRICS_DIR)
+        stale_before = time.time() - settings.METRICS_STALE_AFTER
+        for path in directory.glob("metrics-*.json"):
+            try:
+                if path.stat().st_mtime < stale_before:
+                    retire(directory, path)
+            except OSError:
+                continue
+        snapshots = []
+        for path in (directory / RETIRED_FILE,
+                     *directory.glob("metrics-*.json")):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+
+def retire(directory, path):
+    """
+    Переносит счётчики оставленного файла в RETIRED_FILE. Переименование
+    отдаёт файл только одному из параллельных чтений /metrics/, а запись
+    общего файла идёт под блокировкой.
+    """
+    claimed = path.with_suffix(f".{os.getpid()}.retiring")
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        return
+    with open(directory / LOCK_FILE, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        retired_path = directory / RETIRED_FILE
+        try:
+            retired = json.loads(retired_path.read_text())
+        except (OSError, ValueError):
+            retired = {"routes": [],
+                       "cache": dict.fromkeys(CACHE_COUNTERS, 0),
+                       "mail_queue_depth": 0}
+        try:
+            snapshot = json.loads(claimed.read_text())
+        except ValueError:
+            snapshot = {"routes": [], "cache": {}}
+        routes = {(route, method): values
+                  for route, method, values in retired["routes"]}
+        merge(routes, {(route, method): values
+                       for route, method, values in snapshot["routes"]})
+        retired["routes"] = [[*key, values]
+                             for key, values in routes.items()]
+        for name in CACHE_COUNTERS:
+            retired["cache"][name] += snapshot["cache"].get(name, 0)
+        temporary = retired_path.with_suffix(f".{os.getpid()}.tmp")
+        temporary.write_text(json.dumps(retired))
+        os.replace(temporary, retired_path)
+        claimed.unlink()
+
+
+def snapshot_routes(routes):
+    # list() копирует словарь целиком, пока поток-владелец не может
+    # добавить в него маршрут.
+    return {key: stats.to_list() for key, stats in list(routes.items())}
+
+
+def merge(target, source):
+    for key, values in source.items():
+        if key in target:
+            stats = RouteStats()
+            stats.merge_list(target[key])
+            stats.merge_list(values)
+            target[key] = stats.to_list()
+        else:
+            target[key] = values
+
+
+def mail_queue_depth():
+    from reviews.utils import mail_queue
+
+    return mail_queue.depth()
+
+
+registry = Registry()
+timer = RequestTimer()
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """Считает запросы и время БД текущего запроса потока."""
+    if not timer.active:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.db_duration += time.perf_counter() - started
+        timer.db_queries += 1
+
+
+def install_db_wrapper(sender, connection, **kwargs):
+    if db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_execute_wrapper)
+
+
+class MetricsSerializerMixin:
+    """
+    Учитывает время сериализации и проверки данных в метриках запроса.
+    Вложенные вызовы сериализаторов с этим миксином не считаются дважды.
+    """
+
+    def to_representation(self, instance):
+        return self._timed(super().to_representation, instance)
+
+    def run_validation(self, data=empty):
+        return self._timed(super().run_validation, data)
+
+    @staticmethod
+    def _timed(method, argument):
+        if not timer.active or timer.serializer_depth:
+            return method(argument)
+        timer.serializer_depth = 1
+        started = time.perf_counter()
+        try:
+            return method(argument)
+        finally:
+            timer.serializer_duration += time.perf_counter() - started
+            timer.serializer_depth = 0
+
+
+class MetricsMiddleware:
+    """Записывает метрики каждого запроса под именем его маршрута."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer.active = True
+        timer.db_queries = 0
+        timer.db_duration = 0.0
+        timer.serializer_duration = 0.0
+        timer.serializer_depth = 0
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timer.active = False
+        finished = time.perf_counter()
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else (
+            UNMATCHED_ROUTE
+        )
+        registry.record(
+            (route, request.method),
+            finished - started,
+            timer,
+            0 if response.streaming else len(response.content),
+        )
+        registry.ensure_flusher()
+        return response
+
+
+def render(snapshots):
+    routes = {}
+    cache = {}
+    mail_depth = 0
+    for snapshot in snapshots:
+        merge(routes, {
+            (route, method): values
+            for route, method, values in snapshot["routes"]
+        })
+        for name, value in snapshot["cache"].items():
+            cache[name] = cache.get(name, 0) + value
+        mail_depth += snapshot["mail_queue_depth"]
+
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+
+    def labels(route, method, **extra):
+        pairs = {"route": route, "method": method, **extra}
+        return ",".join(f'{key}="{value}"' for key, value in pairs.items())
+
+    family("http_request_duration_seconds", "histogram",
+           "Длительность обработки запроса.")
+    for (route, method), values in sorted(routes.items()):
+        cumulative = 0
+        for bound, count in zip((*BUCKETS, "+Inf"), values[2]):
+            cumulative += count
+            lines.append(
+                f"{PREFIX}_http_request_duration_seconds_bucket"
+                f"{{{labels(route, method, le=bound)}}} {cumulative}"
+            )
+        lines.append(f"{PREFIX}_http_request_duration_seconds_sum"
+                     f"{{{labels(route, method)}}} {values[1]}")
+        lines.append(f"{PREFIX}_http_request_duration_seconds_count"
+                     f"{{{labels(route, method)}}} {values[0]}")
+    for index, name, help_text in (
+        (0, "http_requests_total", "Количество запросов."),
+        (3, "db_queries_total", "Количество SQL-запросов."),
+        (4, "db_duration_seconds_total", "Время выполнения SQL-запросов."),
+        (5, "serializer_duration_seconds_total",
+         "Время сериализации и проверки данных."),
+        (6, "response_size_bytes_total", "Размер тел ответов."),
+    ):
+        family(name, "counter", help_text)
+        for (route, method), values in sorted(routes.items()):
+            lines.append(f"{PREFIX}_{name}{{{labels(route, method)}}} "
+                         f"{values[index]}")
+
+    for name in ("hits", "misses", "evictions"):
+        family(f"response_cache_{name}_total", "counter",
+               f"Кэш ответов: {name}.")
+        lines.append(f"{PREFIX}_response_cache_{name}_total {cache[name]}")
+    family("response_cache_entries", "gauge", "Записей в кэше ответов.")
+    lines.append(f"{PREFIX}_response_cache_entries {cache['entries']}")
+    family("mail_queue_depth", "gauge", "Писем в очереди на отправку.")
+    lines.append(f"{PREFIX}_mail_queue_depth {mail_depth}")
+    return "\n".join(lines) + "\n"
+
+
+def is_authorized(request):
+    """Без METRICS_TOKEN метрики закрыты для всех."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        return False
+    expected = f"Bearer {token}"
+    return hmac.compare_digest(
+        request.META.get("HTTP_AUTHORIZATION", "").encode(),
+        expected.encode(),
+    )
+
+
+def metrics_view(request):
+    if not is_authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render(registry.collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
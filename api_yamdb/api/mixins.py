@@ -1,7 +1,18 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import mixins
+from rest_framework import mixins, status
 from rest_framework.exceptions import MethodNotAllowed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
+from reviews.versions import get_last_modified, get_versions
+
+from . import replica
+from .cache import response_cache
 
 
 class PatchModelMixin(mixins.UpdateModelMixin):
@@ -31,3 +42,148 @@ class ListCreateDestroyMixin(
     GenericViewSet
 ):
     pass
+
+
+class CachedListMixin:
+    """
+    Условные GET и кэш ответов на list-запросы.
+
+    cache_resources - ресурсы reviews.versions, от которых зависит ответ.
+    Их версии служат ETag, а время изменения - Last-Modified, поэтому
+    ответ 304 на список отдаётся без обращения к БД и сериализации; для
+    объекта и вложенного списка проверяется только существование объекта
+    и родителя. Ответы анонимам дополнительно кэшируются; запросы с
+    аутентификацией обходят кэш. Пока реплика может не знать о последнем
+    изменении ресурсов, прочитанный с неё ответ не сохраняется в кэш и
+    отдаётся без ETag и Last-Modified: иначе под новой версией оказались
+    бы старые данные.
+    """
+
+    cache_resources = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.cache_resources:
+            return handler(request, *args, **kwargs)
+        resource_versions = get_versions(self.cache_resources)
+        etag = quote_etag("-".join(map(str, resource_versions)))
+        last_modified = get_last_modified(self.cache_resources)
+        lagging = (replica.reads_from_replica()
+                   and replica.may_lag(last_modified))
+        if is_conditional(request):
+            self.check_conditional_target()
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response, hit = self.cache_or_handle(
+            handler, request, resource_versions, not lagging,
+            *args, **kwargs
+        )
+        if response.status_code != status.HTTP_200_OK or (
+            lagging and not hit
+        ):
+            return response
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def cache_or_handle(self, handler, request, resource_versions, store,
+                        *args, **kwargs):
+        """
+        Ответ анониму из кэша или от handler; store - сохранять ли ответ
+        handler в кэш. Возвращает ответ и признак попадания в кэш.
+        """
+        if not response_cache.enabled or request.user.is_authenticated:
+            return handler(request, *args, **kwargs), False
+        key = response_cache.make_key(request, resource_versions)
+        data = response_cache.get(key)
+        if data is not None:
+            return Response(data, headers={"X-Cache": "HIT"}), True
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            if store:
+                response_cache.set(key, response.data)
+            response["X-Cache"] = "MISS"
+        return response, False
+
+    def check_conditional_target(self):
+        """
+        Версии ресурсов не говорят, существует ли объект детального
+        маршрута и родитель вложенного, поэтому перед ответом 304 они
+        проверяются в БД: удалённый объект получает 404.
+        """
+        if hasattr(self, "get_parent"):
+            self.get_parent()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg not in self.kwargs:
+            return
+        try:
+            found = self.get_queryset().filter(**{
+                self.lookup_field: self.kwargs[lookup_url_kwarg]
+            }).exists()
+        except (TypeError, ValueError, DjangoValidationError):
+            found = False
+        if not found:
+            raise Http404
+
+
+def is_conditional(request):
+    return any(
+        header in request.META
+        for header in ("HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE")
+    )
+
+
+class CachedListRetrieveMixin(CachedListMixin):
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ReplicaReadMixin:
+    """
+    Безопасные запросы читают с реплики БД, если пользователь недавно не
+    менял данные; после успешной записи он читает из основной БД.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        replica.use_replica(
+            request.method in SAFE_METHODS
+            and not replica.is_sticky(request.user)
+        )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica.use_replica(False)
+        if (request.method not in SAFE_METHODS
+                and status.is_success(response.status_code)
+                and request.user.is_authenticated):
+            replica.stick_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ParentObjectMixin:
+    """
+    Родительский объект вложенного маршрута, загруженный один раз за
+    запрос. parent_lookups - поля родителя и имена параметров URL;
+    несколько полей проверяются одним запросом, например что отзыв
+    относится к произведению из URL. Сериализаторы и разрешения получают
+    родителя через view.get_parent().
+    """
+
+    parent_queryset = None
+    parent_lookups = {}
+
+    def get_parent(self):
+        if not hasattr(self, "_parent"):
+            self._parent = get_object_or_404(self.parent_queryset, **{
+                field: self.kwargs.get(kwarg)
+                for field, kwarg in self.parent_lookups.items()
+            })
+        return self._parent
@@ -0,0 +1,237 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу сортировки без COUNT(*) и OFFSET.
+
+    Ключом служит сортировка queryset (или Meta.ordering модели),
+    дополненная первичным ключом, поэтому позиция курсора не сдвигается
+    при конкурентных вставках. NULL в полях сортировки считается меньше
+    любого значения (как в SQLite): в курсоре он хранится как null, а
+    порядок NULL задаётся в запросе явно и не зависит от СУБД. Строки с
+    NULL после курсора выбираются отдельным запросом, только если
+    страница не заполнилась.
+    """
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        self.fields = [
+            self.get_field(queryset.model, field.lstrip("-"))
+            for field in self.ordering
+        ]
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.flip(field) for field in ordering]
+        queryset = queryset.order_by(*(
+            self.order_expression(field, model_field)
+            for field, model_field in zip(ordering, self.fields)
+        ))
+        phases = [queryset]
+        if position is not None:
+            phases = [
+                queryset.filter(condition)
+                for condition in self.after(ordering, position)
+            ]
+
+        results = []
+        for phase in phases:
+            results += phase[:self.page_size + 1 - len(results)]
+            if len(results) > self.page_size:
+                break
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = has_more if reverse else position is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_ordering(self, queryset):
+        ordering = list(
+            queryset.query.order_by or queryset.model._meta.ordering
+        )
+        if not all(isinstance(field, str) for field in ordering):
+            raise ImproperlyConfigured(
+                "KeysetPagination поддерживает сортировку только по полям."
+            )
+        field_names = {"pk"} | {
+            field.name for field in queryset.model._meta.concrete_fields
+        }
+        if any(field.lstrip("-") not in field_names for field in ordering):
+            # Например, сортировка по релевантности полнотекстового поиска.
+            raise ValidationError({
+                "pagination": "Курсорная пагинация недоступна "
+                              "для этой сортировки.",
+            })
+        pk_name = queryset.model._meta.pk.name
+        if not any(field.lstrip("-") in ("pk", pk_name) for field in ordering):
+            descending = bool(ordering) and ordering[-1].startswith("-")
+            ordering.append(f"-{pk_name}" if descending else pk_name)
+        return ordering
+
+    @staticmethod
+    def get_field(model, name):
+        return model._meta.pk if name == "pk" else model._meta.get_field(name)
+
+    @staticmethod
+    def flip(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def order_expression(field, model_field):
+        if not model_field.null:
+            return field
+        if field.startswith("-"):
+            return F(field[1:]).desc(nulls_last=True)
+        return F(field).asc(nulls_first=True)
+
+    def after(self, ordering, position):
+        """
+        Условия «строго после позиции» для составного ключа в порядке
+        сортировки. Строки с NULL выбираются отдельным условием после
+        остальных: OR с IS NULL не даёт SQLite искать диапазон по индексу.
+        """
+        terms = []
+        equal = Q()
+        for field, model_field, value in zip(ordering, self.fields,
+                                             position):
+            name = field.lstrip("-")
+            descending = field.startswith("-")
+            field_terms = []
+            if value is None:
+                # После NULL по возрастанию идут все значения, по
+                # убыванию - ничего.
+                if not descending:
+                    field_terms.append(
+                        (equal & Q(**{f"{name}__isnull": False}), True)
+                    )
+                equal &= Q(**{f"{name}__isnull": True})
+            else:
+                lookup = "lt" if descending else "gt"
+                field_terms.append(
+                    (equal & Q(**{f"{name}__{lookup}": value}), False)
+                )
+                if descending and model_field.null:
+                    field_terms.append(
+                        (equal & Q(**{f"{name}__isnull": True}), True)
+                    )
+                equal &= Q(**{name: value})
+            # Строки, совпадающие по этому полю, идут раньше.
+            terms[:0] = field_terms
+
+        conditions = []
+        for condition, separate in terms:
+            if conditions and not separate and not conditions[-1][1]:
+                conditions[-1][0] |= condition
+            else:
+                conditions.append([condition, separate])
+        return [condition for condition, _ in conditions]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = cursor["p"]
+            reverse = bool(cursor.get("r"))
+            if not isinstance(values, list) or len(values) != len(
+                self.fields
+            ):
+                raise ValueError
+            # Курсор приходит от клиента: значения приводятся к типам
+            # полей сортировки, чтобы ошибка не дошла до запроса к БД.
+            position = [
+                self.field_value(field, value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, KeyError, binascii.Error,
+                DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def field_value(field, value):
+        if value is None and field.null:
+            return None
+        if value is None or isinstance(value, (list, dict)):
+            raise ValueError
+        return field.to_python(value)
+
+    def encode_cursor(self, obj, reverse):
+        position = []
+        for model_field in self.fields:
+            value = model_field.value_from_object(obj)
+            position.append(
+                value if value is None or isinstance(value, (int, float))
+                else model_field.value_to_string(obj)
+            )
+        cursor = {"p": position}
+        if reverse:
+            cursor["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(cursor, separators=(",", ":")).encode()
+        ).decode()
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+
+class YamdbPagination(PageNumberPagination):
+    """
+    Постраничная пагинация по умолчанию; параметр ?pagination=cursor
+    включает KeysetPagination для того же эндпоинта.
+    """
+
+    pagination_query_param = "pagination"
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if request.query_params.get(self.pagination_query_param) == "cursor":
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
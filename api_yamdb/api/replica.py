@@ -0,0 +1,74 @@
+"""
+Чтение с реплики БД.
+
+Вьюсеты с ReplicaReadMixin на время безопасного запроса включают флаг
+потока, по которому ReplicaRouter направляет чтения на реплику. Запись
+всегда идёт в основную БД. Реплика считается отстающей не больше чем на
+DATABASE_REPLICA_STICKY_SECONDS секунд: столько после успешной записи
+пользователь читает из основной БД, чтобы видеть свои изменения.
+Остальные читают с реплики и в это окно, но после изменения ресурса
+прочитанные с реплики ответы не попадают в кэш ответов и не получают
+ETag новой версии.
+Привязка пользователя хранится в общем кэше и видна всем процессам.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_KEY = "replica-sticky:{}"
+
+_state = threading.local()
+
+
+def use_replica(enabled):
+    _state.use_replica = enabled
+
+
+def replica_enabled():
+    return getattr(_state, "use_replica", False)
+
+
+def reads_from_replica():
+    return bool(settings.DATABASE_REPLICA_ALIAS) and replica_enabled()
+
+
+def stick_to_primary(user):
+    cache.set(
+        STICKY_KEY.format(user.pk),
+        True,
+        timeout=settings.DATABASE_REPLICA_STICKY_SECONDS,
+    )
+
+
+def is_sticky(user):
+    return user.is_authenticated and cache.get(STICKY_KEY.format(user.pk),
+                                               False)
+
+
+def may_lag(modified_at):
+    """
+    Изменение, отмеченное в modified_at (unix time с точностью до
+    секунды), могло ещё не дойти до реплики.
+    """
+    return (time.time() - modified_at
+            < settings.DATABASE_REPLICA_STICKY_SECONDS + 1)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reads_from_replica():
+            return settings.DATABASE_REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Без явного ответа Django пишет в БД, из которой прочитан объект.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, settings.DATABASE_REPLICA_ALIAS}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
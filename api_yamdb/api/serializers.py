@@ -1,16 +1,22 @@
+from django.conf import settings
 from django.core.validators import RegexValidator
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import NotFound, ValidationError
-from rest_framework.generics import get_object_or_404
 from rest_framework.validators import UniqueValidator
 from rest_framework_simplejwt.serializers import TokenObtainSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Comment, CustomUser, Genre, Review, Title
+from reviews import dictionaries
+from reviews.models import (Category, Comment, CustomUser, Genre, GenreTitle,
+                            Review, Title)
 from reviews.utils import Util
 
 from api_yamdb.settings import USERNAME_REGEX
 
+from .authentication import add_user_claims
+from .metrics import MetricsSerializerMixin
+
 
 class CustomTokenObtainSerializer(TokenObtainSerializer):
     """Получение токена по username и confirmation_code."""
@@ -24,7 +30,7 @@ class CustomTokenObtainSerializer(TokenObtainSerializer):
 
     @classmethod
     def get_token(cls, user):
-        return RefreshToken.for_user(user)
+        return add_user_claims(RefreshToken.for_user(user), user)
 
     def validate(self, attrs):
         user = CustomUser.objects.filter(
@@ -52,11 +58,12 @@ class CustomTokenObtainSerializer(TokenObtainSerializer):
         self.user = user
 
         user.last_login = timezone.now()
-        user.save()
+        user.save(update_fields=("last_login",))
         return {"token": str(self.get_token(self.user).access_token)}
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(MetricsSerializerMixin,
+                           serializers.ModelSerializer):
     """Сериализатор кастомного юзера, исключение пароля."""
 
     email = serializers.EmailField(
@@ -160,7 +167,7 @@ class RegisterSerializer(CustomUserSerializer):
         return user
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(MetricsSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для категорий."""
 
     class Meta:
@@ -169,7 +176,7 @@ class CategorySerializer(serializers.ModelSerializer):
         lookup_field = "name"
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(MetricsSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для жанров."""
 
     class Meta:
@@ -178,41 +185,225 @@ class GenreSerializer(serializers.ModelSerializer):
         lookup_field = "name"
 
 
-class TitleSafeSerializer(serializers.ModelSerializer):
+def dictionary_snapshot(field, slug_cache):
+    """
+    Снимок справочника, общий для всех полей корневого сериализатора:
+    страница произведений читает версию жанров и категорий один раз.
+    """
+    snapshots = field.context.setdefault("dictionary_snapshots", {})
+    if slug_cache.resource not in snapshots:
+        snapshots[slug_cache.resource] = slug_cache.snapshot()
+    return snapshots[slug_cache.resource]
+
+
+class DictionarySlugField(serializers.SlugRelatedField):
+    """Жанр или категория по slug из reviews.dictionaries, без запроса."""
+
+    def __init__(self, slug_cache, **kwargs):
+        self.slug_cache = slug_cache
+        kwargs.setdefault("queryset", slug_cache.model.objects.all())
+        super().__init__(slug_field="slug", **kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        kwargs.pop("many", None)
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in serializers.MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return DictionarySlugListField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail("invalid")
+        obj = dictionary_snapshot(self, self.slug_cache).by_slug(
+            [data]
+        ).get(data)
+        if obj is None:
+            self.fail("does_not_exist", slug_name="slug", value=data)
+        return obj
+
+
+class DictionarySlugListField(serializers.ManyRelatedField):
+    """Список slug, найденных одним обращением к reviews.dictionaries."""
+
+    default_error_messages = {
+        "does_not_exist": "{objects} не найдены: {slugs}.",
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        if not all(isinstance(slug, str) for slug in data):
+            self.child_relation.fail("invalid")
+        slugs = list(dict.fromkeys(data))
+        slug_cache = self.child_relation.slug_cache
+        found = dictionary_snapshot(self, slug_cache).by_slug(slugs)
+        unknown = [slug for slug in slugs if slug not in found]
+        if unknown:
+            self.fail(
+                "does_not_exist",
+                objects=slug_cache.model._meta.verbose_name_plural,
+                slugs=", ".join(unknown),
+            )
+        return [found[slug] for slug in slugs]
+
+
+class DictionaryField(serializers.Field):
+    """
+    Жанры или категория произведения из reviews.dictionaries по id
+    вместо соединения с их таблицами. Для жанров source - связи
+    произведения с жанрами, их id выбираются prefetch_related.
+    """
+
+    def __init__(self, slug_cache, serializer_class, many=False, **kwargs):
+        self.slug_cache = slug_cache
+        self.serializer = serializer_class()
+        self.many = many
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        snapshot = dictionary_snapshot(self, self.slug_cache)
+        if not self.many:
+            obj = None if value is None else snapshot.by_pk([value]).get(
+                value
+            )
+            return None if obj is None else self.serializer.to_representation(
+                obj
+            )
+        objects = snapshot.by_pk([link.genre_id for link in value.all()])
+        return [
+            self.serializer.to_representation(obj)
+            for obj in sorted(objects.values(),
+                              key=lambda obj: (obj.name, obj.pk))
+        ]
+
+
+class TitleSafeSerializer(MetricsSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для произведений при безопасных запросах."""
 
-    category = CategorySerializer(read_only=True)
-    genre = GenreSerializer(read_only=True, many=True)
+    category = DictionaryField(
+        dictionaries.categories, CategorySerializer, source="category_id"
+    )
+    genre = DictionaryField(
+        dictionaries.genres, GenreSerializer, many=True,
+        source="genretitle_set",
+    )
     rating = serializers.IntegerField(read_only=True)
+    reviews_count = serializers.IntegerField(
+        source="rating_count", read_only=True
+    )
 
     class Meta:
         fields = (
             "id", "name", "year", "description", "genre", "category", "rating",
+            "reviews_count",
         )
         model = Title
 
 
-class TitleSerializer(serializers.ModelSerializer):
-    """Сериализатор для произведений при небезопасных запросах."""
+class TitleLeaderboardSerializer(TitleSafeSerializer):
+    """Произведение в рейтинге лучших с точными оценками."""
+
+    rating = serializers.FloatField(read_only=True)
+    weighted_rating = serializers.FloatField(read_only=True)
+
+    class Meta(TitleSafeSerializer.Meta):
+        fields = TitleSafeSerializer.Meta.fields + ("weighted_rating",)
+
 
-    category = serializers.SlugRelatedField(
-        queryset=Category.objects.all(), slug_field="slug"
+class LeaderboardQuerySerializer(serializers.Serializer):
+    """Параметры рейтинга лучших произведений."""
+
+    genre = serializers.SlugField(max_length=50, required=False)
+    category = serializers.SlugField(max_length=50, required=False)
+    min_reviews = serializers.IntegerField(min_value=1, default=1)
+    rank = serializers.ChoiceField(
+        choices=("mean", "weighted"), default="mean"
     )
-    genre = serializers.SlugRelatedField(
-        queryset=Genre.objects.all(), slug_field="slug", many=True
+
+
+class TitleStatsSerializer(MetricsSerializerMixin, serializers.Serializer):
+    """Статистика оценок произведения по хранимой гистограмме."""
+
+    title = serializers.IntegerField()
+    count = serializers.IntegerField()
+    mean = serializers.FloatField(allow_null=True)
+    median = serializers.FloatField(allow_null=True)
+    histogram = serializers.DictField(child=serializers.IntegerField())
+
+
+class TitleStatsQuerySerializer(serializers.Serializer):
+    """id произведений через запятую в ?ids= пакетного запроса."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.API_STATS_MAX_IDS,
     )
 
+    def to_internal_value(self, data):
+        ids = [value for value in data.get("ids", "").split(",") if value]
+        validated = super().to_internal_value({"ids": ids})
+        # Повторы не меняют ответ.
+        return {"ids": list(dict.fromkeys(validated["ids"]))}
+
+
+class TitleSerializer(MetricsSerializerMixin, serializers.ModelSerializer):
+    """Сериализатор для произведений при небезопасных запросах."""
+
+    category = DictionarySlugField(dictionaries.categories)
+    genre = DictionarySlugField(dictionaries.genres, many=True)
+
     class Meta:
         fields = ("id", "name", "year", "description", "genre", "category")
         model = Title
 
+    def create(self, validated_data):
+        genres = validated_data.pop("genre")
+        with transaction.atomic():
+            title = super().create(validated_data)
+            self.set_genres(title, genres, created=True)
+        return title
+
+    def update(self, title, validated_data):
+        genres = validated_data.pop("genre", None)
+        with transaction.atomic():
+            title = super().update(title, validated_data)
+            if genres is not None:
+                self.set_genres(title, genres)
+        return title
+
+    @staticmethod
+    def set_genres(title, genres, created=False):
+        """
+        Замена жанров произведения одним DELETE и одним INSERT вместо
+        построчного сравнения в ManyRelatedManager.set().
+        """
+        links = GenreTitle.objects.filter(title=title)
+        current = set() if created else set(
+            links.values_list("genre_id", flat=True)
+        )
+        wanted = {genre.pk for genre in genres}
+        if current - wanted:
+            links.filter(genre_id__in=current - wanted).delete()
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre_id=genre_id, rating=title.rating,
+                       weighted_rating=title.weighted_rating)
+            for genre_id in wanted - current
+        )
+
     def to_representation(self, title):
         """Определяет сериализатор для чтения."""
-        serializer = TitleSafeSerializer(title)
-        return serializer.data
+        return TitleSafeSerializer(
+            context=self.context
+        ).to_representation(title)
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(MetricsSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели Comment"""
 
     author = serializers.SlugRelatedField(slug_field="username",
@@ -223,7 +414,7 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ("id", "text", "author", "pub_date")
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(MetricsSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели Review"""
 
     author = serializers.SlugRelatedField(
@@ -232,19 +423,33 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only=True
     )
 
-    def validate(self, data):
-        request = self.context["request"]
-        author = request.user
-        title_id = self.context["view"].kwargs.get("title_id")
-        title = get_object_or_404(Title, pk=title_id)
-        if request.method == "POST":
-            if Review.objects.filter(title=title, author=author).exists():
-                raise ValidationError(
-                    "Вы не можете добавить более "
-                    "одного отзыва на произведение"
-                )
-        return data
+    class Meta:
+        model = Review
+        fields = ("id", "author", "text", "score", "pub_date",
+                  "comments_count")
+
+
+class TitleBulkSerializer(serializers.ModelSerializer):
+    """
+    Проверка одного произведения при пакетном создании. Slug жанров и
+    категории сверяются с БД сразу для всего пакета в api.bulk.
+    """
+
+    category = serializers.SlugField(max_length=50)
+    genre = serializers.ListField(
+        child=serializers.SlugField(max_length=50), allow_empty=False
+    )
+
+    class Meta:
+        fields = ("name", "year", "description", "genre", "category")
+        model = Title
+
+
+class ReviewBulkSerializer(serializers.ModelSerializer):
+    """Проверка одного отзыва при пакетном создании."""
+
+    author = serializers.CharField(max_length=150, required=False)
 
     class Meta:
+        fields = ("text", "score", "author")
         model = Review
-        fields = ("id", "author", "text", "score", "pub_date")
@@ -1,34 +1,55 @@
-from django.db.models import Avg
+from django.db import IntegrityError
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.filters import SearchFilter
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.views import TokenObtainPairView
-from reviews.models import Category, CustomUser, Genre, Review, Title
+from reviews import aggregates
+from reviews.models import (Category, CustomUser, Genre, GenreTitle, Review,
+                            Title)
 
+from . import bulk
+from .authentication import load_deferred_fields
 from .filters import TitleFilter
-from .mixins import GetCreatePatchDestroyMixin, ListCreateDestroyMixin
+from .mixins import (CachedListMixin, CachedListRetrieveMixin,
+                     GetCreatePatchDestroyMixin, ListCreateDestroyMixin,
+                     ParentObjectMixin, ReplicaReadMixin)
+from .pagination import KeysetPagination, YamdbPagination
 from .permissions import IsAdmin, IsAdminOrReadOnly, IsAuthorModeratorAdmin
 from .serializers import (CategorySerializer, CommentSerializer,
                           CustomTokenObtainSerializer, CustomUserMeSerializer,
                           CustomUserSerializer, GenreSerializer,
-                          RegisterSerializer, ReviewSerializer,
-                          TitleSafeSerializer, TitleSerializer)
+                          LeaderboardQuerySerializer, RegisterSerializer,
+                          ReviewSerializer, TitleLeaderboardSerializer,
+                          TitleSafeSerializer, TitleSerializer,
+                          TitleStatsQuerySerializer, TitleStatsSerializer)
+
+
+def prefetch_genre_links(prefix=""):
+    """id жанров произведений; сами жанры берутся из reviews.dictionaries."""
+    return Prefetch(
+        f"{prefix}genretitle_set",
+        queryset=GenreTitle.objects.only("id", "title_id", "genre_id"),
+    )
 
 
 class TokenObtainView(TokenObtainPairView):
     serializer_class = CustomTokenObtainSerializer
 
 
-class CustomUserModelViewSet(GetCreatePatchDestroyMixin):
+class CustomUserModelViewSet(CachedListRetrieveMixin,
+                             GetCreatePatchDestroyMixin):
     """
     ViewSet для User эндпоинтов с username вместо id и реализованным поиском
     """
 
+    cache_resources = ("users",)
     lookup_field = "username"
     serializer_class = CustomUserSerializer
     queryset = CustomUser.objects.all()
@@ -38,7 +59,7 @@ class CustomUserModelViewSet(GetCreatePatchDestroyMixin):
         IsAuthenticated,
         IsAdmin,
     )
-    pagination_class = PageNumberPagination
+    pagination_class = YamdbPagination
 
     @action(
         detail=False,
@@ -47,6 +68,7 @@ class CustomUserModelViewSet(GetCreatePatchDestroyMixin):
         serializer_class=CustomUserMeSerializer,
     )
     def me(self, request, pk=None):
+        load_deferred_fields(request.user)
         if request.method == "PATCH":
             serializer = self.get_serializer(
                 request.user, data=request.data, partial=True
@@ -69,74 +91,198 @@ class RegisterModelViewSet(viewsets.ModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class TitleViewSet(GetCreatePatchDestroyMixin):
-    queryset = Title.objects.annotate(rating=Avg("reviews__score")).all()
+class TitleViewSet(ReplicaReadMixin, CachedListRetrieveMixin,
+                   GetCreatePatchDestroyMixin):
+    cache_resources = ("titles",)
+    queryset = Title.objects.prefetch_related(prefetch_genre_links())
     serializer_class = TitleSerializer
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
-    pagination_class = PageNumberPagination
+    pagination_class = YamdbPagination
 
     def get_serializer_class(self):
         """Стандартный метод вьюсет, который определяет
         какой из доступных сериализаторов должен обрабатывать
         данные в зависимости от действия."""
-        if self.action == ["list", "retrieve"]:
+        if self.action in ("list", "retrieve"):
             return TitleSafeSerializer
+        if self.action in ("stats", "stats_batch"):
+            return TitleStatsSerializer
+        if self.action == "top":
+            return TitleLeaderboardSerializer
         return TitleSerializer
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        """Создаёт произведения из JSON-массива одним пакетом."""
+        return bulk.create_titles(bulk.get_items(request))
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        """Количество, средняя, медиана и гистограмма оценок произведения."""
+        return self.cached_response(self.get_stats, request, pk=pk)
+
+    @action(detail=False, url_path="stats")
+    def stats_batch(self, request):
+        """Статистика оценок нескольких произведений: ?ids=1,2,3."""
+        return self.cached_response(self.get_stats_batch, request)
+
+    @action(detail=False, pagination_class=KeysetPagination)
+    def top(self, request):
+        """
+        Лучшие произведения, в том числе в жанре (?genre=) и категории
+        (?category=), с курсорной пагинацией. ?rank=weighted сортирует по
+        байесовской оценке, ?min_reviews= отсекает произведения с малым
+        числом отзывов.
+        """
+        return self.cached_response(self.get_top, request)
+
+    def get_top(self, request):
+        query = LeaderboardQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        field = "rating" if params["rank"] == "mean" else "weighted_rating"
+        # Страница - обратный проход по индексу (field, id),
+        # (category_id, field, id) или, для жанра, (genre_id, field, id)
+        # таблицы связей с жанрами от позиции курсора.
+        if "genre" in params:
+            genre = get_object_or_404(
+                Genre.objects.only("pk"), slug=params["genre"]
+            )
+            queryset = GenreTitle.objects.filter(genre_id=genre.pk)
+            prefix = "title__"
+        else:
+            queryset = Title.objects.all()
+            prefix = ""
+        queryset = queryset.filter(**{
+            f"{field}__isnull": False,
+            f"{prefix}rating_count__gte": params["min_reviews"],
+        }).order_by(f"-{field}", "-id")
+        if "category" in params:
+            category = get_object_or_404(
+                Category.objects.only("pk"), slug=params["category"]
+            )
+            queryset = queryset.filter(
+                **{f"{prefix}category_id": category.pk}
+            )
+        queryset = queryset.prefetch_related(prefetch_genre_links(prefix))
+        if prefix:
+            queryset = queryset.select_related("title")
+            page = [link.title for link in self.paginate_queryset(queryset)]
+        else:
+            page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
+    def get_stats(self, request, pk=None):
+        try:
+            statistics = aggregates.score_statistics([int(pk)])
+        except ValueError:
+            statistics = None
+        if not statistics:
+            raise NotFound("Произведение не найдено.")
+        return Response(
+            self.get_serializer(next(iter(statistics.values()))).data
+        )
+
+    def get_stats_batch(self, request):
+        query = TitleStatsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        ids = query.validated_data["ids"]
+        statistics = aggregates.score_statistics(ids)
+        return Response(self.get_serializer(
+            [statistics[pk] for pk in ids if pk in statistics], many=True
+        ).data)
 
-class GenreViewSet(ListCreateDestroyMixin):
+
+class GenreViewSet(ReplicaReadMixin, CachedListMixin,
+                   ListCreateDestroyMixin):
+    cache_resources = ("genres",)
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (filters.SearchFilter,)
     search_fields = ("name",)
     lookup_field = "slug"
-    pagination_class = PageNumberPagination
+    pagination_class = YamdbPagination
 
 
-class CategoryViewSet(ListCreateDestroyMixin):
+class CategoryViewSet(ReplicaReadMixin, CachedListMixin,
+                      ListCreateDestroyMixin):
+    cache_resources = ("categories",)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = (IsAdminOrReadOnly,)
-    pagination_class = PageNumberPagination
+    pagination_class = YamdbPagination
     filter_backends = (filters.SearchFilter,)
     search_fields = ("name",)
     lookup_field = "slug"
 
 
-class ReviewViewSet(GetCreatePatchDestroyMixin):
+class ReviewViewSet(ReplicaReadMixin, ParentObjectMixin,
+                    CachedListRetrieveMixin, GetCreatePatchDestroyMixin):
+    # Список отзывов зависит и от произведения: после его удаления
+    # закэшированный ответ не должен отдаваться вместо 404.
+    cache_resources = ("reviews", "titles")
     serializer_class = ReviewSerializer
     permission_classes = [
         IsAuthorModeratorAdmin,
     ]
-    pagination_class = PageNumberPagination
+    pagination_class = YamdbPagination
+    parent_queryset = Title.objects.only("pk")
+    parent_lookups = {"pk": "title_id"}
 
     def get_queryset(self):
-        title = get_object_or_404(Title, pk=self.kwargs.get("title_id"))
-
-        return title.reviews.all()
+        return self.get_parent().reviews.select_related("author")
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get("title_id")
-        title = get_object_or_404(Title, id=title_id)
-        serializer.save(author=self.request.user, title=title)
+        title = self.get_parent()
+        try:
+            # Review.save выполняется в своей транзакции (точке
+            # сохранения), поэтому ошибка не прерывает внешнюю транзакцию.
+            serializer.save(author=self.request.user, title=title)
+        except IntegrityError:
+            # Отзыв проверяется только после нарушения unique_review,
+            # а не отдельным запросом перед каждой вставкой.
+            if not Review.objects.filter(
+                title=title, author=self.request.user
+            ).exists():
+                raise
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    "Вы не можете добавить более "
+                    "одного отзыва на произведение"
+                ]
+            })
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        permission_classes=(IsAuthenticated, IsAdmin),
+    )
+    def bulk_create(self, request, title_id=None):
+        """Создаёт отзывы на произведение из JSON-массива одним пакетом."""
+        return bulk.create_reviews(
+            self.get_parent(), bulk.get_items(request), request.user
+        )
 
 
-class CommentViewSet(GetCreatePatchDestroyMixin):
+class CommentViewSet(ReplicaReadMixin, ParentObjectMixin,
+                     CachedListRetrieveMixin, GetCreatePatchDestroyMixin):
+    cache_resources = ("comments", "reviews")
     serializer_class = CommentSerializer
     permission_classes = [
         IsAuthorModeratorAdmin,
     ]
-    pagination_class = PageNumberPagination
+    pagination_class = YamdbPagination
+    parent_queryset = Review.objects.only("pk", "title_id")
+    parent_lookups = {"pk": "review_id", "title_id": "title_id"}
 
     def get_queryset(self):
-        review = get_object_or_404(Review, pk=self.kwargs.get("review_id"))
-        return review.comments.all()
+        return self.get_parent().comments.select_related("author")
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get("title_id")
-        review_id = self.kwargs.get("review_id")
-        review = get_object_or_404(Review, id=review_id, title=title_id)
-        serializer.save(author=self.request.user, review=review)
+        serializer.save(author=self.request.user, review=self.get_parent())
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -80,6 +81,52 @@ DATABASES = {
     }
 }
 
+# DATABASE_PROFILE=production: WAL и PRAGMA для параллельных процессов,
+# постоянные соединения и повтор запросов при "database is locked".
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "default")
+
+SQLITE_PRODUCTION_OPTIONS = {
+    "pragmas": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        # Отрицательное значение - размер в КиБ.
+        "cache_size": -64 * 1024,
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+    "lock_retries": 5,
+    "lock_backoff": 0.05,
+    "lock_backoff_max": 1.0,
+}
+
+if DATABASE_PROFILE == "production":
+    DATABASES["default"].update({
+        "ENGINE": "api_yamdb.sqlite",
+        "CONN_MAX_AGE": int(os.getenv("DATABASE_CONN_MAX_AGE", 600)),
+        "OPTIONS": SQLITE_PRODUCTION_OPTIONS,
+    })
+
+# Реплика для чтения (локально - копия файла основной БД). Чтения
+# TitleViewSet, GenreViewSet, CategoryViewSet, ReviewViewSet и
+# CommentViewSet идут на неё; после записи пользователь
+# DATABASE_REPLICA_STICKY_SECONDS секунд читает из основной БД. Это же
+# наибольшее ожидаемое отставание реплики: столько секунд после изменения
+# ресурса прочитанные с реплики ответы не кэшируются и не получают ETag.
+DATABASE_REPLICA_NAME = os.getenv("DATABASE_REPLICA_NAME")
+DATABASE_REPLICA_ALIAS = None
+if DATABASE_REPLICA_NAME:
+    DATABASE_REPLICA_ALIAS = "replica"
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES["default"],
+        "NAME": DATABASE_REPLICA_NAME,
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICA_STICKY_SECONDS = int(
+    os.getenv("DATABASE_REPLICA_STICKY_SECONDS", 5)
+)
+DATABASE_ROUTERS = ["api.replica.ReplicaRouter"]
+
 
 # Password validation
 
@@ -122,11 +169,16 @@ AUTH_USER_MODEL = "reviews.CustomUser"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.ClaimsJWTAuthentication",
     ),
     "PAGE_SIZE": 5,
 }
 
+# Сколько секунд после выдачи токена роль и is_staff берутся из его
+# claims без запроса к БД. Изменение пользователя отзывает claims сразу,
+# если кэш общий для процессов, и не позже чем через этот срок - иначе.
+JWT_CLAIMS_TTL = int(os.getenv("JWT_CLAIMS_TTL", 300))
+
 # Авторизация через JWT в SWAGGER
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {
@@ -134,11 +186,76 @@ SWAGGER_SETTINGS = {
     },
 }
 
+# Общий для процессов кэш: версии ресурсов, отметки об отзыве claims и
+# привязка чтения к основной БД должны быть видны всем процессам. По
+# умолчанию - отдельный файл SQLite CACHE_LOCATION на этой машине; для
+# нескольких машин подойдёт Redis или Memcached.
+CACHES = {
+    "default": {
+        "BACKEND": "api_yamdb.sqlite.cache.SQLiteCache",
+        "LOCATION": os.getenv(
+            "CACHE_LOCATION", str(BASE_DIR / "cache.sqlite3")
+        ),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+        },
+    },
+}
+
+# Кэш ответов анонимным пользователям на чтение публичных ресурсов.
+# Версии ресурсов хранятся в CACHES["default"].
+API_RESPONSE_CACHE = {
+    "ENABLED": os.getenv("API_RESPONSE_CACHE_ENABLED", "1") == "1",
+    "MAX_ENTRIES": int(os.getenv("API_RESPONSE_CACHE_MAX_ENTRIES", 1000)),
+    "TIMEOUT": int(os.getenv("API_RESPONSE_CACHE_TIMEOUT", 300)),
+}
+
+# Метрики запросов на /metrics/. При нескольких процессах каждый раз в
+# METRICS_FLUSH_INTERVAL секунд пишет свои счётчики в METRICS_DIR, а
+# /metrics/ суммирует их; без METRICS_DIR видны счётчики одного процесса.
+# Файлы, не обновлявшиеся METRICS_STALE_AFTER секунд, считаются
+# оставленными завершившимися процессами.
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 10))
+METRICS_STALE_AFTER = float(
+    os.getenv("METRICS_STALE_AFTER", 6 * METRICS_FLUSH_INTERVAL)
+)
+# /metrics/ требует заголовок "Authorization: Bearer <METRICS_TOKEN>";
+# без токена метрики недоступны.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Сколько секунд процесс доверяет своей копии жанров и категорий, даже
+# если версия в кэше не изменилась (например, если кэш был недоступен).
+DICTIONARY_CACHE_TTL = float(os.getenv("DICTIONARY_CACHE_TTL", 60))
+
+# Максимальный размер JSON-массива для пакетного создания объектов
+API_BULK_MAX_ITEMS = int(os.getenv("API_BULK_MAX_ITEMS", 10000))
+
+# Максимальное количество id в пакетном запросе статистики оценок
+API_STATS_MAX_IDS = int(os.getenv("API_STATS_MAX_IDS", 100))
+
+# Полнотекстовый поиск ранжирует все совпадения в названии и не больше
+# этого числа самых новых совпадений; остальные идут после них
+# (reviews.search).
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", 1000))
+
+# Байесовская оценка для рейтинга лучших произведений: к отзывам
+# добавляется RATING_PRIOR_WEIGHT оценок RATING_PRIOR_MEAN. После
+# изменения настроек запустите rebuild_aggregates.
+RATING_PRIOR_MEAN = float(os.getenv("RATING_PRIOR_MEAN", 7.0))
+RATING_PRIOR_WEIGHT = int(os.getenv("RATING_PRIOR_WEIGHT", 10))
+
 # Эмуляция почтовых сообщений через текстовые файлы
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Письма с кодом подтверждения отправляются фоновым потоком пачками
+EMAIL_ASYNC = os.getenv("EMAIL_ASYNC", "1") == "1"
+EMAIL_QUEUE_BATCH_SIZE = int(os.getenv("EMAIL_QUEUE_BATCH_SIZE", 50))
+EMAIL_QUEUE_MAX_RETRIES = int(os.getenv("EMAIL_QUEUE_MAX_RETRIES", 5))
+EMAIL_QUEUE_RETRY_BACKOFF = float(os.getenv("EMAIL_QUEUE_RETRY_BACKOFF", 1))
+
 # Константы регулярных выражений
 SLUG_REGEX = r"^[-a-zA-Z0-9_]+$"
 USERNAME_REGEX = r"^[\w.@+-]+$"
@@ -0,0 +1,80 @@
+"""
+SQLite-бэкенд для рабочего профиля БД.
+
+Дополнительные ключи OPTIONS:
+- pragmas: PRAGMA, выполняемые при открытии соединения;
+- lock_retries, lock_backoff, lock_backoff_max: повторы с экспоненциальной
+  задержкой при "database is locked".
+
+Транзакции начинаются с BEGIN IMMEDIATE: блокировка записи берётся в
+начале транзакции, где её ожидание и повтор безопасны, а не при первой
+записи, где SQLite сразу возвращает ошибку, чтобы избежать взаимной
+блокировки. Повторяются только BEGIN и запросы вне транзакции: внутри
+транзакции блокировка записи уже получена.
+"""
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+from django.db.utils import OperationalError
+
+
+def is_locked_error(error):
+    return "database is locked" in str(error)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = params.pop("pragmas", {})
+        self.lock_retries = params.pop("lock_retries", 0)
+        self.lock_backoff = params.pop("lock_backoff", 0.05)
+        self.lock_backoff_max = params.pop("lock_backoff_max", 1.0)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+
+    def create_cursor(self, name=None):
+        return self.connection.cursor(
+            factory=lambda connection: RetryingCursorWrapper(
+                connection, self
+            )
+        )
+
+    def _start_transaction_under_autocommit(self):
+        self.retry_locked(self.connection.execute, "BEGIN IMMEDIATE")
+
+    def retry_locked(self, method, *args):
+        for attempt in range(self.lock_retries + 1):
+            try:
+                return method(*args)
+            except (base.Database.OperationalError, OperationalError) as error:
+                if attempt == self.lock_retries or not is_locked_error(error):
+                    raise
+            delay = min(self.lock_backoff * 2 ** attempt,
+                        self.lock_backoff_max)
+            # Случайная добавка разводит повторы соперничающих процессов.
+            time.sleep(delay * (0.5 + random.random() / 2))
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    def __init__(self, connection, wrapper):
+        super().__init__(connection)
+        self.wrapper = wrapper
+
+    def execute(self, query, params=None):
+        if self.wrapper.in_atomic_block:
+            return super().execute(query, params)
+        return self.wrapper.retry_locked(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        if self.wrapper.in_atomic_block:
+            return super().executemany(query, param_list)
+        param_list = list(param_list)
+        return self.wrapper.retry_locked(
+            super().executemany, query, param_list
+        )
@@ -0,0 +1,221 @@
+"""
+Кэш Django в отдельном файле SQLite, общий для процессов одной машины.
+
+Числа хранятся как есть, остальные значения - pickle без сжатия:
+версии ресурсов и отметки времени читаются и пишутся без сериализации,
+а incr выполняется одним UPDATE и не теряет параллельные повышения.
+UPDATE ... RETURNING появился в SQLite 3.35, UPSERT - в 3.24: на более
+старых версиях incr и add читают и пишут запись в одной транзакции
+BEGIN IMMEDIATE, что так же атомарно, но на запрос дороже.
+Каждый поток держит своё соединение; close() его не закрывает, как и
+постоянные соединения с основной БД. Лишние записи удаляются раз в
+CULL_EVERY записей, а не при каждой; счётчик записей общий для потоков
+и защищён блокировкой.
+
+Встроенные бэкенды не подходят: FileBasedCache сжимает и переписывает
+файл при каждом повышении версии (в bench_endpoints.py это удваивало
+время записи), а DatabaseCache хранит кэш в основной БД, где он
+конкурирует с записью за блокировку SQLite, и не повышает значения
+атомарно.
+
+OPTIONS: MAX_ENTRIES и CULL_FREQUENCY, как у встроенных бэкендов.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+CULL_EVERY = 100
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+HAS_UPSERT = sqlite3.sqlite_version_info >= (3, 24, 0)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.location = str(location)
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.location, timeout=5, isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, "
+                "value, expires REAL) WITHOUT ROWID"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    @staticmethod
+    def _dump(value):
+        if type(value) in (int, float):
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        return pickle.loads(value) if isinstance(value, bytes) else value
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self._key(key, version), time.time()),
+        ).fetchone()
+        return default if row is None else self._load(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache WHERE key IN "
+            f"({', '.join('?' * len(keys))}) "
+            f"AND (expires IS NULL OR expires > ?)",
+            (*keys, time.time()),
+        )
+        return {keys[key]: self._load(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires) "
+                "VALUES (?, ?, ?)",
+                [(self._key(key, version), self._dump(value), expires)
+                 for key, value in data.items()],
+            )
+        self._wrote(len(data))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        params = (self._key(key, version), self._dump(value),
+                  self.get_backend_timeout(timeout))
+        if HAS_UPSERT:
+            added = self._connection().execute(
+                "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+                "expires = excluded.expires "
+                "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+                (*params, time.time()),
+            ).rowcount
+        else:
+            with self._transaction() as connection:
+                connection.execute(
+                    "DELETE FROM cache WHERE key = ? "
+                    "AND expires IS NOT NULL AND expires <= ?",
+                    (params[0], time.time()),
+                )
+                added = connection.execute(
+                    "INSERT OR IGNORE INTO cache (key, value, expires) "
+                    "VALUES (?, ?, ?)",
+                    params,
+                ).rowcount
+        self._wrote(added)
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return bool(self._connection().execute(
+            "UPDATE cache SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()),
+        ).rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        params = (delta, key, time.time())
+        update = (
+            "UPDATE cache SET value = value + ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?) "
+            "AND typeof(value) IN ('integer', 'real')"
+        )
+        if HAS_RETURNING:
+            # fetchall() доводит UPDATE до конца и освобождает блокировку.
+            rows = self._connection().execute(
+                f"{update} RETURNING value", params
+            ).fetchall()
+        else:
+            with self._transaction() as connection:
+                rows = []
+                if connection.execute(update, params).rowcount:
+                    rows = connection.execute(
+                        "SELECT value FROM cache WHERE key = ?", (key,)
+                    ).fetchall()
+        if not rows:
+            raise ValueError(f"Key '{key}' not found")
+        return rows[0][0]
+
+    def delete(self, key, version=None):
+        return bool(self.delete_many([key], version))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._transaction() as connection:
+            return connection.executemany(
+                "DELETE FROM cache WHERE key = ?", [(key,) for key in keys]
+            ).rowcount
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version) is not self
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def _wrote(self, count):
+        with self._writes_lock:
+            self._writes += count
+            if self._writes < CULL_EVERY:
+                return
+            self._writes = 0
+        self._cull()
+
+    def _cull(self):
+        with self._transaction() as connection:
+            connection.execute(
+                "DELETE FROM cache WHERE expires <= ?", (time.time(),)
+            )
+            (entries,) = connection.execute(
+                "SELECT COUNT(*) FROM cache"
+            ).fetchone()
+            if entries > self._max_entries:
+                connection.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                    "ORDER BY expires IS NULL, expires LIMIT ?)",
+                    (entries // self._cull_frequency,),
+                )
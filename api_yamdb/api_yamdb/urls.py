@@ -1,3 +1,4 @@
+from api.metrics import metrics_view
 from django.contrib import admin
 from django.urls import include, path
 from django.views.generic import TemplateView
@@ -37,4 +38,5 @@ urlpatterns = [
         name="redoc"
     ),
     path("api/v1/", include("api.urls")),
+    path("metrics/", metrics_view, name="metrics"),
 ]
@@ -0,0 +1,433 @@
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from math import isclose
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import (Case, Count, F, FloatField, IntegerField,
+                              OuterRef, Q, Subquery, Sum, Value, When)
+from django.db.models.functions import Cast
+
+from . import versions
+from .models import GenreTitle, Review, Title, TitleScoreCount
+
+SCORES = range(1, 11)
+# Сколько объектов сдвигается одним UPDATE при пакетном применении.
+DELTA_BATCH_SIZE = 200
+
+_state = threading.local()
+
+
+class DeltaBatch:
+    """
+    Сдвиги агрегатов, накопленные за одно удаление. Сдвиги удаляемых
+    произведений и отзывов не применяются: их строки удаляются тем же
+    каскадом.
+    """
+
+    def __init__(self):
+        # {id произведения: [сдвиг суммы оценок, сдвиг количества]}.
+        self.titles = defaultdict(lambda: [0, 0])
+        self.scores = Counter()
+        self.comments = Counter()
+        self.deleted_titles = set()
+        self.deleted_reviews = set()
+
+    def apply(self):
+        titles = {
+            title_id: deltas for title_id, deltas in self.titles.items()
+            if title_id not in self.deleted_titles
+        }
+        shift_title_aggregates(titles)
+        title_ids = [title_id for title_id, deltas in titles.items()
+                     if any(deltas)]
+        for start in range(0, len(title_ids), DELTA_BATCH_SIZE):
+            sync_genre_ratings(title_ids[start:start + DELTA_BATCH_SIZE])
+        shift_score_counts({
+            key: delta for key, delta in self.scores.items()
+            if key[0] not in self.deleted_titles
+        })
+        # Одинаковые сдвиги счётчиков комментариев - одним UPDATE.
+        reviews = defaultdict(list)
+        for review_id, delta in self.comments.items():
+            if delta and review_id not in self.deleted_reviews:
+                reviews[delta].append(review_id)
+        for delta, review_ids in reviews.items():
+            for start in range(0, len(review_ids), DELTA_BATCH_SIZE):
+                Review.objects.filter(
+                    pk__in=review_ids[start:start + DELTA_BATCH_SIZE]
+                ).update(comments_count=F("comments_count") + delta)
+
+
+def current_batch():
+    return getattr(_state, "batch", None)
+
+
+@contextmanager
+def batched_deltas():
+    """
+    Откладывает сдвиги агрегатов до конца блока и применяет их пакетом в
+    той же транзакции: каскадное удаление произведения, отзыва или
+    пользователя не обновляет агрегаты для каждой удаляемой строки.
+    Вложенные блоки присоединяются к внешнему.
+    """
+    if current_batch() is not None:
+        yield current_batch()
+        return
+    batch = _state.batch = DeltaBatch()
+    try:
+        with transaction.atomic():
+            yield batch
+            _state.batch = None
+            batch.apply()
+    finally:
+        _state.batch = None
+
+
+def compute_ratings(score_sum, score_count):
+    """
+    Средняя и байесовская оценки: к оценкам произведения добавляются
+    RATING_PRIOR_WEIGHT оценок, равных RATING_PRIOR_MEAN, поэтому
+    несколько случайных десяток не поднимают произведение в лидеры.
+    """
+    if not score_count:
+        return None, None
+    return (
+        score_sum / score_count,
+        (score_sum + settings.RATING_PRIOR_WEIGHT * settings.RATING_PRIOR_MEAN)
+        / (score_count + settings.RATING_PRIOR_WEIGHT),
+    )
+
+
+def rating_expressions(score_delta, count_delta):
+    """
+    Выражения UPDATE, считающие оценки как compute_ratings по значениям
+    rating_sum и rating_count после сдвига на score_delta и count_delta.
+    """
+    score_sum = Cast(F("rating_sum") + score_delta, FloatField())
+    score_count = F("rating_count") + count_delta
+    no_reviews = Q(rating_count=-count_delta)
+    prior_weight = settings.RATING_PRIOR_WEIGHT
+    return {
+        "rating": Case(
+            When(no_reviews, then=Value(None)),
+            default=score_sum / score_count,
+            output_field=FloatField(),
+        ),
+        "weighted_rating": Case(
+            When(no_reviews, then=Value(None)),
+            default=(score_sum + prior_weight * settings.RATING_PRIOR_MEAN)
+            / (score_count + prior_weight),
+            output_field=FloatField(),
+        ),
+    }
+
+
+def apply_review_delta(title_id, score_delta, count_delta):
+    """Атомарно сдвигает хранимые агрегаты рейтинга произведения."""
+    batch = current_batch()
+    if batch is not None:
+        batch.titles[title_id][0] += score_delta
+        batch.titles[title_id][1] += count_delta
+        return
+    shift_title_aggregates({title_id: (score_delta, count_delta)})
+    sync_genre_ratings([title_id])
+
+
+def shift_title_aggregates(deltas):
+    """
+    Сдвигает агрегаты произведений: deltas - {id произведения: (сдвиг
+    суммы оценок, сдвиг количества)}, до DELTA_BATCH_SIZE произведений
+    одним UPDATE.
+    """
+    deltas = [(title_id, tuple(pair)) for title_id, pair in deltas.items()
+              if any(pair)]
+    for start in range(0, len(deltas), DELTA_BATCH_SIZE):
+        chunk = dict(deltas[start:start + DELTA_BATCH_SIZE])
+        if len(chunk) == 1:
+            ((score_delta, count_delta),) = chunk.values()
+        else:
+            score_delta, count_delta = (
+                Case(*(When(pk=title_id, then=Value(pair[index]))
+                       for title_id, pair in chunk.items()),
+                     output_field=IntegerField())
+                for index in (0, 1)
+            )
+        Title.objects.filter(pk__in=list(chunk)).update(
+            rating_sum=F("rating_sum") + score_delta,
+            rating_count=F("rating_count") + count_delta,
+            **rating_expressions(score_delta, count_delta),
+        )
+
+
+def apply_comment_delta(review_id, count_delta):
+    """Атомарно сдвигает хранимое количество комментариев к отзыву."""
+    batch = current_batch()
+    if batch is not None:
+        batch.comments[review_id] += count_delta
+        return
+    Review.objects.filter(pk=review_id).update(
+        comments_count=F("comments_count") + count_delta
+    )
+
+
+def sync_genre_ratings(title_ids):
+    """Копирует оценки произведений в их связи с жанрами."""
+    GenreTitle.objects.filter(title_id__in=title_ids).update(**{
+        field: Subquery(
+            Title.objects.filter(pk=OuterRef("title_id")).values(field)
+        )
+        for field in ("rating", "weighted_rating")
+    })
+
+
+def apply_score_deltas(deltas):
+    """
+    Сдвигает счётчики гистограммы оценок: deltas - {(id произведения,
+    оценка): изменение}. Недостающая строка создаётся при первом отзыве
+    с этой оценкой.
+    """
+    batch = current_batch()
+    if batch is not None:
+        batch.scores.update(deltas)
+        return
+    shift_score_counts(deltas)
+
+
+def shift_score_counts(deltas):
+    """apply_score_deltas до DELTA_BATCH_SIZE счётчиков одним UPDATE."""
+    deltas = [(key, delta) for key, delta in deltas.items() if delta]
+    for start in range(0, len(deltas), DELTA_BATCH_SIZE):
+        chunk = dict(deltas[start:start + DELTA_BATCH_SIZE])
+        conditions = {
+            (title_id, score): Q(title_id=title_id, score=score)
+            for title_id, score in chunk
+        }
+        counters = TitleScoreCount.objects.filter(
+            Q(*conditions.values(), _connector=Q.OR)
+        )
+        if len(chunk) == 1:
+            (delta,) = chunk.values()
+        else:
+            delta = Case(*(When(conditions[key], then=Value(delta))
+                           for key, delta in chunk.items()),
+                         output_field=IntegerField())
+        updated = counters.update(count=F("count") + delta)
+        added = [key for key, delta in chunk.items() if delta > 0]
+        if updated == len(chunk) or not added:
+            continue
+        existing = set(counters.values_list("title_id", "score"))
+        for title_id, score in added:
+            if (title_id, score) in existing:
+                continue
+            try:
+                with transaction.atomic():
+                    TitleScoreCount.objects.create(
+                        title_id=title_id, score=score,
+                        count=chunk[title_id, score],
+                    )
+            except IntegrityError:
+                # Строку успел создать параллельный запрос.
+                TitleScoreCount.objects.filter(
+                    title_id=title_id, score=score
+                ).update(count=F("count") + chunk[title_id, score])
+
+
+def register_created_reviews(reviews):
+    """Учитывает в агрегатах отзывы, созданные через bulk_create."""
+    deltas = {}
+    score_deltas = Counter()
+    for review in reviews:
+        score_sum, count = deltas.get(review.title_id, (0, 0))
+        deltas[review.title_id] = (score_sum + review.score, count + 1)
+        score_deltas[review.title_id, review.score] += 1
+    for title_id, (score_sum, count) in deltas.items():
+        apply_review_delta(title_id, score_sum, count)
+    apply_score_deltas(score_deltas)
+
+
+def score_statistics(title_ids):
+    """
+    Количество, средняя, медиана и гистограмма оценок произведений по
+    хранимым счётчикам. Произведения без отзывов получают пустую
+    гистограмму; несуществующие id в результат не попадают.
+    """
+    statistics = {
+        title_id: dict.fromkeys(SCORES, 0)
+        for title_id in Title.objects.filter(pk__in=title_ids)
+        .values_list("pk", flat=True)
+    }
+    for title_id, histogram in stored_score_counts(statistics).items():
+        statistics[title_id].update(histogram)
+    return {
+        title_id: describe_histogram(title_id, histogram)
+        for title_id, histogram in statistics.items()
+    }
+
+
+def describe_histogram(title_id, histogram):
+    total = sum(histogram.values())
+    mean = median = None
+    if total:
+        mean = sum(score * count for score, count in histogram.items())
+        mean /= total
+        # Медиана - среднее двух средних элементов упорядоченного списка
+        # оценок; при нечётном total это один и тот же элемент.
+        positions = ((total - 1) // 2, total // 2)
+        middle = []
+        seen = 0
+        for score in SCORES:
+            seen += histogram[score]
+            while len(middle) < 2 and seen > positions[len(middle)]:
+                middle.append(score)
+        median = (middle[0] + middle[1]) / 2
+    return {
+        "title": title_id,
+        "count": total,
+        "mean": mean,
+        "median": median,
+        "histogram": histogram,
+    }
+
+
+def collect_review_aggregates(title_ids):
+    """Считает фактические сумму и количество оценок по отзывам."""
+    return {
+        row["title_id"]: (row["score_sum"], row["score_count"])
+        for row in Review.objects.filter(title_id__in=title_ids)
+        .order_by()
+        .values("title_id")
+        .annotate(score_sum=Sum("score"), score_count=Count("id"))
+    }
+
+
+def collect_score_counts(title_ids):
+    """Фактические гистограммы {id произведения: {оценка: количество}}."""
+    return histograms_from_rows(
+        Review.objects.filter(title_id__in=title_ids)
+        .order_by()
+        .values("title_id", "score")
+        .annotate(score_count=Count("id"))
+        .values_list("title_id", "score", "score_count")
+    )
+
+
+def stale_comment_counts(title_ids):
+    """
+    Отзывы произведений, у которых хранимое количество комментариев
+    расходится с фактическим, с исправленным comments_count.
+    """
+    return list(
+        Review.objects.filter(title_id__in=title_ids)
+        .order_by()
+        .annotate(actual=Count("comments"))
+        .exclude(comments_count=F("actual"))
+        .only("pk", "title_id", "comments_count")
+    )
+
+
+def stored_score_counts(title_ids):
+    return histograms_from_rows(
+        TitleScoreCount.objects.filter(title_id__in=title_ids, count__gt=0)
+        .values_list("title_id", "score", "count")
+    )
+
+
+def histograms_from_rows(rows):
+    histograms = {}
+    for title_id, score, count in rows:
+        histograms.setdefault(title_id, {})[score] = count
+    return histograms
+
+
+def rebuild(title_ids=None, fix=True, batch_size=1000):
+    """
+    Сверяет хранимые агрегаты, гистограммы оценок и счётчики комментариев
+    отзывов пачками произведений и, если fix=True, исправляет
+    расхождения. Возвращает список id произведений, у которых агрегаты
+    расходились с отзывами и комментариями.
+
+    bulk_update не отправляет сигналов, поэтому после исправления
+    версии произведений и отзывов сдвигаются явно: иначе ETag и кэш
+    ответов продолжали бы отдавать разошедшиеся значения.
+    """
+    queryset = Title.objects.order_by("pk").only(
+        "pk", "rating_sum", "rating_count", "rating", "weighted_rating"
+    )
+    if title_ids is not None:
+        queryset = queryset.filter(pk__in=title_ids)
+    mismatched = []
+    last_pk = 0
+    while True:
+        titles = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not titles:
+            return mismatched
+        last_pk = titles[-1].pk
+        pks = [title.pk for title in titles]
+        actual = collect_review_aggregates(pks)
+        actual_histograms = collect_score_counts(pks)
+        stored_histograms = stored_score_counts(pks)
+        stale = []
+        stale_histograms = []
+        # Оценки в связях с жанрами: {id произведения: [(оценка,
+        # байесовская оценка), ...]}.
+        genre_ratings = {}
+        for title_id, *ratings in GenreTitle.objects.filter(
+            title_id__in=pks
+        ).values_list("title_id", "rating", "weighted_rating"):
+            genre_ratings.setdefault(title_id, []).append(ratings)
+        for title in titles:
+            score_sum, score_count = actual.get(title.pk, (0, 0))
+            ratings = compute_ratings(score_sum, score_count)
+            stored = [(title.rating, title.weighted_rating),
+                      *genre_ratings.get(title.pk, ())]
+            if ((title.rating_sum, title.rating_count) != (score_sum,
+                                                           score_count)
+                    or not all(same_ratings(pair, ratings)
+                               for pair in stored)):
+                title.rating_sum = score_sum
+                title.rating_count = score_count
+                title.rating, title.weighted_rating = ratings
+                stale.append(title)
+            if (actual_histograms.get(title.pk)
+                    != stored_histograms.get(title.pk)):
+                stale_histograms.append(title.pk)
+        stale_reviews = stale_comment_counts(pks)
+        for review in stale_reviews:
+            review.comments_count = review.actual
+        mismatched.extend(sorted(
+            {title.pk for title in stale} | set(stale_histograms)
+            | {review.title_id for review in stale_reviews}
+        ))
+        if fix and (stale or stale_histograms or stale_reviews):
+            with transaction.atomic():
+                Title.objects.bulk_update(stale, (
+                    "rating_sum", "rating_count", "rating", "weighted_rating"
+                ))
+                sync_genre_ratings([title.pk for title in stale])
+                TitleScoreCount.objects.filter(
+                    title_id__in=stale_histograms
+                ).delete()
+                TitleScoreCount.objects.bulk_create(
+                    TitleScoreCount(title_id=title_id, score=score,
+                                    count=score_count)
+                    for title_id in stale_histograms
+                    for score, score_count in actual_histograms.get(
+                        title_id, {}
+                    ).items()
+                )
+                Review.objects.bulk_update(stale_reviews,
+                                           ("comments_count",))
+                transaction.on_commit(
+                    lambda: versions.bump_version("titles", "reviews")
+                )
+
+
+def same_ratings(stored, actual):
+    """Оценки из SQL и из Python могут различаться в последних битах."""
+    return all(
+        stored_value is actual_value if None in (stored_value, actual_value)
+        else isclose(stored_value, actual_value, rel_tol=1e-9)
+        for stored_value, actual_value in zip(stored, actual)
+    )
@@ -0,0 +1,103 @@
+"""
+Жанры и категории в памяти процесса.
+
+Таблицы маленькие и меняются редко, поэтому каждый процесс держит их
+целиком. Актуальность сверяется с версией ресурса из reviews.versions:
+сигналы моделей повышают её после фиксации транзакции, и остальные
+процессы перечитывают таблицу при следующем обращении. Если повышение
+версии потеряно, копия всё равно перечитывается не реже, чем раз в
+DICTIONARY_CACHE_TTL секунд.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from . import versions
+from .models import Category, Genre
+
+
+class SlugCache:
+    def __init__(self, model, resource):
+        self.model = model
+        self.resource = resource
+        self._lock = threading.Lock()
+        # (версия, {slug: объект}, {id: объект}, время загрузки) заменяется
+        # целиком.
+        self._state = (None, {}, {}, None)
+
+    def __deepcopy__(self, memo):
+        # DRF копирует аргументы полей для каждого экземпляра
+        # сериализатора; кэш процесса должен остаться общим.
+        return self
+
+    def _current(self):
+        version = versions.get_version(self.resource)
+        state = self._state
+        if state[0] == version and not self._expired(state):
+            return state
+        with self._lock:
+            state = self._state
+            if state[0] != version or self._expired(state):
+                # Версия прочитана до таблицы: изменение между ними
+                # повысит версию ещё раз, и таблица перечитается.
+                loaded_at = time.monotonic()
+                objects = list(self.model.objects.all())
+                self._state = (
+                    version,
+                    {obj.slug: obj for obj in objects},
+                    {obj.pk: obj for obj in objects},
+                    loaded_at,
+                )
+            return self._state
+
+    @staticmethod
+    def _expired(state):
+        return time.monotonic() - state[3] >= settings.DICTIONARY_CACHE_TTL
+
+    def snapshot(self):
+        """
+        Копия на момент вызова. Версия из общего кэша читается один раз,
+        поэтому сериализация страницы обращается к кэшу один раз, а не на
+        каждое произведение.
+        """
+        return Snapshot(self.model, self._current())
+
+    def by_slug(self, slugs):
+        return self.snapshot().by_slug(slugs)
+
+    def by_pk(self, pks):
+        return self.snapshot().by_pk(pks)
+
+
+class Snapshot:
+    def __init__(self, model, state):
+        self.model = model
+        self.state = state
+
+    def by_slug(self, slugs):
+        """Объекты {slug: объект}; неизвестные slug пропускаются."""
+        return self._lookup(1, "slug", slugs)
+
+    def by_pk(self, pks):
+        """Объекты {id: объект}; неизвестные id пропускаются."""
+        return self._lookup(2, "pk", pks)
+
+    def _lookup(self, index, field, keys):
+        objects = self.state[index]
+        found = {key: objects[key] for key in keys if key in objects}
+        missing = set(keys) - found.keys()
+        if missing:
+            # Объект мог быть создан в ещё не зафиксированной транзакции
+            # этого же запроса, а версия повышается после фиксации.
+            found.update(
+                (getattr(obj, field), obj)
+                for obj in self.model.objects.filter(
+                    **{f"{field}__in": missing}
+                )
+            )
+        return found
+
+
+genres = SlugCache(Genre, "genres")
+categories = SlugCache(Category, "categories")
@@ -0,0 +1,318 @@
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.db.models import Max
+from reviews import aggregates, versions
+from reviews.constants import Role
+from reviews.models import (Category, Comment, CustomUser, Genre, GenreTitle,
+                            Review, Title, TitleScoreCount)
+
+WORDS = (
+    'сюжет', 'герой', 'финал', 'актёры', 'музыка', 'автор', 'идея', 'темп',
+    'атмосфера', 'диалоги', 'персонажи', 'развязка', 'начало', 'стиль',
+    'очень', 'слишком', 'совсем', 'немного', 'явно', 'всё-таки', 'опять',
+    'хороший', 'слабый', 'сильный', 'скучный', 'яркий', 'затянутый',
+    'неожиданный', 'предсказуемый', 'живой', 'честный', 'красивый',
+    'понравился', 'разочаровал', 'удивил', 'зацепил', 'утомил', 'рекомендую',
+    'пересмотрю', 'перечитаю', 'не', 'но', 'и', 'а', 'зато', 'хотя',
+)
+TEXT_POOL_SIZE = 1000
+# Оценки рецензентов поляризованы: часть отзывов ставит крайние оценки
+# независимо от качества произведения.
+EXTREME_SCORE_SHARE = 0.12
+REVIEW_PERIOD = timedelta(days=5 * 365)
+# Опорный момент по умолчанию: годы произведений и даты публикаций
+# отсчитываются от него, а не от текущего времени, чтобы --seed давал
+# одинаковые данные в любой день.
+DEFAULT_NOW = '2024-01-01T00:00:00'
+
+
+def zipf_cum_weights(count, skew):
+    """Накопленные веса распределения Ципфа для random.choices."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def stochastic_round(rng, value):
+    """Округление, несмещённое в среднем: 2.3 даёт 3 с вероятностью 0.3."""
+    return int(value + rng.random())
+
+
+def next_pk(model):
+    return (model.objects.aggregate(pk=Max('pk'))['pk'] or 0) + 1
+
+
+def insert_rows(model, fields, rows):
+    """
+    Вставка кортежей через executemany без создания объектов модели.
+    В отличие от bulk_create не вызывает pre_save, поэтому значения полей
+    auto_now_add берутся из rows.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    columns = ', '.join(
+        quote(model._meta.get_field(field).column) for field in fields
+    )
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {quote(model._meta.db_table)} ({columns}) '
+            f'VALUES ({placeholders})',
+            rows,
+        )
+
+
+class Command(BaseCommand):
+    """Команда, наполняющая БД синтетическими данными для нагрузки."""
+    help = ('Генерирует пользователей, категории, жанры, произведения, '
+            'отзывы и комментарии. Одинаковые --seed и --now на пустой БД '
+            'дают одинаковые данные.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--genres', type=int, default=50)
+        parser.add_argument('--titles', type=int, default=10000)
+        parser.add_argument(
+            '--reviews', type=int, default=100000,
+            help='Примерное общее количество отзывов.',
+        )
+        parser.add_argument(
+            '--comments', type=int, default=50000,
+            help='Примерное общее количество комментариев.',
+        )
+        parser.add_argument(
+            '--max-genres', type=int, default=4,
+            help='Наибольшее количество жанров у произведения.',
+        )
+        parser.add_argument(
+            '--skew', type=float, default=1.0,
+            help='Показатель распределения Ципфа для популярности '
+                 'произведений, жанров и категорий.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--now', type=datetime.fromisoformat, default=DEFAULT_NOW,
+            help='Опорный момент ISO 8601, от которого отсчитываются годы '
+                 'произведений и даты отзывов и комментариев '
+                 f'(по умолчанию {DEFAULT_NOW}).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=50000,
+            help='Примерное количество отзывов в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        """Наполняет модели данными."""
+        for option in ('users', 'categories', 'genres', 'titles'):
+            if options[option] < 1:
+                raise CommandError(f'--{option} должно быть больше нуля.')
+        self.rng = random.Random(options['seed'])
+        self.skew = options['skew']
+        self.texts = [
+            ' '.join(self.rng.choices(
+                WORDS, k=int(self.rng.lognormvariate(2.5, 0.7)) + 1
+            )).capitalize() + '.'
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        now = options['now']
+        if now.tzinfo is not None:
+            now = now.astimezone(timezone.utc).replace(tzinfo=None)
+        self.now = now.replace(microsecond=0)
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            self.users = self.create_users(options['users'])
+            categories = self.create_dictionary(
+                Category, options['categories'], 'Категория', 'category'
+            )
+            genres = self.create_dictionary(
+                Genre, options['genres'], 'Жанр', 'genre'
+            )
+        self.category_weights = (
+            categories, zipf_cum_weights(len(categories), self.skew)
+        )
+        self.genre_weights = (
+            genres, zipf_cum_weights(len(genres), self.skew)
+        )
+
+        review_counts = self.plan_review_counts(
+            options['titles'], options['reviews']
+        )
+        self.comments_per_review = (
+            options['comments'] / max(sum(review_counts), 1)
+        )
+        self.next_review_pk = next_pk(Review)
+        self.next_comment_pk = next_pk(Comment)
+        title_pk = next_pk(Title)
+        totals = {Title: 0, GenreTitle: 0, Review: 0, Comment: 0}
+
+        chunk = []
+        for count in review_counts:
+            chunk.append(count)
+            if sum(chunk) >= options['batch_size'] or len(chunk) >= 10000:
+                self.create_titles(title_pk, chunk, options['max_genres'],
+                                   totals)
+                title_pk += len(chunk)
+                chunk = []
+        if chunk:
+            self.create_titles(title_pk, chunk, options['max_genres'], totals)
+
+        # Данные записаны в обход моделей и их сигналов.
+        versions.bump_version(*versions.RESOURCES)
+        elapsed = time.perf_counter() - started
+        totals = {CustomUser: len(self.users), Category: len(categories),
+                  Genre: len(genres), **totals}
+        for model, count in totals.items():
+            self.stdout.write(f'{model.__name__}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные сгенерированы за {elapsed:.1f} с, '
+            f'отзывов в секунду: {totals[Review] / max(elapsed, 1e-9):.0f}.'
+        ))
+
+    def create_users(self, count):
+        """Пользователи без пароля; около 1% модераторов и 0.1% админов."""
+        first_pk = next_pk(CustomUser)
+        users = []
+        for pk in range(first_pk, first_pk + count):
+            chance = self.rng.random()
+            if chance < 0.001:
+                role = Role.ADMIN
+            elif chance < 0.011:
+                role = Role.MODERATOR
+            else:
+                role = Role.USER
+            users.append(CustomUser(
+                pk=pk,
+                username=f'user_{pk}',
+                email=f'user_{pk}@yamdb.fake',
+                password=UNUSABLE_PASSWORD_PREFIX,
+                role=role,
+                confirmation_code=uuid.UUID(int=self.rng.getrandbits(128)),
+            ))
+        CustomUser.objects.bulk_create(users, batch_size=5000)
+        return list(range(first_pk, first_pk + count))
+
+    def create_dictionary(self, model, count, name, slug):
+        first_pk = next_pk(model)
+        model.objects.bulk_create(
+            model(pk=pk, name=f'{name} {pk}', slug=f'{slug}-{pk}')
+            for pk in range(first_pk, first_pk + count)
+        )
+        return list(range(first_pk, first_pk + count))
+
+    def plan_review_counts(self, titles, reviews):
+        """
+        Количество отзывов у каждого произведения: популярность по закону
+        Ципфа, порядок произведений перемешан. Автор пишет не больше одного
+        отзыва на произведение, поэтому отзывов не больше, чем
+        пользователей.
+        """
+        weights = [1 / rank ** self.skew for rank in range(1, titles + 1)]
+        scale = reviews / sum(weights)
+        counts = [
+            min(stochastic_round(self.rng, weight * scale), len(self.users))
+            for weight in weights
+        ]
+        self.rng.shuffle(counts)
+        return counts
+
+    def create_titles(self, first_pk, review_counts, max_genres, totals):
+        rng = self.rng
+        titles = []
+        genre_links = []
+        score_counts = []
+        reviews = []
+        comments = []
+        for pk, review_count in enumerate(review_counts, first_pk):
+            title = Title(
+                pk=pk,
+                name=f'Произведение {pk}',
+                year=self.now.year - min(int(rng.expovariate(1 / 15)), 120),
+                description=rng.choice(self.texts),
+                category_id=rng.choices(
+                    self.category_weights[0],
+                    cum_weights=self.category_weights[1],
+                )[0],
+            )
+            genre_count = min(1 + int(rng.expovariate(1.2)), max_genres)
+            links = [
+                GenreTitle(genre_id=genre_id, title_id=pk)
+                for genre_id in set(rng.choices(
+                    self.genre_weights[0],
+                    cum_weights=self.genre_weights[1],
+                    k=genre_count,
+                ))
+            ]
+            # Качество произведения смещено к хорошим оценкам.
+            quality = 1 + 9 * rng.betavariate(5, 2)
+            histogram = {}
+            for author_id in rng.sample(self.users, review_count):
+                if rng.random() < EXTREME_SCORE_SHARE:
+                    score = rng.choice((1, 10))
+                else:
+                    score = min(max(round(rng.gauss(quality, 1.5)), 1), 10)
+                title.rating_sum += score
+                title.rating_count += 1
+                histogram[score] = histogram.get(score, 0) + 1
+                reviewed_at = self.now - REVIEW_PERIOD * rng.random()
+                text = rng.choice(self.texts)
+                comments_count = self.add_comments(
+                    self.next_review_pk, reviewed_at, comments
+                )
+                reviews.append((
+                    self.next_review_pk, pk, author_id, text, score,
+                    str(reviewed_at), comments_count,
+                ))
+                self.next_review_pk += 1
+            title.rating, title.weighted_rating = aggregates.compute_ratings(
+                title.rating_sum, title.rating_count
+            )
+            for link in links:
+                link.rating = title.rating
+                link.weighted_rating = title.weighted_rating
+            titles.append(title)
+            genre_links.extend(links)
+            score_counts.extend(
+                TitleScoreCount(title_id=pk, score=score, count=count)
+                for score, count in histogram.items()
+            )
+
+        with transaction.atomic():
+            Title.objects.bulk_create(titles)
+            GenreTitle.objects.bulk_create(genre_links)
+            TitleScoreCount.objects.bulk_create(score_counts)
+            insert_rows(Review, ('id', 'title', 'author', 'text', 'score',
+                                 'pub_date', 'comments_count'), reviews)
+            insert_rows(Comment, ('id', 'review', 'author', 'text',
+                                  'pub_date'), comments)
+        totals[Title] += len(titles)
+        totals[GenreTitle] += len(genre_links)
+        totals[Review] += len(reviews)
+        totals[Comment] += len(comments)
+
+    def add_comments(self, review_pk, reviewed_at, comments):
+        """
+        Количество комментариев к отзыву с тяжёлым хвостом: у большинства
+        отзывов их нет, обсуждение немногих тянется долго. Возвращает
+        количество добавленных комментариев.
+        """
+        rng = self.rng
+        expected = self.comments_per_review * (rng.paretovariate(2) - 1)
+        count = stochastic_round(rng, expected)
+        for _ in range(count):
+            # pub_date хранится в БД наивным временем UTC.
+            commented_at = reviewed_at + timedelta(
+                hours=rng.expovariate(1 / 48)
+            )
+            comments.append((
+                self.next_comment_pk, review_pk, rng.choice(self.users),
+                rng.choice(self.texts), str(min(commented_at, self.now)),
+            ))
+            self.next_comment_pk += 1
+        return count
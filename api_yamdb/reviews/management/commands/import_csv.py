@@ -1,24 +1,302 @@
 import csv
+import os
+import pickle
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
+from graphlib import TopologicalSorter
+from itertools import islice, zip_longest
+from types import SimpleNamespace
 
-from django.core.management.base import BaseCommand
+import django
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from reviews import aggregates, versions
 from reviews.models import (Category, Comment, CustomUser, Genre, GenreTitle,
                             Review, Title)
 
+DATA_DIR = 'static/data'
+
 DATA_MODEL = {
-    'static/data/users.csv': CustomUser,
-    'static/data/category.csv': Category,
-    'static/data/genre.csv': Genre,
-    'static/data/titles.csv': Title,
-    'static/data/genre_title.csv': GenreTitle,
-    'static/data/review.csv': Review,
-    'static/data/comments.csv': Comment,
+    'users.csv': CustomUser,
+    'category.csv': Category,
+    'genre.csv': Genre,
+    'titles.csv': Title,
+    'genre_title.csv': GenreTitle,
+    'review.csv': Review,
+    'comments.csv': Comment,
+}
+
+# Файлы, которые должны быть записаны в БД раньше данного.
+DEPENDENCIES = {
+    'users.csv': (),
+    'category.csv': (),
+    'genre.csv': (),
+    'titles.csv': ('category.csv',),
+    'genre_title.csv': ('titles.csv', 'genre.csv'),
+    'review.csv': ('titles.csv', 'users.csv'),
+    'comments.csv': ('review.csv', 'users.csv'),
 }
 
+MAX_REPORTED_ERRORS = 10
+
+
+def resolve_columns(model, header):
+    """Сопоставляет колонки csv полям модели: {колонка: (attname, поле)}."""
+    columns = {}
+    for column in header:
+        try:
+            field = model._meta.get_field(column)
+        except FieldDoesNotExist:
+            raise CommandError(
+                f'У модели {model.__name__} нет поля {column}.'
+            )
+        attname = field.attname
+        if field.is_relation:
+            field = field.target_field
+        columns[column] = (attname, field)
+    return columns
+
+
+def convert_row(columns, row):
+    """Приводит значения строки к типам полей: (значения, текст ошибки)."""
+    try:
+        return {
+            attname: field.to_python(row[column])
+            for column, (attname, field) in columns.items()
+        }, None
+    except (ValidationError, ValueError, TypeError) as error:
+        return None, str(error)
+
+
+def read_rows(csv_data, model):
+    """
+    Потоково читает файл и приводит значения к типам полей модели.
+    Выдаёт кортежи (номер строки, значения, текст ошибки).
+    """
+    with open(csv_data, mode='r', encoding='utf-8') as csv_file:
+        reader = csv.DictReader(csv_file)
+        columns = resolve_columns(model, reader.fieldnames)
+        for line, row in enumerate(reader, 1):
+            yield (line, *convert_row(columns, row))
+
+
+def load_relations(model):
+    """Множества id связанных объектов: {attname внешнего ключа: ids}."""
+    return {
+        field.attname: set(
+            field.related_model._default_manager.values_list(
+                'pk', flat=True
+            )
+        )
+        for field in model._meta.concrete_fields
+        if field.is_relation
+    }
+
+
+def check_relations(values, relations):
+    """Текст ошибки, если строка ссылается на отсутствующий объект."""
+    return next((
+        f'{attname}={values[attname]}: связанный объект не найден'
+        for attname, related_ids in relations.items()
+        if attname in values and values[attname] not in related_ids
+    ), None)
+
+
+def insert_fields(model, header):
+    """Поля INSERT; автоматический id без колонки id заполняет БД."""
+    return [
+        field for field in model._meta.concrete_fields
+        if field.column != model._meta.pk.column or 'id' in header
+    ]
+
+
+def insert_sql(model, fields, connection):
+    """INSERT, пропускающий строки с конфликтом уникальности."""
+    ops = connection.ops
+    columns = ', '.join(ops.quote_name(field.column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    return (
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{ops.quote_name(model._meta.db_table)} ({columns}) '
+        f'VALUES ({placeholders}) '
+        f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}'
+    )
+
+
+def dump_relations(directory, model):
+    """
+    Сохраняет множества id связанных объектов во временный файл: задачи
+    передают процессам пула только его путь, а не сами множества.
+    """
+    path = os.path.join(directory, f'{model._meta.label_lower}.pickle')
+    with open(path, 'wb') as relations_file:
+        pickle.dump(load_relations(model), relations_file,
+                    pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+@lru_cache(maxsize=len(DATA_MODEL))
+def read_relations(path):
+    """
+    Процесс читает множества id файла один раз, а не на каждую пачку.
+    Файлы разбираются одновременно, поэтому кешируются множества всех.
+    """
+    with open(path, 'rb') as relations_file:
+        return pickle.load(relations_file)
+
+
+def parse_chunk(model_label, header, first_line, rows, relations_path):
+    """
+    Задача для пула процессов: приводит пачку строк к типам полей,
+    проверяет внешние ключи и готовит параметры INSERT, как bulk_create.
+    Возвращает число строк, отклонённые строки [(номер, ошибка)] и
+    параметры [(id, значения полей)].
+    """
+    model = apps.get_model(model_label)
+    columns = resolve_columns(model, header)
+    fields = insert_fields(model, header)
+    connection = connections[router.db_for_write(model)]
+    relations = read_relations(relations_path)
+    rejected = []
+    params = []
+    for line, row in enumerate(rows, first_line):
+        values, error = convert_row(
+            columns, dict(zip_longest(header, row[:len(header)]))
+        )
+        if error is None:
+            error = check_relations(values, relations)
+        if error is not None:
+            rejected.append((line, error))
+            continue
+        # pre_save читает и пишет только атрибуты полей: экземпляр модели
+        # не нужен, достаточно значений с умолчаниями.
+        obj = SimpleNamespace(**{
+            field.attname: values[field.attname]
+            if field.attname in values else field.get_default()
+            for field in fields
+        })
+        params.append((values.get('id'), tuple(
+            field.get_db_prep_save(field.pre_save(obj, True), connection)
+            for field in fields
+        )))
+    return len(rows), rejected, params
+
+
+def setup_worker():
+    django.setup()
+
+
+class ParallelFile:
+    """
+    Файл csv, пачки которого разбирают процессы пула: потоковое чтение,
+    учёт пачек в работе и запись их результатов.
+    """
+
+    def __init__(self, csv_name, model, csv_file, relations_path,
+                 batch_size):
+        self.csv_name = csv_name
+        self.model = model
+        self.relations_path = relations_path
+        self.batch_size = batch_size
+        self.started = time.perf_counter()
+        self.connection = connections[router.db_for_write(model)]
+        reader = csv.reader(csv_file)
+        self.header = next(reader)
+        # Неизвестные колонки - ошибка до запуска задач.
+        resolve_columns(model, self.header)
+        self.sql = insert_sql(model, insert_fields(model, self.header),
+                              self.connection)
+        # Пустые строки csv.DictReader пропускает, не считая их.
+        self.rows = (row for row in reader if row)
+        self.first_line = 1
+        self.exhausted = False
+        self.in_flight = 0
+        self.existing = set(model.objects.values_list('pk', flat=True))
+        self.count_before = len(self.existing)
+        self.count = self.existing_count = self.rejected = 0
+
+    @property
+    def finished(self):
+        return self.exhausted and not self.in_flight
+
+    def submit_chunk(self, executor):
+        """Отправляет следующую пачку в пул; None, если файл прочитан."""
+        chunk = list(islice(self.rows, self.batch_size))
+        if not chunk:
+            self.exhausted = True
+            return None
+        future = executor.submit(
+            parse_chunk, self.model._meta.label, self.header,
+            self.first_line, chunk, self.relations_path,
+        )
+        self.first_line += len(chunk)
+        self.in_flight += 1
+        return future
+
+    def write(self, result, report_rejected):
+        """Вставляет разобранную пачку, кроме уже загруженных id."""
+        self.in_flight -= 1
+        count, rejected, params = result
+        self.count += count
+        self.rejected += len(rejected)
+        for line, error in rejected:
+            report_rejected(line, self.model, error)
+        batch = []
+        for pk, values in params:
+            if pk in self.existing:
+                self.existing_count += 1
+                continue
+            self.existing.add(pk)
+            batch.append(values)
+        with self.connection.cursor() as cursor:
+            cursor.executemany(self.sql, batch)
+
+    def counts(self):
+        loaded = self.model.objects.count() - self.count_before
+        return self.count, loaded, self.existing_count, self.rejected
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
 
 class Command(BaseCommand):
     """Команда, добавляющая csv данные в БД."""
     help = 'Добавляет csv данные в БД.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir',
+            default=DATA_DIR,
+            help='Папка с csv файлами.',
+        )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Загружать файлы пачками bulk_create, по транзакции '
+                 'на файл.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Число процессов, параллельно разбирающих и '
+                 'проверяющих пачки строк готовых к загрузке файлов '
+                 '(включает режим --bulk, загрузка в одной транзакции).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Размер пачки bulk_create в режиме --bulk и пачки строк, '
+                 'передаваемой процессу, в режиме --workers.',
+        )
+
     def add_row_model(self, row):
         """Добавляет в строку таблицы данные от моделей."""
         try:
@@ -38,8 +316,14 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         """Наполняет модели данными."""
+        if options['bulk'] or options['workers'] > 1:
+            self.handle_bulk(
+                options['data_dir'], options['batch_size'], options['workers']
+            )
+            return
         for r in DATA_MODEL.items():
-            csv_data, model = r
+            csv_name, model = r
+            csv_data = os.path.join(options['data_dir'], csv_name)
             count = 0
             with open(csv_data, mode='r', encoding='utf-8') as csv_file:
                 reader = csv.DictReader(csv_file)
@@ -56,3 +340,153 @@ class Command(BaseCommand):
                                    f'Количество строк: {count}.'
                                    )
             )
+
+    def handle_bulk(self, data_dir, batch_size, workers):
+        """
+        Загружает файлы в порядке графа зависимостей. Без пула - по
+        одному, по транзакции на файл; при workers > 1 - parallel_import.
+        """
+        self.rejected_reported = 0
+        sorter = TopologicalSorter(DEPENDENCIES)
+        sorter.prepare()
+        if workers > 1:
+            self.parallel_import(sorter, data_dir, batch_size, workers)
+        while sorter.is_active():
+            for csv_name in sorter.get_ready():
+                model = DATA_MODEL[csv_name]
+                started = time.perf_counter()
+                with transaction.atomic():
+                    counts = self.bulk_write(
+                        model,
+                        read_rows(os.path.join(data_dir, csv_name), model),
+                        batch_size,
+                    )
+                self.report_loaded(model, *counts,
+                                   time.perf_counter() - started)
+                sorter.done(csv_name)
+        # bulk_create не отправляет сигналы моделей.
+        aggregates.rebuild()
+        versions.bump_version(*versions.RESOURCES)
+
+    def bulk_write(self, model, rows, batch_size):
+        """
+        Проверяет внешние ключи по множествам id, загруженным один раз на
+        файл, и вставляет строки пачками. Возвращает количество строк в
+        файле, загруженных строк, строк с уже существующим id и строк,
+        отклонённых при разборе или проверке внешних ключей. Остальные
+        строки отброшены bulk_create(ignore_conflicts=True) из-за
+        ограничений уникальности.
+        """
+        relations = load_relations(model)
+        existing = set(model.objects.values_list('pk', flat=True))
+        count_before = len(existing)
+        count = existing_count = rejected = 0
+        batch = []
+        for line, values, error in rows:
+            count += 1
+            if error is None:
+                error = check_relations(values, relations)
+            if error is not None:
+                rejected += 1
+                self.report_rejected(line, model, error)
+                continue
+            if values.get('id') in existing:
+                existing_count += 1
+                continue
+            existing.add(values.get('id'))
+            batch.append(model(**values))
+            if len(batch) >= batch_size:
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        loaded = model.objects.count() - count_before
+        return count, loaded, existing_count, rejected
+
+    def parallel_import(self, sorter, data_dir, batch_size, workers):
+        """
+        Строки пачками по batch_size разбирают и проверяют процессы пула,
+        а текущий процесс только отбрасывает уже загруженные id и
+        выполняет INSERT. Все файлы, готовые к загрузке (например,
+        пользователи, категории и жанры), разбираются одновременно: их
+        пачки отправляются в пул по очереди, в работе не больше
+        2 * workers пачек, и результаты записываются в порядке отправки.
+        Записанный файл сразу открывает зависимые от него файлы. Вся
+        загрузка идёт в одной транзакции, поэтому зависимые файлы
+        проверяют внешние ключи по строкам, записанным тем же
+        соединением.
+        """
+        executor = ProcessPoolExecutor(workers, initializer=setup_worker)
+        try:
+            with ExitStack() as stack, transaction.atomic():
+                relations_dir = stack.enter_context(
+                    tempfile.TemporaryDirectory()
+                )
+                active = []
+                pending = deque()
+                while sorter.is_active():
+                    for csv_name in sorter.get_ready():
+                        model = DATA_MODEL[csv_name]
+                        active.append(ParallelFile(
+                            csv_name, model,
+                            stack.enter_context(open(
+                                os.path.join(data_dir, csv_name),
+                                mode='r', encoding='utf-8',
+                            )),
+                            dump_relations(relations_dir, model),
+                            batch_size,
+                        ))
+                    self.submit_chunks(executor, active, pending,
+                                       2 * workers)
+                    if pending:
+                        csv_file, future = pending.popleft()
+                        csv_file.write(future.result(), self.report_rejected)
+                    for csv_file in [csv_file for csv_file in active
+                                     if csv_file.finished]:
+                        active.remove(csv_file)
+                        self.report_loaded(csv_file.model,
+                                           *csv_file.counts(),
+                                           csv_file.elapsed())
+                        sorter.done(csv_file.csv_name)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def submit_chunks(executor, active, pending, limit):
+        """
+        Отправляет в пул пачки активных файлов до limit, по очереди:
+        файл, отправивший пачку, переходит в конец списка.
+        """
+        while len(pending) < limit:
+            reading = [csv_file for csv_file in active
+                       if not csv_file.exhausted]
+            if not reading:
+                return
+            csv_file = reading[0]
+            active.remove(csv_file)
+            active.append(csv_file)
+            future = csv_file.submit_chunk(executor)
+            if future is not None:
+                pending.append((csv_file, future))
+
+    def report_loaded(self, model, count, loaded, existing, rejected,
+                      elapsed):
+        conflicts = count - loaded - existing - rejected
+        self.stdout.write(
+            self.style.SUCCESS(f'Модель {model.__name__} '
+                               f'наполнена данными.\n'
+                               f'Количество строк: {count}, '
+                               f'загружено: {loaded}, '
+                               f'уже в базе: {existing}, '
+                               f'отклонено: {rejected}, '
+                               f'конфликтов уникальности: {conflicts}, '
+                               f'строк в секунду: '
+                               f'{count / max(elapsed, 1e-9):.0f}.'
+                               )
+        )
+
+    def report_rejected(self, line, model, error):
+        self.rejected_reported += 1
+        if self.rejected_reported <= MAX_REPORTED_ERRORS:
+            self.stderr.write(
+                f'{model.__name__}, строка {line}: отклонена ({error}).'
+            )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from reviews import aggregates
+
+
+class Command(BaseCommand):
+    """Команда, пересчитывающая хранимые агрегаты рейтинга с нуля."""
+    help = ('Пересчитывает и проверяет агрегаты рейтинга произведений и '
+            'количество комментариев к отзывам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить агрегаты, ничего не исправляя.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество произведений, сверяемых за один проход.',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Сверяет агрегаты с отзывами и комментариями и исправляет
+        расхождения.
+        """
+        check_only = options['check']
+        mismatched = aggregates.rebuild(
+            fix=not check_only, batch_size=options['batch_size']
+        )
+        if check_only and mismatched:
+            raise CommandError(
+                f'Агрегаты расходятся с отзывами и комментариями у '
+                f'{len(mismatched)} произведений: {mismatched[:20]}'
+            )
+        if mismatched:
+            self.stdout.write(
+                self.style.WARNING(f'Исправлены агрегаты у {len(mismatched)} '
+                                   f'произведений.')
+            )
+        self.stdout.write(self.style.SUCCESS('Агрегаты рейтинга согласованы.'))
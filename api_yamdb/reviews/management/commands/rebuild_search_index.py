@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from reviews import search, versions
+
+
+class Command(BaseCommand):
+    """Команда, перестраивающая полнотекстовый индекс произведений."""
+    help = 'Перестраивает полнотекстовый индекс произведений.'
+
+    def handle(self, *args, **options):
+        """Создаёт недостающие объекты индекса и заполняет его заново."""
+        if not search.is_supported(connection):
+            self.stdout.write(
+                self.style.WARNING('Полнотекстовый индекс поддерживается '
+                                   'только на SQLite.')
+            )
+            return
+        with transaction.atomic():
+            search.install(connection)
+            search.rebuild(connection)
+            # Поиск по перестроенному индексу может вернуть другие
+            # произведения, чем закэшированные ответы.
+            transaction.on_commit(lambda: versions.bump_version("titles"))
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
@@ -0,0 +1,49 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_score_counts(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    TitleScoreCount = apps.get_model('reviews', 'TitleScoreCount')
+    rows = (
+        Review.objects.order_by()
+        .values('title_id', 'score')
+        .annotate(score_count=Count('id'))
+    )
+    TitleScoreCount.objects.bulk_create(
+        (
+            TitleScoreCount(title_id=row['title_id'], score=row['score'],
+                            count=row['score_count'])
+            for row in rows.iterator()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleScoreCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(verbose_name='Оценка')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_counts', to='reviews.title', verbose_name='Произведение')),
+            ],
+            options={
+                'verbose_name': 'Количество оценок',
+                'verbose_name_plural': 'Гистограммы оценок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='titlescorecount',
+            constraint=models.UniqueConstraint(fields=('title', 'score'), name='unique_title_score'),
+        ),
+        migrations.RunPython(fill_score_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def compute_ratings(score_sum, score_count):
+    """Копия reviews.aggregates.compute_ratings на момент миграции."""
+    prior_mean = getattr(settings, 'RATING_PRIOR_MEAN', 7.0)
+    prior_weight = getattr(settings, 'RATING_PRIOR_WEIGHT', 10)
+    return (
+        score_sum / score_count,
+        (score_sum + prior_weight * prior_mean)
+        / (score_count + prior_weight),
+    )
+
+
+def fill_ratings(apps, schema_editor):
+    Title = apps.get_model('reviews', 'Title')
+    titles = list(
+        Title.objects.filter(rating_count__gt=0)
+        .only('pk', 'rating_sum', 'rating_count')
+    )
+    for title in titles:
+        title.rating, title.weighted_rating = compute_ratings(
+            title.rating_sum, title.rating_count
+        )
+    Title.objects.bulk_update(
+        titles, ('rating', 'weighted_rating'), batch_size=1000
+    )
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    for field in ('rating', 'weighted_rating'):
+        GenreTitle.objects.update(**{field: Subquery(
+            Title.objects.filter(pk=OuterRef('title_id')).values(field)
+        )})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_titlescorecount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.FloatField(editable=False, null=True, verbose_name='Средняя оценка'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='weighted_rating',
+            field=models.FloatField(editable=False, null=True, verbose_name='Байесовская оценка'),
+        ),
+        migrations.AddField(
+            model_name='genretitle',
+            name='rating',
+            field=models.FloatField(editable=False, null=True, verbose_name='Средняя оценка'),
+        ),
+        migrations.AddField(
+            model_name='genretitle',
+            name='weighted_rating',
+            field=models.FloatField(editable=False, null=True, verbose_name='Байесовская оценка'),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['rating', 'id'], name='title_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['weighted_rating', 'id'], name='title_weighted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'rating', 'id'], name='title_category_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['category', 'weighted_rating', 'id'], name='title_category_weighted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genretitle',
+            index=models.Index(fields=['genre', 'rating', 'id'], name='genre_title_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='genretitle',
+            index=models.Index(fields=['genre', 'weighted_rating', 'id'], name='genre_title_weighted_idx'),
+        ),
+    ]
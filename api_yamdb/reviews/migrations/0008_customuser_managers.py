@@ -0,0 +1,18 @@
+import reviews.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_review_comments_count'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', reviews.models.CustomUserManager()),
+            ],
+        ),
+    ]
@@ -1,9 +1,9 @@
 import uuid
 
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import (MaxValueValidator, MinValueValidator,
                                     RegexValidator)
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 from api_yamdb.settings import SLUG_REGEX
@@ -11,8 +11,67 @@ from api_yamdb.settings import SLUG_REGEX
 from .constants import Role
 
 
-class CustomUser(AbstractUser):
+class StoredCountersMixin(models.Model):
+    """
+    Счётчики из counter_fields меняет только reviews.aggregates запросами
+    UPDATE с F(); save() существующего объекта их не перезаписывает,
+    иначе устаревшее значение в памяти затрёт параллельное изменение.
+    """
+
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get("update_fields") is None
+                and not kwargs.get("force_insert")):
+            skipped = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+                and field.name not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class BatchedDeleteQuerySet(models.QuerySet):
+    def delete(self):
+        from .aggregates import batched_deltas
+
+        with batched_deltas():
+            return super().delete()
+
+
+class BatchedDeleteMixin(models.Model):
+    """
+    Удаление объекта или queryset применяет сдвиги агрегатов всего
+    каскада одним пакетом (reviews.aggregates.batched_deltas), а не для
+    каждой удаляемой строки.
+    """
+
+    objects = BatchedDeleteQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def delete(self, *args, **kwargs):
+        from .aggregates import batched_deltas
+
+        with batched_deltas():
+            return super().delete(*args, **kwargs)
+
+
+class CustomUserManager(UserManager.from_queryset(BatchedDeleteQuerySet)):
+    pass
+
+
+class CustomUser(BatchedDeleteMixin, AbstractUser):
     """Кастомный юзер с пользовательской ролью .constants.Role."""
+
+    objects = CustomUserManager()
+
     role = models.CharField(
         verbose_name="Пользовательская роль",
         max_length=50,
@@ -101,9 +160,13 @@ class Category(models.Model):
         return self.name
 
 
-class Title(models.Model):
+class Title(BatchedDeleteMixin, StoredCountersMixin, models.Model):
     """Произведение: название, год выпуска, описание, категория и жанр."""
 
+    counter_fields = (
+        "rating_sum", "rating_count", "rating", "weighted_rating",
+    )
+
     name = models.CharField(
         max_length=256, verbose_name="Название произведения"
     )
@@ -134,9 +197,37 @@ class Title(models.Model):
         related_name='titles',
         verbose_name='Жанр произведения'
     )
+    rating_sum = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Сумма оценок"
+    )
+    # Оценка у отзыва обязательна, поэтому это и количество отзывов.
+    rating_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество оценок"
+    )
+    # Хранятся вместе с rating_sum и rating_count (reviews.aggregates),
+    # чтобы сортировать по индексам; NULL - у произведения нет отзывов.
+    rating = models.FloatField(
+        null=True, editable=False, verbose_name="Средняя оценка"
+    )
+    weighted_rating = models.FloatField(
+        null=True, editable=False, verbose_name="Байесовская оценка"
+    )
 
     class Meta:
         ordering = ("name",)
+        indexes = (
+            models.Index(fields=("name", "id"), name="title_name_idx"),
+            models.Index(fields=("year", "id"), name="title_year_idx"),
+            models.Index(fields=("category", "year", "id"),
+                         name="title_category_year_idx"),
+            models.Index(fields=("rating", "id"), name="title_rating_idx"),
+            models.Index(fields=("weighted_rating", "id"),
+                         name="title_weighted_idx"),
+            models.Index(fields=("category", "rating", "id"),
+                         name="title_category_rating_idx"),
+            models.Index(fields=("category", "weighted_rating", "id"),
+                         name="title_category_weighted_idx"),
+        )
         verbose_name = "Произведение"
         verbose_name_plural = "Произведения"
 
@@ -157,6 +248,13 @@ class GenreTitle(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Произведение'
     )
+    # Копии оценок произведения для рейтинга лучших в жанре.
+    rating = models.FloatField(
+        null=True, editable=False, verbose_name='Средняя оценка'
+    )
+    weighted_rating = models.FloatField(
+        null=True, editable=False, verbose_name='Байесовская оценка'
+    )
 
     class Meta:
         constraints = (
@@ -165,6 +263,12 @@ class GenreTitle(models.Model):
                 name='unique_genre_title'
             ),
         )
+        indexes = (
+            models.Index(fields=('genre', 'rating', 'id'),
+                         name='genre_title_rating_idx'),
+            models.Index(fields=('genre', 'weighted_rating', 'id'),
+                         name='genre_title_weighted_idx'),
+        )
         verbose_name = 'Связь жанра с произведением'
         verbose_name_plural = 'Связь жанров с произведениями'
 
@@ -172,9 +276,11 @@ class GenreTitle(models.Model):
         return f'Жанр {self.title} - {self.genre}.'
 
 
-class Review(models.Model):
+class Review(BatchedDeleteMixin, StoredCountersMixin, models.Model):
     """Отзыв пользователя о произведении с возможностью оценки от 1 до 10."""
 
+    counter_fields = ("comments_count",)
+
     title = models.ForeignKey(
         Title,
         verbose_name="Название произведения",
@@ -200,18 +306,78 @@ class Review(models.Model):
     pub_date = models.DateTimeField(
         verbose_name="Дата публикации", auto_now_add=True, db_index=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество комментариев"
+    )
 
     class Meta:
         verbose_name = "Отзыв"
         verbose_name_plural = "Отзывы"
         ordering = ("pub_date",)
+        indexes = (
+            models.Index(fields=("title", "pub_date", "id"),
+                         name="review_title_pub_date_idx"),
+        )
         constraints = (
             models.UniqueConstraint(fields=["title", "author"],
                                     name="unique_review"),
         )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает сохранённые оценку и произведение для агрегатов."""
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_state()
+        return instance
+
+    def remember_loaded_state(self):
+        self._loaded_score = self.__dict__.get("score")
+        self._loaded_title_id = self.__dict__.get("title_id")
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет отзыв и агрегаты произведения в одной транзакции.
+        Сдвиг агрегатов считается от оценки, сохранённой в БД на момент
+        записи, а не загруженной в память: иначе два параллельных
+        изменения одного отзыва сдвинули бы сумму оценок дважды.
+        """
+        with transaction.atomic(using=kwargs.get("using")):
+            if not self._state.adding:
+                stored = type(self).objects.select_for_update().filter(
+                    pk=self.pk
+                ).values_list("title_id", "score").first()
+                if stored is not None:
+                    self._loaded_title_id, self._loaded_score = stored
+            super().save(*args, **kwargs)
+
+
+class TitleScoreCount(models.Model):
+    """Количество отзывов произведения с данной оценкой."""
 
-class Comment(models.Model):
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name="score_counts",
+        verbose_name="Произведение",
+    )
+    score = models.PositiveSmallIntegerField(verbose_name="Оценка")
+    count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество отзывов"
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=("title", "score"),
+                                    name="unique_title_score"),
+        )
+        verbose_name = "Количество оценок"
+        verbose_name_plural = "Гистограммы оценок"
+
+    def __str__(self):
+        return f"{self.title_id}: {self.score} x {self.count}"
+
+
+class Comment(BatchedDeleteMixin, models.Model):
     """Комментарий пользователя к отзыву."""
 
     review = models.ForeignKey(
@@ -237,3 +403,22 @@ class Comment(models.Model):
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
         ordering = ("pub_date",)
+        indexes = (
+            models.Index(fields=("review", "pub_date", "id"),
+                         name="comment_review_pub_date_idx"),
+        )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает сохранённый отзыв для счётчика комментариев."""
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_state()
+        return instance
+
+    def remember_loaded_state(self):
+        self._loaded_review_id = self.__dict__.get("review_id")
+
+    def save(self, *args, **kwargs):
+        """Сохраняет комментарий и счётчик отзыва в одной транзакции."""
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
@@ -0,0 +1,153 @@
+"""
+Полнотекстовый поиск по названию и описанию произведений.
+
+На SQLite используется внешняя FTS5-таблица над reviews_title, которую
+синхронизируют триггеры, поэтому индекс обновляется при любой записи,
+включая bulk_create и import_csv. Пересоздание reviews_title миграциями
+удаляет триггеры, поэтому install() идемпотентна и вызывается после
+каждого migrate.
+
+Выдача содержит все совпадения, но bm25 считается только для
+кандидатов: всех совпадений в названии и SEARCH_MAX_CANDIDATES самых
+новых совпадений. Остальные совпадения (только в описании) идут после
+ранжированных в порядке id, поэтому частый запрос не теряет сильные
+совпадения, а его стоимость растёт с числом совпадений, а не с числом
+вызовов bm25.
+
+На остальных бэкендах индекса нет: поиск сводится к icontains, то есть
+к полному просмотру таблицы произведений.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+FTS_TABLE = "reviews_title_fts"
+# Вес совпадений в названии относительно совпадений в описании.
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+INSTALL_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description,
+        content='reviews_title', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai
+    AFTER INSERT ON reviews_title BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad
+    AFTER DELETE ON reviews_title BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF name, description ON reviews_title BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+)
+TRIGGERS = (f"{FTS_TABLE}_ai", f"{FTS_TABLE}_ad", f"{FTS_TABLE}_au")
+
+
+def is_supported(connection=default_connection):
+    return connection.vendor == "sqlite"
+
+
+def install(connection=default_connection):
+    """
+    Создаёт FTS-таблицу и триггеры, если их нет. Если триггеры пропали,
+    индекс мог отстать от таблицы, и он перестраивается.
+    """
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master "
+            "WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+            TRIGGERS,
+        )
+        if cursor.fetchone()[0] == len(TRIGGERS):
+            return
+        for statement in INSTALL_SQL:
+            cursor.execute(statement)
+    rebuild(connection)
+
+
+def rebuild(connection=default_connection):
+    """Перестраивает индекс по текущему содержимому reviews_title."""
+    if not is_supported(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+def to_match_query(text):
+    """Экранирует слова запроса; последнее слово ищется как префикс."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search_titles(queryset, text):
+    """Фильтрует произведения по запросу и сортирует по релевантности."""
+    if not is_supported(connection=default_connection):
+        return fallback_search(queryset, text)
+    match = to_match_query(text)
+    if match is None:
+        return queryset.none()
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f"{FTS_TABLE}.rowid = reviews_title.id",
+            f"{FTS_TABLE} MATCH %s",
+        ],
+        params=[match],
+        select={
+            # Кандидаты: совпадения в названии и SEARCH_MAX_CANDIDATES
+            # новейших совпадений (порог - rowid самого старого из них,
+            # NULL, если совпадений меньше). Остальные совпадения
+            # получают ранг 0 и идут после ранжированных.
+            "search_rank": f"CASE WHEN {FTS_TABLE}.rowid IN ("
+                           f"SELECT rowid FROM {FTS_TABLE} "
+                           f"WHERE {FTS_TABLE} MATCH %s) "
+                           f"OR {FTS_TABLE}.rowid >= COALESCE(("
+                           f"SELECT rowid FROM {FTS_TABLE} "
+                           f"WHERE {FTS_TABLE} MATCH %s "
+                           f"ORDER BY rowid DESC LIMIT 1 OFFSET %s), 0) "
+                           f"THEN bm25({FTS_TABLE}, {NAME_WEIGHT}, "
+                           f"{DESCRIPTION_WEIGHT}) ELSE 0 END",
+        },
+        select_params=[f"{{name}} : ({match})", match,
+                       settings.SEARCH_MAX_CANDIDATES - 1],
+    ).order_by("search_rank", "id")
+
+
+def fallback_search(queryset, text):
+    return queryset.filter(
+        Q(name__icontains=text) | Q(description__icontains=text)
+    ).annotate(
+        search_rank=Case(
+            When(name__icontains=text, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by("search_rank", "id")
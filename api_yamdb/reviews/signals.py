@@ -0,0 +1,163 @@
+from django.apps import apps
+from django.db import connections, transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete)
+from django.dispatch import receiver
+
+from . import aggregates, search, versions
+from .models import Comment, CustomUser, GenreTitle, Review, Title
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_review_save(sender, instance, created, raw, **kwargs):
+    """Поддерживает агрегаты рейтинга при создании и изменении отзыва."""
+    if raw:
+        return
+    if created:
+        aggregates.apply_review_delta(instance.title_id, instance.score, 1)
+        aggregates.apply_score_deltas({
+            (instance.title_id, instance.score): 1,
+        })
+    elif getattr(instance, "_loaded_title_id", None) is None:
+        # Прежнее состояние отзыва неизвестно - пересчитываем произведение.
+        aggregates.rebuild(title_ids=[instance.title_id])
+    elif instance._loaded_title_id != instance.title_id:
+        aggregates.apply_review_delta(
+            instance._loaded_title_id, -instance._loaded_score, -1
+        )
+        aggregates.apply_review_delta(instance.title_id, instance.score, 1)
+        aggregates.apply_score_deltas({
+            (instance._loaded_title_id, instance._loaded_score): -1,
+            (instance.title_id, instance.score): 1,
+        })
+    elif instance._loaded_score != instance.score:
+        aggregates.apply_review_delta(
+            instance.title_id, instance.score - instance._loaded_score, 0
+        )
+        aggregates.apply_score_deltas({
+            (instance.title_id, instance._loaded_score): -1,
+            (instance.title_id, instance.score): 1,
+        })
+    instance.remember_loaded_state()
+
+
+@receiver(pre_delete, sender=Title)
+@receiver(pre_delete, sender=Review)
+def skip_deltas_of_deleted_parent(sender, instance, **kwargs):
+    """
+    Агрегаты удаляемых произведения и отзыва не обновляются при
+    каскадном удалении их отзывов и комментариев.
+    """
+    batch = aggregates.current_batch()
+    if batch is None:
+        return
+    if sender is Title:
+        batch.deleted_titles.add(instance.pk)
+    else:
+        batch.deleted_reviews.add(instance.pk)
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_review_delete(sender, instance, **kwargs):
+    """
+    Вычитает удалённый отзыв, в том числе при каскадном удалении; внутри
+    aggregates.batched_deltas сдвиги применяются одним пакетом.
+    """
+    aggregates.apply_review_delta(instance.title_id, -instance.score, -1)
+    aggregates.apply_score_deltas({(instance.title_id, instance.score): -1})
+
+
+@receiver(post_save, sender=Comment)
+def update_count_on_comment_save(sender, instance, created, raw, **kwargs):
+    """Поддерживает количество комментариев к отзыву."""
+    if raw:
+        return
+    if created:
+        aggregates.apply_comment_delta(instance.review_id, 1)
+    elif getattr(instance, "_loaded_review_id", None) is None:
+        aggregates.rebuild(title_ids=Review.objects.filter(
+            pk=instance.review_id
+        ).values("title_id"))
+    elif instance._loaded_review_id != instance.review_id:
+        aggregates.apply_comment_delta(instance._loaded_review_id, -1)
+        aggregates.apply_comment_delta(instance.review_id, 1)
+    instance.remember_loaded_state()
+
+
+@receiver(post_delete, sender=Comment)
+def update_count_on_comment_delete(sender, instance, **kwargs):
+    """
+    Вычитает удалённый комментарий, в том числе при каскадном удалении
+    пользователя.
+    """
+    aggregates.apply_comment_delta(instance.review_id, -1)
+
+
+def bump_versions_after_commit(model):
+    """Версия меняется после фиксации транзакции, чтобы параллельный
+    запрос не закэшировал под новой версией ещё старые данные."""
+    transaction.on_commit(lambda: versions.bump_model_versions(model))
+
+
+def bump_versions_on_save(sender, update_fields=None, **kwargs):
+    """Обновление одного last_login при входе не меняет ответы API."""
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    bump_versions_after_commit(sender)
+
+
+def bump_versions_on_delete(sender, **kwargs):
+    bump_versions_after_commit(sender)
+
+
+for label in versions.MODEL_RESOURCES:
+    model = apps.get_model(label)
+    post_save.connect(bump_versions_on_save, sender=model)
+    post_delete.connect(bump_versions_on_delete, sender=model)
+
+
+@receiver(post_save, sender=CustomUser)
+def revoke_claims_on_user_save(sender, instance, created, update_fields=None,
+                               **kwargs):
+    """Роль, is_staff и is_active в выданных токенах могли устареть."""
+    if created or (update_fields and set(update_fields) <= {"last_login"}):
+        return
+    versions.revoke_claims(instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser)
+def revoke_claims_on_user_delete(sender, instance, **kwargs):
+    versions.revoke_claims(instance.pk)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_versions_on_genre_change(sender, action, **kwargs):
+    if action.startswith("post_"):
+        bump_versions_after_commit(sender)
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def copy_ratings_to_genre_links(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Новые связи с жанрами получают оценки произведения."""
+    if action == "post_add" and pk_set:
+        aggregates.sync_genre_ratings(pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=GenreTitle)
+def copy_ratings_to_genre_link(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        aggregates.sync_genre_ratings([instance.title_id])
+
+
+@receiver(post_migrate)
+def bump_versions_on_migrate(sender, **kwargs):
+    """flush и migrate меняют данные в обход моделей."""
+    versions.bump_version(*versions.RESOURCES)
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    """Пересоздание reviews_title миграцией удаляет триггеры индекса."""
+    if sender.name == "reviews":
+        search.install(connections[using])
@@ -1,4 +1,103 @@
-from django.core.mail import send_mail
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import NotSupportedError, connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueue:
+    """
+    Очередь писем с фоновой отправкой. Поток-отправитель забирает из
+    очереди пачку писем и отправляет её через одно соединение почтового
+    бэкенда; при ошибке неотправленная часть пачки повторяется с
+    экспоненциальной задержкой.
+    """
+
+    def __init__(self, batch_size=50, max_retries=5, retry_backoff=1.0):
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def put(self, message):
+        self._ensure_sender()
+        self._queue.put(message)
+
+    def depth(self):
+        """Количество писем, ещё не переданных почтовому бэкенду."""
+        return self._queue.unfinished_tasks
+
+    def flush(self, timeout=None):
+        """Ждёт отправки всех писем; False, если время ожидания вышло."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _ensure_sender(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="mail-queue", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._send_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _send_batch(self, batch):
+        sent = 0
+        for attempt in range(self.max_retries + 1):
+            try:
+                with get_connection(fail_silently=False) as connection:
+                    # Письма уходят по одному через общее соединение:
+                    # после ошибки повторяются только неотправленные,
+                    # и доставленные письма не приходят дважды.
+                    while sent < len(batch):
+                        connection.send_messages(batch[sent:sent + 1])
+                        sent += 1
+                return
+            except Exception:
+                if attempt == self.max_retries:
+                    logger.exception(
+                        "Не удалось отправить %s писем после %s попыток",
+                        len(batch) - sent, attempt + 1,
+                    )
+                    return
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+
+mail_queue = MailQueue(
+    batch_size=settings.EMAIL_QUEUE_BATCH_SIZE,
+    max_retries=settings.EMAIL_QUEUE_MAX_RETRIES,
+    retry_backoff=settings.EMAIL_QUEUE_RETRY_BACKOFF,
+)
+atexit.register(mail_queue.flush, timeout=5)
 
 
 class Util:
@@ -6,9 +105,38 @@ class Util:
     def send_mail(address, confirmation_code):
         """Метод отправки email сообщений."""
 
-        send_mail(
+        message = EmailMessage(
             "YAmdb confirmation code",
-            confirmation_code,
+            str(confirmation_code),
             "yamdb@yandex.ru",
             [address]
         )
+        if settings.EMAIL_ASYNC:
+            mail_queue.put(message)
+        else:
+            message.send()
+
+
+def bulk_create_returning(model, objs, batch_size=None):
+    """
+    bulk_create, заполняющий pk объектов и на SQLite, где Django 3.2 не
+    получает id вставленных строк.
+    """
+    connection = connections[router.db_for_write(model)]
+    manager = model.objects.db_manager(connection.alias)
+    if connection.features.can_return_rows_from_bulk_insert:
+        return manager.bulk_create(objs, batch_size)
+    if connection.vendor != "sqlite":
+        raise NotSupportedError(
+            f"{connection.vendor} не возвращает id из bulk_create."
+        )
+    with transaction.atomic(using=connection.alias):
+        # После первой вставки транзакция держит блокировку записи SQLite,
+        # поэтому строки получают последние id подряд и по порядку.
+        manager.bulk_create(objs, batch_size)
+        pks = list(manager.order_by("-pk").values_list(
+            "pk", flat=True
+        )[:len(objs)])
+        for obj, pk in zip(objs, reversed(pks)):
+            obj.pk = pk
+    return objs
@@ -0,0 +1,105 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = "resource-version:{}"
+MODIFIED_KEY = "resource-modified:{}"
+CLAIMS_REVOKED_KEY = "claims-revoked:{}"
+
+# Ресурсы API, содержимое которых зависит от изменений модели.
+MODEL_RESOURCES = {
+    "reviews.Title": ("titles",),
+    "reviews.GenreTitle": ("titles",),
+    "reviews.Genre": ("genres", "titles"),
+    "reviews.Category": ("categories", "titles"),
+    "reviews.Review": ("reviews", "titles"),
+    "reviews.Comment": ("comments", "reviews"),
+    "reviews.CustomUser": ("users", "reviews", "comments"),
+}
+
+RESOURCES = tuple(sorted({
+    resource
+    for resources in MODEL_RESOURCES.values()
+    for resource in resources
+}))
+
+
+def initial_version():
+    """Начальная версия уникальна во времени: вытесненный из кэша счётчик
+    не вернётся к значению, под которым уже сохранялись ответы."""
+    return int(time.time() * 1000)
+
+
+def get_version(resource):
+    key = VERSION_KEY.format(resource)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(resources):
+    keys = {VERSION_KEY.format(resource): resource for resource in resources}
+    versions = cache.get_many(keys)
+    return tuple(
+        versions.get(key) or get_version(resource)
+        for key, resource in keys.items()
+    )
+
+
+def get_last_modified(resources):
+    """
+    Время последнего изменения ресурсов (unix time). Если отметка
+    вытеснена из кэша, ресурс считается изменённым сейчас.
+    """
+    keys = [MODIFIED_KEY.format(resource) for resource in resources]
+    stored = cache.get_many(keys)
+    now = int(time.time())
+    for key in keys:
+        if key not in stored:
+            cache.add(key, now, timeout=None)
+            stored[key] = now
+    return max(stored.values())
+
+
+def bump_version(*resources):
+    """
+    Сбрасывает закэшированные представления перечисленных ресурсов.
+    Время изменения записывается до версии: прочитавший новую версию
+    увидит и новое время, по которому api.replica решает, могла ли
+    реплика отстать.
+    """
+    now = int(time.time())
+    cache.set_many(
+        {MODIFIED_KEY.format(resource): now for resource in resources},
+        timeout=None,
+    )
+    for resource in resources:
+        key = VERSION_KEY.format(resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, initial_version(), timeout=None)
+
+
+def bump_model_versions(model):
+    bump_version(*MODEL_RESOURCES.get(model._meta.label, ()))
+
+
+def revoke_claims(user_id):
+    """
+    Токены пользователя, выданные до этого момента, перестают доверять
+    своим claims. Отметка нужна не дольше JWT_CLAIMS_TTL: более старым
+    claims аутентификация не доверяет и так.
+    """
+    cache.set(
+        CLAIMS_REVOKED_KEY.format(user_id),
+        time.time(),
+        timeout=settings.JWT_CLAIMS_TTL,
+    )
+
+
+def get_claims_revoked_at(user_id):
+    return cache.get(CLAIMS_REVOKED_KEY.format(user_id))
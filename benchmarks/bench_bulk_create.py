@@ -0,0 +1,76 @@
+"""
+Создание произведений: по одному POST /api/v1/titles/ на произведение
+против одного POST /api/v1/titles/bulk/ со всем пакетом.
+
+    python benchmarks/bench_bulk_create.py --titles 10000
+"""
+import argparse
+import time
+
+from common import print_table, setup_django, test_database
+
+
+def make_items(count, genres):
+    return [
+        {
+            "name": f"Произведение {number:07d}",
+            "year": 2000,
+            "genre": [f"genre-{number % genres + 1}",
+                      f"genre-{(number + 1) % genres + 1}"],
+            "category": "films",
+        }
+        for number in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=10000)
+    parser.add_argument(
+        "--single", type=int, default=500,
+        help="сколько произведений создать по одному запросу на каждое",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from reviews.models import Category, CustomUser, Genre
+
+    rows = []
+    with test_database():
+        Category.objects.create(name="Фильмы", slug="films")
+        Genre.objects.bulk_create(
+            Genre(name=f"Жанр {pk}", slug=f"genre-{pk}")
+            for pk in range(1, 31)
+        )
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_user(
+            username="bench", email="bench@yamdb.fake", role="admin"
+        ))
+
+        items = make_items(args.single, 30)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            for item in items:
+                client.post("/api/v1/titles/", data=item, format="json")
+            seconds = time.perf_counter() - started
+        rows.append(("по одному", len(items), len(context),
+                     f"{seconds:.2f}", f"{len(items) / seconds:.0f}"))
+
+        items = make_items(args.titles, 30)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = client.post(
+                "/api/v1/titles/bulk/", data=items, format="json"
+            )
+            seconds = time.perf_counter() - started
+        assert response.status_code == 201, response.content[:500]
+        rows.append(("пакетом", len(items), len(context),
+                     f"{seconds:.2f}", f"{len(items) / seconds:.0f}"))
+    print_table(("запросы", "произведений", "SQL", "с", "в секунду"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+"""
+Замер всех маршрутов API на синтетических данных фиксированного размера:
+p50/p95 времени ответа, SQL-запросы на запрос и пик выделенной памяти.
+
+Запросы идут через тестовый клиент Django со всеми middleware и
+настоящей JWT-аутентификацией. Результаты сравниваются с сохранённым
+базовым замером; при регрессии скрипт завершается с кодом 1. Если
+версии Python, Django или SQLite отличаются от базового замера,
+сравнивается только число SQL-запросов.
+
+    python benchmarks/bench_endpoints.py --output endpoints.json
+    python benchmarks/bench_endpoints.py --save-baseline
+"""
+import argparse
+import io
+import json
+import platform
+import sqlite3
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from pathlib import Path
+from urllib.parse import quote
+
+from common import print_table, setup_django, test_database
+
+BASELINE = Path(__file__).resolve().parent / "baselines" / "endpoints.json"
+DATASET = {
+    "users": 2000,
+    "categories": 10,
+    "genres": 50,
+    "titles": 5000,
+    "reviews": 100000,
+    "comments": 30000,
+    "seed": 1,
+}
+
+# Элементов в одном запросе пакетного создания.
+BULK_SIZE = 20
+# Поля meta, от которых зависят время и память: при расхождении с
+# базовым замером они не сравниваются.
+ENVIRONMENT = ("python_implementation", "python", "django", "sqlite",
+               "machine")
+
+# client - от чьего имени идёт запрос: anon, user или admin.
+Route = namedtuple("Route", "name client method path data status")
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * share), len(ordered) - 1)]
+
+
+def build_routes(fixture):
+    """
+    Маршруты из api/urls.py; path и data получают номер повтора. Изменения
+    идут после чтений, а удаления - последними и в таком порядке, чтобы
+    каскад не удалил объекты следующих маршрутов.
+    """
+    title = fixture["title"]
+    review = fixture["review"]
+    comment = fixture["comment"]
+    titles_url = "/api/v1/titles/"
+    reviews_url = f"{titles_url}{title}/reviews/"
+    comments_url = f"{reviews_url}{review}/comments/"
+
+    def fixed(path):
+        return lambda i: path
+
+    def no_data(i):
+        return None
+
+    return (
+        Route("titles-list", "user", "get", fixed(titles_url), no_data, 200),
+        Route("titles-list-anon", "anon", "get", fixed(titles_url), no_data,
+              200),
+        Route("titles-list-cursor", "user", "get",
+              fixed(f"{titles_url}?pagination=cursor"), no_data, 200),
+        Route("titles-ordering", "user", "get",
+              fixed(f'{titles_url}?ordering=-year'
+                    f'&category={fixture["category"]}'), no_data, 200),
+        Route("titles-detail", "user", "get", fixed(f"{titles_url}{title}/"),
+              no_data, 200),
+        Route("titles-filter", "user", "get",
+              fixed(f'{titles_url}?genre={fixture["genre"]}'
+                    f'&category={fixture["category"]}'), no_data, 200),
+        Route("titles-search", "user", "get",
+              fixed(f'{titles_url}?search={quote("сюжет")}'), no_data, 200),
+        Route("titles-top", "user", "get", fixed(f"{titles_url}top/"),
+              no_data, 200),
+        Route("titles-top-genre", "user", "get",
+              fixed(f'{titles_url}top/?genre={fixture["genre"]}'
+                    f'&rank=weighted&min_reviews=5'), no_data, 200),
+        Route("titles-stats", "user", "get",
+              fixed(f"{titles_url}{title}/stats/"), no_data, 200),
+        Route("titles-stats-batch", "user", "get",
+              fixed(f'{titles_url}stats/?ids='
+                    f'{",".join(map(str, fixture["new_titles"][:50]))}'),
+              no_data, 200),
+        Route("titles-create", "admin", "post", fixed(titles_url),
+              lambda i: {"name": f"Замер {i}", "year": 2000,
+                         "genre": [fixture["genre"]],
+                         "category": fixture["category"]}, 201),
+        Route("titles-bulk", "admin", "post", fixed(f"{titles_url}bulk/"),
+              lambda i: [{"name": f"Пакет {i}-{number}", "year": 2000,
+                          "genre": [fixture["genre"]],
+                          "category": fixture["category"]}
+                         for number in range(BULK_SIZE)], 201),
+        Route("genres-list", "user", "get", fixed("/api/v1/genres/"),
+              no_data, 200),
+        Route("genres-create", "admin", "post", fixed("/api/v1/genres/"),
+              lambda i: {"name": f"Замер {i}", "slug": f"bench-{i}"}, 201),
+        Route("categories-list", "user", "get", fixed("/api/v1/categories/"),
+              no_data, 200),
+        Route("categories-create", "admin", "post",
+              fixed("/api/v1/categories/"),
+              lambda i: {"name": f"Замер {i}", "slug": f"bench-{i}"}, 201),
+        Route("reviews-list", "user", "get", fixed(reviews_url), no_data,
+              200),
+        Route("reviews-detail", "user", "get",
+              fixed(f"{reviews_url}{review}/"), no_data, 200),
+        Route("reviews-create", "user", "post",
+              lambda i: f'{titles_url}{fixture["new_titles"][i]}/reviews/',
+              lambda i: {"text": "Замер", "score": i % 10 + 1}, 201),
+        Route("reviews-bulk", "admin", "post",
+              lambda i: f'{titles_url}{fixture["new_titles"][i]}/reviews/'
+                        f'bulk/',
+              lambda i: [{"text": "Замер", "score": number % 10 + 1,
+                          "author": author}
+                         for number, author in enumerate(
+                             fixture["bulk_authors"])], 201),
+        Route("comments-list", "user", "get", fixed(comments_url), no_data,
+              200),
+        Route("comments-detail", "user", "get",
+              fixed(f"{comments_url}{comment}/"), no_data, 200),
+        Route("comments-create", "user", "post", fixed(comments_url),
+              lambda i: {"text": f"Замер {i}"}, 201),
+        Route("users-list", "admin", "get", fixed("/api/v1/users/"),
+              no_data, 200),
+        Route("users-detail", "admin", "get",
+              fixed(f'/api/v1/users/{fixture["username"]}/'), no_data, 200),
+        Route("users-me", "user", "get", fixed("/api/v1/users/me/"),
+              no_data, 200),
+        Route("users-create", "admin", "post", fixed("/api/v1/users/"),
+              lambda i: {"username": f"bench_user_{i}",
+                         "email": f"bench_user_{i}@yamdb.fake"}, 201),
+        Route("auth-signup", "anon", "post", fixed("/api/v1/auth/signup/"),
+              lambda i: {"username": f"bench_signup_{i}",
+                         "email": f"bench_signup_{i}@yamdb.fake"}, 200),
+        Route("auth-token", "anon", "post", fixed("/api/v1/auth/token/"),
+              lambda i: {"username": fixture["username"],
+                         "confirmation_code": fixture["code"]}, 200),
+        Route("titles-update", "admin", "patch",
+              fixed(f"{titles_url}{title}/"),
+              lambda i: {"name": f"Замер {i}",
+                         "genre": [fixture["genres"][i % 2]]}, 200),
+        Route("reviews-update", "user", "patch",
+              fixed(f'{reviews_url}{fixture["user_review"]}/'),
+              lambda i: {"score": i % 10 + 1}, 200),
+        Route("comments-update", "user", "patch",
+              fixed(f'{comments_url}{fixture["user_comment"]}/'),
+              lambda i: {"text": f"Замер {i}"}, 200),
+        Route("users-update", "admin", "patch",
+              fixed(f'/api/v1/users/{fixture["other_username"]}/'),
+              lambda i: {"bio": f"Замер {i}"}, 200),
+        # Меняет пользователя клиента user: дальше он не используется.
+        Route("users-me-update", "user", "patch", fixed("/api/v1/users/me/"),
+              lambda i: {"bio": f"Замер {i}"}, 200),
+        Route("comments-delete", "admin", "delete",
+              lambda i: "{}{}/reviews/{}/comments/{}/".format(
+                  titles_url, *fixture["delete_comments"][i]
+              ), no_data, 204),
+        Route("reviews-delete", "admin", "delete",
+              lambda i: "{}{}/reviews/{}/".format(
+                  titles_url, *fixture["delete_reviews"][i]
+              ), no_data, 204),
+        Route("titles-delete", "admin", "delete",
+              lambda i: f'{titles_url}{fixture["delete_titles"][i]}/',
+              no_data, 204),
+        Route("genres-delete", "admin", "delete",
+              lambda i: f'/api/v1/genres/{fixture["delete_genres"][i]}/',
+              no_data, 204),
+        Route("categories-delete", "admin", "delete",
+              lambda i: f'/api/v1/categories/'
+                        f'{fixture["delete_categories"][i]}/',
+              no_data, 204),
+        Route("users-delete", "admin", "delete",
+              lambda i: f'/api/v1/users/{fixture["delete_users"][i]}/',
+              no_data, 204),
+    )
+
+
+def prepare_fixture(requests):
+    """Данные для маршрутов и клиенты с токенами из /auth/token/."""
+    from django.db.models import Count
+    from rest_framework.test import APIClient
+    from reviews.constants import Role
+    from reviews.models import (Category, Comment, CustomUser, Genre, Review,
+                                Title)
+
+    def client_for(username, role):
+        user = CustomUser.objects.create_user(
+            username=username, email=f"{username}@yamdb.fake", role=role
+        )
+        token = APIClient().post("/api/v1/auth/token/", data={
+            "username": username,
+            "confirmation_code": str(user.confirmation_code),
+        }).json()["token"]
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return user, client
+
+    user, user_client = client_for("bench_user", Role.USER)
+    _, admin_client = client_for("bench_admin", Role.ADMIN)
+    title = Title.objects.order_by("-rating_count", "pk").first()
+    review = title.reviews.annotate(
+        comments_total=Count("comments")
+    ).order_by("-comments_total", "pk").first()
+    new_titles = list(Title.objects.exclude(
+        pk__in=Review.objects.filter(author=user).values("title_id")
+    ).order_by("pk").values_list("pk", flat=True)[:requests])
+    bulk_authors = [
+        CustomUser.objects.create_user(
+            username=f"bench_author_{number}",
+            email=f"bench_author_{number}@yamdb.fake",
+        ).username
+        for number in range(BULK_SIZE)
+    ]
+    user_review = Review.objects.create(title=title, author=user,
+                                        text="Замер", score=5)
+    # Объекты для маршрутов удаления: по одному на запрос, не задевающие
+    # объекты остальных маршрутов.
+    dataset_users = CustomUser.objects.exclude(
+        username__startswith="bench_"
+    ).order_by("pk")
+    delete_titles = list(Title.objects.exclude(
+        pk__in=[title.pk, *new_titles]
+    ).order_by("-pk").values_list("pk", flat=True)[:requests])
+    Genre.objects.bulk_create(
+        Genre(name=f"Удаление {number}", slug=f"bench-delete-{number}")
+        for number in range(requests)
+    )
+    Category.objects.bulk_create(
+        Category(name=f"Удаление {number}", slug=f"bench-delete-{number}")
+        for number in range(requests)
+    )
+    fixture = {
+        "title": title.pk,
+        "review": review.pk,
+        "comment": review.comments.order_by("pk").first().pk,
+        "genre": Genre.objects.order_by("pk").first().slug,
+        "genres": list(Genre.objects.order_by("pk").values_list(
+            "slug", flat=True
+        )[:2]),
+        "category": Category.objects.order_by("pk").first().slug,
+        "username": user.username,
+        "code": str(user.confirmation_code),
+        "new_titles": new_titles,
+        "bulk_authors": bulk_authors,
+        "user_review": user_review.pk,
+        "user_comment": Comment.objects.create(
+            review=review, author=user, text="Замер"
+        ).pk,
+        "other_username": dataset_users.first().username,
+        "delete_comments": list(Comment.objects.exclude(
+            review=review
+        ).order_by("-pk").values_list(
+            "review__title_id", "review_id", "pk"
+        )[:requests]),
+        "delete_reviews": list(Review.objects.exclude(
+            title=title
+        ).order_by("-pk").values_list("title_id", "pk")[:requests]),
+        "delete_titles": delete_titles,
+        "delete_genres": [f"bench-delete-{number}"
+                          for number in range(requests)],
+        "delete_categories": [f"bench-delete-{number}"
+                              for number in range(requests)],
+        "delete_users": list(dataset_users.reverse().values_list(
+            "username", flat=True
+        )[:requests]),
+    }
+    clients = {"anon": APIClient(), "user": user_client,
+               "admin": admin_client}
+    return fixture, clients
+
+
+def run_route(route, client, requests, warmup, allocation_runs):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    def send(i):
+        if route.method == "get":
+            response = client.get(route.path(i))
+        else:
+            response = getattr(client, route.method)(
+                route.path(i), data=route.data(i), format="json"
+            )
+        if response.status_code != route.status:
+            raise RuntimeError(
+                f"{route.name}: статус {response.status_code}, ожидался "
+                f"{route.status}: {response.content[:300]!r}"
+            )
+        return response
+
+    # Номера запросов не повторяются: создаваемые объекты уникальны.
+    numbers = iter(range(warmup + requests + allocation_runs))
+    for _ in range(warmup):
+        send(next(numbers))
+    latencies = []
+    queries = []
+    sizes = []
+    for _ in range(requests):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = send(next(numbers))
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(context.captured_queries))
+        sizes.append(len(response.content))
+    # tracemalloc замедляет код, поэтому память меряется отдельно.
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(allocation_runs):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            send(next(numbers))
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return {
+        "p50_ms": round(percentile(latencies, 0.5) * 1e3, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1e3, 3),
+        "queries": max(queries),
+        "peak_kib": round(percentile(peaks, 0.5) / 1024, 1),
+        "response_bytes": percentile(sizes, 0.5),
+    }
+
+
+def environment_changes(meta, baseline_meta):
+    """Поля окружения, отличающиеся от записанных в базовом замере."""
+    return [
+        f"{field}: {baseline_meta.get(field)} -> {meta.get(field)}"
+        for field in ENVIRONMENT
+        if meta.get(field) != baseline_meta.get(field)
+    ]
+
+
+def compare(results, baseline, threshold, memory_threshold, noise_ms,
+            timings=True):
+    """
+    Регрессия: больше SQL-запросов, чем в базовом замере, либо медиана
+    времени выросла более чем в threshold раз и больше чем на noise_ms
+    миллисекунд, либо пик памяти вырос более чем в memory_threshold раз.
+    p95 только печатается: на десятках запросов он зависит от единичных
+    пауз сборщика мусора и планировщика. При timings=False (окружение
+    не совпадает с базовым) сравниваются только SQL-запросы.
+    """
+    rows = []
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append((name, result["p50_ms"], "-", result["p95_ms"],
+                         result["queries"], "-", result["peak_kib"],
+                         "новый"))
+            continue
+        problems = []
+        if result["queries"] > base["queries"]:
+            problems.append("запросы")
+        if timings and (result["p50_ms"] > base["p50_ms"] * threshold
+                        and result["p50_ms"] - base["p50_ms"] > noise_ms):
+            problems.append("p50")
+        if timings and (result["peak_kib"]
+                        > base["peak_kib"] * memory_threshold):
+            problems.append("память")
+        if problems:
+            regressions.append(name)
+        rows.append((
+            name, result["p50_ms"], base["p50_ms"], result["p95_ms"],
+            result["queries"], base["queries"], result["peak_kib"],
+            ", ".join(problems) or "ok",
+        ))
+    print_table(("маршрут", "p50 мс", "база p50", "p95 мс", "SQL",
+                 "база SQL", "пик КиБ", "итог"), rows)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=200,
+                        help="замеряемых запросов на маршрут")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--allocation-runs", type=int, default=5)
+    parser.add_argument("--routes", nargs="+",
+                        help="замерить только перечисленные маршруты")
+    parser.add_argument("--output", type=Path,
+                        help="куда сохранить результаты в JSON")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="сохранить результаты как базовый замер")
+    parser.add_argument("--threshold", type=float, default=1.5,
+                        help="допустимый рост медианы времени")
+    parser.add_argument("--memory-threshold", type=float, default=1.3)
+    parser.add_argument("--noise-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    setup_django()
+    import django
+    from django.core.management import call_command
+    from django.test.utils import override_settings
+
+    with test_database(), override_settings(EMAIL_ASYNC=False):
+        options = [f"--{key}={value}" for key, value in DATASET.items()]
+        call_command("generate_dataset", *options, stdout=io.StringIO())
+        fixture, clients = prepare_fixture(
+            args.warmup + args.requests + args.allocation_runs
+        )
+        results = {}
+        for route in build_routes(fixture):
+            if args.routes and route.name not in args.routes:
+                continue
+            results[route.name] = run_route(
+                route, clients[route.client], args.requests, args.warmup,
+                args.allocation_runs,
+            )
+
+    report = {
+        "meta": {
+            "dataset": DATASET,
+            "requests": args.requests,
+            "python_implementation": platform.python_implementation(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+        },
+        "routes": results,
+    }
+    if args.output:
+        args.output.write_text(
+            json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+        )
+    if args.save_baseline:
+        args.baseline.parent.mkdir(exist_ok=True)
+        args.baseline.write_text(
+            json.dumps(report, indent=2, ensure_ascii=False) + "\n"
+        )
+        print(f"Базовый замер сохранён в {args.baseline}")
+    baseline = {}
+    changes = []
+    if args.baseline.exists() and not args.save_baseline:
+        baseline_report = json.loads(args.baseline.read_text())
+        baseline = baseline_report["routes"]
+        changes = environment_changes(report["meta"],
+                                      baseline_report["meta"])
+        if changes:
+            print("Окружение отличается от базового замера "
+                  f"({'; '.join(changes)}): время и память не "
+                  "сравниваются, только SQL-запросы.")
+    regressions = compare(results, baseline, args.threshold,
+                          args.memory_threshold, args.noise_ms,
+                          timings=not changes)
+    if regressions:
+        print(f"Регрессии: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Параллельные чтение и запись в файловую SQLite: профиль БД по умолчанию
+против DATABASE_PROFILE=production (WAL, PRAGMA, постоянные соединения,
+BEGIN IMMEDIATE и повторы при блокировке).
+
+Запросы идут в WSGI-приложение из нескольких процессов, как у сервера с
+несколькими воркерами: читатели запрашивают список произведений,
+писатели создают отзывы.
+
+    python benchmarks/bench_sqlite_concurrency.py --readers 4 --writers 4
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import print_table, setup_django
+
+DATASET = ("--users=200", "--titles=2000", "--reviews=20000",
+           "--comments=2000", "--seed=1")
+
+
+def call(application, factory, method, path, token, data=None):
+    """Запрос к WSGI-приложению с сигналами начала и конца запроса."""
+    request = getattr(factory, method)(
+        path, data=data, content_type="application/json",
+        HTTP_AUTHORIZATION=f"Bearer {token}",
+    )
+    status = []
+    response = application(
+        request.environ, lambda code, headers: status.append(code)
+    )
+    b"".join(response)
+    # close() отправляет request_finished, который закрывает соединение
+    # с БД, если CONN_MAX_AGE истёк.
+    response.close()
+    return int(status[0].split()[0])
+
+
+def worker(kind, token, title_ids, deadline, results):
+    from django.core.wsgi import get_wsgi_application
+    from django.test import RequestFactory
+
+    application = get_wsgi_application()
+    factory = RequestFactory()
+    latencies = []
+    errors = 0
+    index = 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            if kind == "read":
+                status = call(
+                    application, factory, "get",
+                    f"/api/v1/titles/?page={index % 50 + 1}", token,
+                )
+            else:
+                if index >= len(title_ids):
+                    break
+                status = call(
+                    application, factory, "post",
+                    f"/api/v1/titles/{title_ids[index]}/reviews/", token,
+                    data=json.dumps({"text": "Замер", "score": 7}),
+                )
+            if status >= 400:
+                errors += 1
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+        index += 1
+    results.put((kind, latencies, errors))
+
+
+def run_profile(profile, readers, writers, seconds):
+    """Выполняется в отдельном процессе с выбранным профилем БД."""
+    os.environ["DATABASE_PROFILE"] = profile
+    setup_django()
+    from api.serializers import CustomTokenObtainSerializer
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+    from reviews.models import CustomUser, Title
+
+    directory = tempfile.mkdtemp()
+    settings.DATABASES["default"]["NAME"] = Path(directory) / "db.sqlite3"
+    settings.EMAIL_ASYNC = False
+    call_command("migrate", verbosity=0)
+    call_command("generate_dataset", *DATASET, stdout=io.StringIO())
+
+    title_ids = list(Title.objects.order_by("pk").values_list(
+        "pk", flat=True
+    ))
+    tokens = []
+    for number in range(readers + writers):
+        user = CustomUser.objects.create_user(
+            username=f"bench_{number}", email=f"bench_{number}@yamdb.fake"
+        )
+        tokens.append(str(
+            CustomTokenObtainSerializer.get_token(user).access_token
+        ))
+    # Дочерние процессы открывают свои соединения.
+    connections.close_all()
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    deadline = time.time() + seconds
+    processes = [
+        context.Process(target=worker, args=(
+            "read" if number < readers else "write",
+            tokens[number], title_ids, deadline, results,
+        ))
+        for number in range(readers + writers)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {}
+    for kind in ("read", "write"):
+        latencies = sorted(
+            latency
+            for result_kind, values, _ in collected if result_kind == kind
+            for latency in values
+        )
+        summary[kind] = {
+            "requests": len(latencies),
+            "per_second": round(len(latencies) / seconds, 1),
+            "p95_ms": round(
+                latencies[int(len(latencies) * 0.95)] * 1e3, 1
+            ) if latencies else None,
+            "errors": sum(
+                errors for result_kind, _, errors in collected
+                if result_kind == kind
+            ),
+        }
+    print(json.dumps(summary))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--profiles", nargs="+",
+                        default=("default", "production"))
+    parser.add_argument("--run-profile", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_profile:
+        run_profile(args.run_profile, args.readers, args.writers,
+                    args.seconds)
+        return
+
+    rows = []
+    for profile in args.profiles:
+        output = subprocess.run(
+            [sys.executable, __file__, "--run-profile", profile,
+             "--readers", str(args.readers), "--writers", str(args.writers),
+             "--seconds", str(args.seconds)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        summary = json.loads(output.strip().splitlines()[-1])
+        for kind in ("read", "write"):
+            result = summary[kind]
+            rows.append((profile, kind, result["requests"],
+                         result["per_second"], result["p95_ms"],
+                         result["errors"]))
+    print_table(("профиль", "запросы", "всего", "в секунду", "p95 мс",
+                 "ошибок"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Фильтрация произведений по жанру: прежний icontains по соединению с
+GenreTitle против точного сравнения slug в полусоединении id IN (...).
+
+    python benchmarks/bench_title_filters.py --titles 100000 \
+        --genres-per-title 5
+"""
+import argparse
+
+from common import measure, print_table, setup_django, test_database
+
+
+def create_catalogue(titles, genres_per_title, genres=30):
+    from reviews.models import Genre, GenreTitle, Title
+
+    Genre.objects.bulk_create(
+        Genre(pk=pk, name=f"Жанр {pk}", slug=f"genre-{pk}")
+        for pk in range(1, genres + 1)
+    )
+    for start in range(0, titles, 10000):
+        stop = min(start + 10000, titles)
+        Title.objects.bulk_create(
+            Title(pk=pk, name=f"Произведение {pk:07d}", year=2000)
+            for pk in range(start + 1, stop + 1)
+        )
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title_id=pk, genre_id=(pk * 7 + shift) % genres + 1)
+            for pk in range(start + 1, stop + 1)
+            for shift in range(genres_per_title)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=100000)
+    parser.add_argument("--genres-per-title", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from api.filters import TitleFilter
+    from django.http import QueryDict
+    from reviews.models import Title
+
+    def legacy(query):
+        # Прежний фильтр: genre__slug__icontains для каждого значения.
+        queryset = Title.objects.filter(genre__slug__icontains=query)
+        return queryset.count(), list(queryset[:5])
+
+    def current(query, mode="any"):
+        queryset = TitleFilter(
+            QueryDict(f"genre={query}&genre_mode={mode}"),
+            queryset=Title.objects.all(),
+        ).qs
+        return queryset.count(), list(queryset[:5])
+
+    rows = []
+    with test_database():
+        create_catalogue(args.titles, args.genres_per_title)
+        for label, func in (
+            ("icontains genre-1", lambda: legacy("genre-1")),
+            ("semi-join genre-1", lambda: current("genre-1")),
+            ("semi-join genre-1,genre-2 any",
+             lambda: current("genre-1,genre-2")),
+            ("semi-join genre-1,genre-2 all",
+             lambda: current("genre-1,genre-2", "all")),
+        ):
+            count = func()[0]
+            _, seconds = measure(func, args.repeat)
+            rows.append((label, count, f"{seconds * 1e3:.1f}"))
+    print_table(("фильтр", "строк", "мс"), rows)
+
+
+if __name__ == "__main__":
+    main()
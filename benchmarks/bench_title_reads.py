@@ -0,0 +1,95 @@
+"""
+Замер чтения списка произведений: SQL-запросы на страницу и мкс на элемент.
+
+«До» воспроизводит прежний путь: аннотация Avg по отзывам, ленивые
+category/genre и отдельный TitleSafeSerializer на каждую строку.
+«После» - текущий queryset TitleViewSet и один списочный сериализатор.
+
+    python benchmarks/bench_title_reads.py --titles 2000
+"""
+import argparse
+
+from common import measure, print_table, setup_django, test_database
+
+
+def create_titles(count, genres_per_title=3):
+    from reviews.models import Category, Genre, GenreTitle, Title
+
+    categories = Category.objects.bulk_create(
+        Category(pk=pk, name=f"Категория {pk}", slug=f"category-{pk}")
+        for pk in range(1, 11)
+    )
+    genres = Genre.objects.bulk_create(
+        Genre(pk=pk, name=f"Жанр {pk}", slug=f"genre-{pk}")
+        for pk in range(1, 21)
+    )
+    Title.objects.bulk_create(
+        Title(
+            pk=pk,
+            name=f"Произведение {pk:07d}",
+            year=1900 + pk % 120,
+            category=categories[pk % len(categories)],
+            rating_sum=pk % 10 * 3,
+            rating_count=3,
+        )
+        for pk in range(1, count + 1)
+    )
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title_id=pk, genre=genres[(pk + shift) % len(genres)])
+        for pk in range(1, count + 1)
+        for shift in range(genres_per_title)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--page-sizes", type=int, nargs="+", default=(5, 20, 100)
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    from api.serializers import TitleSafeSerializer, TitleSerializer
+    from api.views import TitleViewSet
+    from django.db.models import Avg
+    from rest_framework import serializers
+    from reviews.models import Title
+
+    class LegacySafeSerializer(TitleSafeSerializer):
+        rating = serializers.IntegerField(
+            source="legacy_rating", read_only=True
+        )
+
+    class LegacyTitleSerializer(TitleSerializer):
+        def to_representation(self, title):
+            return LegacySafeSerializer(title).data
+
+    def before(page_size):
+        page = Title.objects.annotate(legacy_rating=Avg("reviews__score"))[
+            :page_size
+        ]
+        return LegacyTitleSerializer(page, many=True).data
+
+    def after(page_size):
+        page = TitleViewSet.queryset.all()[:page_size]
+        return TitleSafeSerializer(page, many=True).data
+
+    with test_database():
+        create_titles(args.titles)
+        rows = []
+        for page_size in args.page_sizes:
+            for variant, func in (("до", before), ("после", after)):
+                queries, seconds = measure(
+                    lambda: func(page_size), args.repeat
+                )
+                rows.append((
+                    page_size, variant, queries,
+                    f"{seconds / page_size * 1e6:.1f}",
+                ))
+        print_table(("page_size", "вариант", "запросов", "мкс/элемент"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Время поиска произведений при росте каталога: ранжированный icontains
+(поиск на бэкендах без FTS5) против полнотекстового индекса FTS5
+(?search=). Замеряется то же, что делает страница списка: COUNT(*) и
+первые 10 произведений по релевантности, для редкого и частого запроса.
+
+    python benchmarks/bench_title_search.py --sizes 10000 100000 300000
+"""
+import argparse
+import random
+
+from common import measure, print_table, setup_django, test_database
+
+WORDS = (
+    "время", "город", "дорога", "звезда", "история", "море", "ночь",
+    "остров", "память", "тень", "война", "сердце", "зима", "огонь",
+)
+
+
+def grow_catalogue(start, stop, rng):
+    from reviews.models import Title
+
+    batch = []
+    for pk in range(start + 1, stop + 1):
+        words = rng.sample(WORDS, 3)
+        batch.append(Title(
+            pk=pk,
+            name=f"{words[0].capitalize()} {words[1]} {pk}",
+            year=1900 + pk % 120,
+            description=" ".join(rng.choices(WORDS, k=12)),
+        ))
+        if len(batch) == 10000:
+            Title.objects.bulk_create(batch)
+            batch = []
+    Title.objects.bulk_create(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=(10000, 100000, 300000)
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from reviews.models import Title
+    from reviews.search import fallback_search, search_titles
+
+    def first_page(search, text):
+        queryset = search(Title.objects.all(), text)
+        return queryset.count(), list(queryset[:10])
+
+    rng = random.Random(0)
+    rows = []
+    with test_database():
+        size = 0
+        for target in sorted(args.sizes):
+            grow_catalogue(size, target, rng)
+            size = target
+            for text in ("остров 42", "остров"):
+                for variant, search in (("icontains", fallback_search),
+                                        ("fts5", search_titles)):
+                    _, seconds = measure(
+                        lambda: first_page(search, text), args.repeat
+                    )
+                    rows.append((size, text, variant,
+                                 f"{seconds * 1e3:.2f}"))
+    print_table(("произведений", "запрос", "вариант", "мс"), rows)
+
+
+if __name__ == "__main__":
+    main()
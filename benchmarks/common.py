@@ -0,0 +1,60 @@
+"""Общие помощники для скриптов замеров производительности."""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PROJECT_DIR = BASE_DIR / "api_yamdb"
+
+
+def setup_django():
+    """Подключает проект и инициализирует Django."""
+    sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_yamdb.settings")
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Создаёт на время замера отдельную тестовую базу данных."""
+    from django.db import connection
+    from django.test.utils import (setup_test_environment,
+                                   teardown_test_environment)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, repeat=20):
+    """Возвращает число SQL-запросов за вызов и лучшее время в секундах."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as context:
+        func()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return len(context.captured_queries), best
+
+
+def print_table(header, rows):
+    widths = [
+        max(len(str(value)) for value in column)
+        for column in zip(header, *rows)
+    ]
+    for row in (header, *rows):
+        print("  ".join(
+            str(value).rjust(width) for value, width in zip(row, widths)
+        ))
@@ -1,6 +1,7 @@
 import os
 import sys
 
+import pytest
 from django.utils.version import get_version
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -32,3 +33,40 @@ assert get_version() < "4.0.0", "Пожалуйста, используйте в
 pytest_plugins = [
     "tests.fixtures.fixture_user",
 ]
+
+
+@pytest.fixture(autouse=True)
+def sync_email(settings):
+    """Тесты проверяют mail.outbox сразу после ответа на запрос."""
+    settings.EMAIL_ASYNC = False
+
+
+def cache_settings(settings, directory):
+    return {
+        "default": {
+            **settings.CACHES["default"],
+            "LOCATION": str(directory / "cache.sqlite3"),
+        },
+    }
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(
+    django_db_modify_db_settings_parallel_suffix, tmp_path_factory
+):
+    """Миграции тестовой БД повышают версии ресурсов до остальных
+    фикстур: общий кэш разработчика они менять не должны."""
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    override_settings(CACHES=cache_settings(
+        settings, tmp_path_factory.mktemp("cache")
+    )).enable()
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(settings, tmp_path_factory):
+    """Версии ресурсов и привязки к основной БД не переходят между
+    тестами."""
+    settings.CACHES = cache_settings(settings,
+                                     tmp_path_factory.mktemp("cache"))
@@ -0,0 +1,195 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_reviews
+
+CASCADE_SIZE = 60
+
+
+@pytest.fixture
+def cascade(admin):
+    """
+    Произведение с CASCADE_SIZE отзывами и комментариями и автор отзывов
+    на CASCADE_SIZE других произведений; агрегаты согласованы.
+    """
+    from reviews import aggregates
+    from reviews.models import (Category, Comment, CustomUser, Genre, Review,
+                                Title)
+
+    category = Category.objects.create(name="Книги", slug="books")
+    genre = Genre.objects.create(name="Драма", slug="drama")
+    Title.objects.bulk_create(
+        Title(name=f"Произведение {number}", year=2000, category=category)
+        for number in range(CASCADE_SIZE + 1)
+    )
+    titles = list(Title.objects.order_by("pk"))
+    Title.genre.through.objects.bulk_create(
+        Title.genre.through(title=title, genre=genre) for title in titles
+    )
+    CustomUser.objects.bulk_create(
+        CustomUser(username=f"author{number}",
+                   email=f"author{number}@yamdb.fake")
+        for number in range(CASCADE_SIZE)
+    )
+    users = list(CustomUser.objects.filter(username__startswith="author")
+                 .order_by("pk"))
+    author = users[0]
+    Review.objects.bulk_create([
+        *(Review(title=titles[0], author=user, text="Отзыв",
+                 score=number % 10 + 1)
+          for number, user in enumerate(users)),
+        *(Review(title=title, author=author, text="Отзыв",
+                 score=number % 10 + 1)
+          for number, title in enumerate(titles[1:])),
+    ])
+    Comment.objects.bulk_create(
+        Comment(review=review, author=user, text="Комментарий")
+        for review in Review.objects.all() for user in (admin, author)
+    )
+    aggregates.rebuild()
+    return titles[0], author
+
+
+def update_queries(context):
+    return [query["sql"] for query in context.captured_queries
+            if query["sql"].startswith("UPDATE")]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test08RatingAggregates:
+    def test_01_aggregates_follow_reviews(
+        self, admin_client, admin, user_client, user
+    ):
+        from reviews.models import Review, Title
+
+        reviews, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        title = Title.objects.get(pk=titles[0]["id"])
+        assert (title.rating_sum, title.rating_count) == (10, 2), (
+            "Проверьте, что при создании отзыва обновляются хранимые "
+            "агрегаты рейтинга произведения."
+        )
+
+        review = Review.objects.get(pk=reviews[0]["id"])
+        review.score = 9
+        review.save()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (14, 2), (
+            "Проверьте, что при изменении оценки отзыва обновляется сумма "
+            "оценок произведения."
+        )
+
+        user.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.rating_count) == (9, 1), (
+            "Проверьте, что каскадное удаление отзывов вычитается из "
+            "агрегатов рейтинга произведения."
+        )
+
+    def test_02_rebuild_aggregates_command(
+        self, admin_client, admin, user_client, user
+    ):
+        from reviews.models import Title
+
+        _, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        Title.objects.filter(pk=titles[0]["id"]).update(
+            rating_sum=0, rating_count=0
+        )
+        with pytest.raises(CommandError):
+            call_command("rebuild_aggregates", "--check")
+
+        call_command("rebuild_aggregates")
+        call_command("rebuild_aggregates", "--check")
+        title = Title.objects.get(pk=titles[0]["id"])
+        assert (title.rating_sum, title.rating_count) == (10, 2), (
+            "Проверьте, что команда `rebuild_aggregates` пересчитывает "
+            "агрегаты рейтинга по отзывам."
+        )
+
+    def test_03_title_save_keeps_aggregates(
+        self, admin_client, admin, user_client, user
+    ):
+        from reviews.models import Review, Title
+
+        reviews, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        stale = Title.objects.get(pk=titles[0]["id"])
+        Review.objects.get(pk=reviews[0]["id"]).delete()
+
+        stale.name = "Новое название"
+        stale.save()
+        response = admin_client.patch(
+            f"/api/v1/titles/{stale.pk}/", data={"year": 2001}
+        )
+        assert response.status_code == 200, response.json()
+        title = Title.objects.get(pk=stale.pk)
+        assert (title.name, title.rating_count) == ("Новое название", 1), (
+            "Проверьте, что сохранение произведения, загруженного до "
+            "изменения отзывов, не перезаписывает агрегаты рейтинга."
+        )
+        call_command("rebuild_aggregates", "--check")
+
+    def test_04_cascade_deletes_batch_aggregates(self, admin_client,
+                                                 cascade):
+        from reviews import aggregates
+
+        title, author = cascade
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.delete(f"/api/v1/titles/{title.pk}/")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert not update_queries(context), (
+            "Проверьте, что удаление произведения не обновляет агрегаты "
+            "его удаляемых отзывов и комментариев."
+        )
+        assert len(context.captured_queries) < 30, (
+            "Проверьте, что число запросов при удалении произведения не "
+            "зависит от числа отзывов."
+        )
+        assert aggregates.rebuild(fix=False) == []
+
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.delete(
+                f"/api/v1/users/{author.username}/"
+            )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert len(update_queries(context)) <= 4, (
+            "Проверьте, что удаление пользователя сдвигает агрегаты "
+            "произведений и счётчики комментариев пакетом, а не для "
+            "каждого отзыва."
+        )
+        assert len(context.captured_queries) < 40
+        assert aggregates.rebuild(fix=False) == [], (
+            "Проверьте, что после каскадного удаления агрегаты совпадают "
+            "с отзывами и комментариями."
+        )
+
+    def test_05_concurrent_score_changes(self, admin_client, admin,
+                                         user_client, user):
+        from reviews import aggregates
+        from reviews.models import Review, Title
+
+        reviews, titles = create_reviews(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        # Оба запроса загрузили отзыв до того, как другой его сохранил.
+        first = Review.objects.get(pk=reviews[0]["id"])
+        second = Review.objects.get(pk=reviews[0]["id"])
+        first.score = 7
+        first.save()
+        second.score = 9
+        second.save()
+        title = Title.objects.get(pk=titles[0]["id"])
+        assert (title.rating_sum, title.rating_count) == (14, 2), (
+            "Проверьте, что сдвиг суммы оценок считается от оценки, "
+            "сохранённой в БД, а не загруженной в память."
+        )
+        assert aggregates.rebuild(fix=False) == []
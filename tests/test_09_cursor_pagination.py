@@ -0,0 +1,144 @@
+import base64
+import json
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_single_review, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09CursorPagination:
+    def collect_pages(self, client, url):
+        results = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK, (
+                "Проверьте, что GET-запрос с `?pagination=cursor` "
+                "возвращает ответ со статусом 200."
+            )
+            data = response.json()
+            assert "count" not in data, (
+                "Проверьте, что при курсорной пагинации в ответе нет "
+                "ключа `count`: общее количество объектов не считается."
+            )
+            results.extend(data["results"])
+            url = data["next"]
+        return results
+
+    def test_01_genres_cursor(self, client, admin_client):
+        for number in range(12):
+            admin_client.post(
+                "/api/v1/genres/",
+                data={"name": f"Жанр {number % 4}", "slug": f"genre-{number}"},
+            )
+        cursor_slugs = [
+            genre["slug"] for genre in self.collect_pages(
+                client, "/api/v1/genres/?pagination=cursor"
+            )
+        ]
+        expected_slugs = [f"genre-{number}" for number in range(12)]
+        assert sorted(cursor_slugs) == sorted(expected_slugs), (
+            "Проверьте, что курсорная пагинация по `/api/v1/genres/` "
+            "возвращает каждый жанр ровно один раз, в том числе при "
+            "одинаковых названиях."
+        )
+
+        response = client.get("/api/v1/genres/?pagination=cursor")
+        second = client.get(response.json()["next"]).json()
+        previous = client.get(second["previous"]).json()
+        assert previous["results"] == response.json()["results"], (
+            "Проверьте, что ссылка `previous` курсорной пагинации ведёт "
+            "на предыдущую страницу."
+        )
+
+    def test_02_reviews_cursor_stable_under_inserts(
+        self, client, admin_client, django_user_model
+    ):
+        from rest_framework.test import APIClient
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        clients = []
+        for number in range(9):
+            author = django_user_model.objects.create_user(
+                username=f"author{number}", email=f"author{number}@yamdb.fake"
+            )
+            author_client = APIClient()
+            author_client.credentials(
+                HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(author)}"
+            )
+            clients.append(author_client)
+        for author_client in clients[:6]:
+            create_single_review(author_client, titles[0]["id"], "text", 5)
+
+        first = client.get(f"{url}?pagination=cursor").json()
+        for author_client in clients[6:]:
+            create_single_review(author_client, titles[0]["id"], "text", 7)
+        rest = self.collect_pages(client, first["next"])
+        ids = [review["id"] for review in first["results"] + rest]
+        assert len(ids) == len(set(ids)) == 9, (
+            "Проверьте, что курсорная пагинация по "
+            "`/api/v1/titles/{title_id}/reviews/` не пропускает и не "
+            "повторяет отзывы, добавленные между запросами страниц."
+        )
+
+    def test_03_invalid_cursor(self, client):
+        response = client.get("/api/v1/genres/?pagination=cursor&cursor=bad")
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            "Проверьте, что неверный курсор приводит к ответу со "
+            "статусом 404."
+        )
+
+        for position in (["zzz", "abc"], [None, None], ["Жанр", 1, 2],
+                         [["Жанр"], 1], "Жанр"):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps({"p": position}).encode()
+            ).decode()
+            response = client.get(
+                f"/api/v1/genres/?pagination=cursor&cursor={cursor}"
+            )
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                "Проверьте, что курсор со значениями неверного типа или "
+                f"длины ({position}) приводит к ответу со статусом 404."
+            )
+
+    def test_04_nullable_ordering(self, client, admin_client):
+        from reviews.models import Category, Title
+
+        titles, _, _ = create_titles(admin_client)
+        category = Category.objects.get(slug="films")
+        Title.objects.bulk_create(
+            Title(name=f"Без отзывов {number}", year=2000, category=category)
+            for number in range(12)
+        )
+        Title.objects.filter(pk=titles[0]["id"]).update(rating=7.0)
+        Title.objects.filter(pk=titles[1]["id"]).update(rating=3.0)
+        expected = set(Title.objects.values_list("pk", flat=True))
+
+        for ordering, first, last in (
+            ("rating", None, 7.0), ("-rating", 7.0, None),
+        ):
+            url = f"/api/v1/titles/?pagination=cursor&ordering={ordering}"
+            results = self.collect_pages(client, url)
+            ids = [title["id"] for title in results]
+            assert len(ids) == len(set(ids)) and set(ids) == expected, (
+                "Проверьте, что курсорная пагинация с сортировкой по "
+                f"`{ordering}` возвращает каждое произведение ровно один "
+                "раз, в том числе произведения без оценок."
+            )
+            assert (results[0]["rating"], results[-1]["rating"]) == (
+                first, last
+            ), (
+                "Проверьте, что произведения без оценок идут первыми по "
+                "возрастанию рейтинга и последними по убыванию."
+            )
+
+            response = client.get(url).json()
+            second = client.get(response["next"]).json()
+            previous = client.get(second["previous"]).json()
+            assert previous["results"] == response["results"], (
+                "Проверьте, что ссылка `previous` ведёт на предыдущую "
+                f"страницу при сортировке по `{ordering}`."
+            )
@@ -0,0 +1,90 @@
+import pytest
+
+from tests.utils import create_comments, create_genre
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10ResponseCache:
+    def test_01_anonymous_reads_are_cached(self, client, admin_client):
+        from api.cache import response_cache
+
+        create_genre(admin_client)
+        hits = response_cache.hits
+        assert client.get("/api/v1/genres/")["X-Cache"] == "MISS"
+        response = client.get("/api/v1/genres/")
+        assert response["X-Cache"] == "HIT", (
+            "Проверьте, что повторный GET-запрос анонима к "
+            "`/api/v1/genres/` отдаётся из кэша."
+        )
+        assert response.json()["count"] == 3
+        assert response_cache.hits == hits + 1, (
+            "Проверьте, что попадания в кэш ответов учитываются в счётчике."
+        )
+
+    def test_02_writes_bump_version(self, client, admin_client):
+        create_genre(admin_client)
+        client.get("/api/v1/genres/")
+        admin_client.post(
+            "/api/v1/genres/", data={"name": "Мюзикл", "slug": "musical"}
+        )
+        response = client.get("/api/v1/genres/")
+        assert response["X-Cache"] == "MISS", (
+            "Проверьте, что создание жанра сбрасывает кэш ответов "
+            "`/api/v1/genres/`."
+        )
+        assert response.json()["count"] == 4
+
+        admin_client.delete("/api/v1/genres/musical/")
+        assert client.get("/api/v1/genres/").json()["count"] == 3, (
+            "Проверьте, что удаление жанра сбрасывает кэш ответов "
+            "`/api/v1/genres/`."
+        )
+
+    def test_03_authenticated_bypass(self, user_client, admin_client):
+        create_genre(admin_client)
+        user_client.get("/api/v1/genres/")
+        response = user_client.get("/api/v1/genres/")
+        assert not response.has_header("X-Cache"), (
+            "Проверьте, что запросы с аутентификацией обходят кэш ответов."
+        )
+
+    def test_04_deleted_parent_is_not_cached(self, client, admin_client,
+                                            admin, moderator_client,
+                                            moderator, user_client, user):
+        _, reviews, titles = create_comments(admin_client, {
+            admin: admin_client, moderator: moderator_client, user: user_client
+        })
+        # У второго отзыва нет комментариев, у второго произведения -
+        # отзывов: их удаление не затрагивает закэшированные списки.
+        review_url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        review_url = f'{review_url}{reviews[1]["id"]}/'
+        comments_url = f"{review_url}comments/"
+        title_id = titles[1]["id"]
+        reviews_url = f"/api/v1/titles/{title_id}/reviews/"
+        for url in (reviews_url, comments_url):
+            client.get(url)
+            assert client.get(url)["X-Cache"] == "HIT"
+
+        admin_client.delete(review_url)
+        assert client.get(comments_url).status_code == 404, (
+            "Проверьте, что после удаления отзыва кэш не отдаёт список его "
+            "комментариев."
+        )
+        admin_client.delete(f"/api/v1/titles/{title_id}/")
+        assert client.get(reviews_url).status_code == 404, (
+            "Проверьте, что после удаления произведения кэш не отдаёт "
+            "список его отзывов."
+        )
+
+    def test_05_lru_eviction(self):
+        from api.cache import ResponseCache
+
+        cache = ResponseCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, {"key": key})
+        assert cache.get("a") is None
+        assert cache.get("c") == {"key": "c"}
+        assert cache.stats()["evictions"] == 1, (
+            "Проверьте, что вытеснение записей из кэша ответов учитывается "
+            "в счётчике."
+        )
@@ -0,0 +1,113 @@
+import os
+import re
+import shutil
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from tests.conftest import MANAGE_PATH
+
+DATA_DIR = os.path.join(MANAGE_PATH, "static", "data")
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11ImportCsv:
+    def test_01_bulk_import(self):
+        from reviews.models import GenreTitle, Review, Title
+
+        call_command("import_csv", "--bulk", "--data-dir", DATA_DIR)
+        assert Title.objects.count() == 32
+        assert GenreTitle.objects.count() == 42
+        reviews_count = Review.objects.count()
+        assert reviews_count > 0, (
+            "Проверьте, что команда `import_csv --bulk` загружает отзывы."
+        )
+        call_command("rebuild_aggregates", "--check")
+
+        call_command("import_csv", "--bulk", "--data-dir", DATA_DIR)
+        assert Review.objects.count() == reviews_count, (
+            "Проверьте, что повторный запуск `import_csv --bulk` не "
+            "дублирует уже загруженные строки."
+        )
+
+    def test_02_parallel_import(self):
+        from reviews.models import Comment, GenreTitle, Review, Title
+
+        call_command("import_csv", "--workers", "2", "--data-dir", DATA_DIR)
+        assert Title.objects.count() == 32
+        assert GenreTitle.objects.count() == 42
+        assert Review.objects.exists() and Comment.objects.exists(), (
+            "Проверьте, что `import_csv --workers` загружает зависимые "
+            "файлы после тех, от которых они зависят."
+        )
+        call_command("rebuild_aggregates", "--check")
+
+    @pytest.mark.parametrize("mode", (("--bulk",), ("--workers", "2")))
+    def test_03_report_counts(self, tmp_path, mode):
+        data_dir = tmp_path / "data"
+        shutil.copytree(DATA_DIR, data_dir)
+        with open(data_dir / "review.csv", "a", encoding="utf-8") as file:
+            file.write(
+                "\n1000,1,Повтор,100,5,2019-09-24T21:08:21.567Z"
+                "\n1001,1,Нет автора,999999,5,2019-09-24T21:08:21.567Z"
+                "\n1002,1,Оценка,100,много,2019-09-24T21:08:21.567Z"
+            )
+
+        def review_report():
+            stdout = StringIO()
+            call_command("import_csv", *mode, "--data-dir",
+                         str(data_dir), stdout=stdout, stderr=StringIO())
+            return re.search(
+                r"Review наполнена данными.\nКоличество строк: (\d+), "
+                r"загружено: (\d+), уже в базе: (\d+), отклонено: (\d+), "
+                r"конфликтов уникальности: (\d+),",
+                stdout.getvalue(),
+            ).groups()
+
+        count, loaded, existing, rejected, conflicts = map(
+            int, review_report()
+        )
+        assert (existing, rejected, conflicts) == (0, 2, 1), (
+            f"Проверьте, что `import_csv {' '.join(mode)}` отдельно "
+            "считает строки с ошибками и строки, отброшенные "
+            "ограничением уникальности."
+        )
+        assert loaded == count - 3
+        assert tuple(map(int, review_report())) == (
+            count, 0, loaded, 2, 1
+        ), (
+            "Проверьте, что при повторном запуске строки, уже загруженные "
+            "в базу, не считаются отклонёнными."
+        )
+
+    def test_04_ready_files_load_together(self, monkeypatch):
+        from concurrent.futures import ThreadPoolExecutor
+
+        from reviews.management.commands import import_csv
+
+        submitted = []
+
+        class RecordingExecutor(ThreadPoolExecutor):
+            def __init__(self, workers, initializer):
+                super().__init__(workers)
+
+            def submit(self, fn, model_label, *args):
+                submitted.append(model_label)
+                return super().submit(fn, model_label, *args)
+
+        monkeypatch.setattr(import_csv, "ProcessPoolExecutor",
+                            RecordingExecutor)
+        call_command("import_csv", "--workers", "2", "--batch-size", "1",
+                     "--data-dir", DATA_DIR, stdout=StringIO())
+        assert set(submitted[:3]) == {
+            "reviews.CustomUser", "reviews.Category", "reviews.Genre"
+        }, (
+            "Проверьте, что `import_csv --workers` отправляет в пул пачки "
+            "всех файлов, готовых к загрузке, а не разбирает их по одному."
+        )
+        last_genre = len(submitted) - submitted[::-1].index("reviews.Genre")
+        assert "reviews.Title" in submitted[:last_genre], (
+            "Проверьте, что записанный файл сразу открывает зависимые от "
+            "него файлы, не дожидаясь остальных готовых."
+        )
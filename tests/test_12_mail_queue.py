@@ -0,0 +1,79 @@
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12MailQueue:
+    def test_01_signup_enqueues_email(self, client, settings):
+        from reviews.utils import mail_queue
+
+        settings.EMAIL_ASYNC = True
+        response = client.post(
+            "/api/v1/auth/signup/",
+            data={"username": "queued", "email": "queued@yamdb.fake"},
+        )
+        assert response.status_code == 200
+        assert mail_queue.flush(timeout=5), (
+            "Проверьте, что фоновый отправитель разбирает очередь писем."
+        )
+        assert mail_queue.depth() == 0
+        assert [message.to for message in mail.outbox] == [
+            ["queued@yamdb.fake"]
+        ], (
+            "Проверьте, что после регистрации письмо с кодом подтверждения "
+            "отправляется на указанный email."
+        )
+
+    def test_02_failed_batch_is_retried(self, settings):
+        from django.core.mail import EmailMessage
+        from reviews.utils import MailQueue
+
+        settings.EMAIL_BACKEND = "tests.test_12_mail_queue.FlakyBackend"
+        FlakyBackend.failures = 2
+        FlakyBackend.fail_after = 0
+        mail_queue = MailQueue(retry_backoff=0.01)
+        for number in range(3):
+            mail_queue.put(EmailMessage("code", "1", "a@yamdb.fake",
+                                        [f"user{number}@yamdb.fake"]))
+        assert mail_queue.flush(timeout=5)
+        assert FlakyBackend.failures == 0
+        assert len(mail.outbox) == 3, (
+            "Проверьте, что пачка писем повторяется после ошибки "
+            "почтового бэкенда."
+        )
+
+    def test_03_only_unsent_messages_are_retried(self, settings):
+        from django.core.mail import EmailMessage
+        from reviews.utils import MailQueue
+
+        settings.EMAIL_BACKEND = "tests.test_12_mail_queue.FlakyBackend"
+        FlakyBackend.failures = 1
+        FlakyBackend.fail_after = 2
+        mail_queue = MailQueue(retry_backoff=0.01)
+        for number in range(4):
+            mail_queue.put(EmailMessage("code", "1", "a@yamdb.fake",
+                                        [f"user{number}@yamdb.fake"]))
+        assert mail_queue.flush(timeout=5)
+        recipients = [message.to[0] for message in mail.outbox]
+        assert sorted(recipients) == [
+            f"user{number}@yamdb.fake" for number in range(4)
+        ], (
+            "Проверьте, что после ошибки посреди пачки повторно "
+            "отправляются только неотправленные письма."
+        )
+
+
+class FlakyBackend(BaseEmailBackend):
+    failures = 0
+    # Сколько писем бэкенд успевает отправить перед ошибкой.
+    fail_after = 0
+
+    def send_messages(self, messages):
+        for message in messages:
+            if FlakyBackend.failures and FlakyBackend.fail_after <= 0:
+                FlakyBackend.failures -= 1
+                raise ConnectionError("SMTP недоступен")
+            FlakyBackend.fail_after -= 1
+            mail.outbox.append(message)
+        return len(messages)
@@ -0,0 +1,68 @@
+import pytest
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13TitleSearch:
+    def test_01_search_name_and_description(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.post("/api/v1/titles/", data={
+            "name": "Чужие",
+            "year": 1986,
+            "genre": [titles[0]["genre"][0]],
+            "category": titles[0]["category"],
+            "description": "Продолжение истории, не Терминатор",
+        })
+
+        response = client.get("/api/v1/titles/?search=терминатор")
+        names = [title["name"] for title in response.json()["results"]]
+        assert names == ["Терминатор", "Чужие"], (
+            "Проверьте, что поиск `?search=` по `/api/v1/titles/` находит "
+            "произведения по названию и описанию и ставит совпадения в "
+            "названии выше совпадений в описании."
+        )
+
+        response = client.get("/api/v1/titles/?search=Yippie")
+        names = [title["name"] for title in response.json()["results"]]
+        assert names == ["Крепкий орешек"]
+
+    def test_02_index_follows_writes(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        admin_client.patch(
+            f'/api/v1/titles/{titles[1]["id"]}/', data={"name": "Хищник"}
+        )
+        assert client.get(
+            "/api/v1/titles/?search=орешек"
+        ).json()["count"] == 0, (
+            "Проверьте, что изменение произведения обновляет поисковый "
+            "индекс."
+        )
+        assert client.get("/api/v1/titles/?search=хищ").json()["count"] == 1
+
+        admin_client.delete(f'/api/v1/titles/{titles[1]["id"]}/')
+        assert client.get("/api/v1/titles/?search=хищ").json()["count"] == 0
+
+    def test_03_ranked_candidates_are_capped(self, client, settings):
+        from reviews.models import Title
+
+        settings.SEARCH_MAX_CANDIDATES = 2
+        named = Title.objects.create(name="Остров сокровищ", year=1883).pk
+        described = [
+            Title.objects.create(
+                name=f"Книга {number}", year=2000, description="Остров"
+            ).pk
+            for number in range(4)
+        ]
+        data = client.get("/api/v1/titles/?search=остров").json()
+        assert data["count"] == 5, (
+            "Проверьте, что поиск возвращает все совпадения, а не только "
+            "`SEARCH_MAX_CANDIDATES` новейших."
+        )
+        assert [title["id"] for title in data["results"]] == [
+            named, *described[-2:], *described[:2]
+        ], (
+            "Проверьте, что совпадения в названии ранжируются всегда, "
+            "а совпадения сверх `SEARCH_MAX_CANDIDATES` идут после "
+            "ранжированных."
+        )
@@ -0,0 +1,52 @@
+import pytest
+
+from tests.utils import create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14TitleFilters:
+    def test_01_multi_value_genre(self, client, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        url = "/api/v1/titles/"
+
+        response = client.get(
+            f'{url}?genre={genres[0]["slug"]},{genres[1]["slug"]}'
+        )
+        assert response.json()["count"] == 1, (
+            "Проверьте, что произведение, подходящее под несколько жанров "
+            "из фильтра `genre`, возвращается один раз."
+        )
+
+        response = client.get(
+            f'{url}?genre={genres[1]["slug"]},{genres[2]["slug"]}'
+        )
+        assert response.json()["count"] == 2
+
+        response = client.get(
+            f'{url}?genre={genres[0]["slug"]},{genres[2]["slug"]}'
+            "&genre_mode=all"
+        )
+        assert response.json()["count"] == 0, (
+            "Проверьте, что `genre_mode=all` оставляет только произведения "
+            "со всеми перечисленными жанрами."
+        )
+
+        response = client.get(
+            f'{url}?genre={genres[0]["slug"]},{genres[1]["slug"]}'
+            "&genre_mode=all"
+        )
+        assert [title["id"] for title in response.json()["results"]] == [
+            titles[0]["id"]
+        ]
+
+    def test_02_exact_slug(self, client, admin_client):
+        _, categories, genres = create_titles(admin_client)
+        response = client.get(f'/api/v1/titles/?genre={genres[0]["slug"][:2]}')
+        assert response.json()["count"] == 0, (
+            "Проверьте, что фильтр `genre` сравнивает slug целиком."
+        )
+        response = client.get(
+            "/api/v1/titles/?category="
+            f'{categories[0]["slug"]},{categories[1]["slug"]}'
+        )
+        assert response.json()["count"] == 2
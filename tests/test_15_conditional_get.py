@@ -0,0 +1,125 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_genre, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test15ConditionalGet:
+    def test_01_etag_not_modified(self, client, admin_client):
+        create_genre(admin_client)
+        response = client.get("/api/v1/genres/")
+        etag = response["ETag"]
+        assert etag and response.has_header("Last-Modified"), (
+            "Проверьте, что ответ на GET-запрос к `/api/v1/genres/` "
+            "содержит заголовки `ETag` и `Last-Modified`."
+        )
+
+        response = client.get("/api/v1/genres/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            "Проверьте, что GET-запрос с совпадающим `If-None-Match` "
+            "получает ответ 304."
+        )
+
+        admin_client.post(
+            "/api/v1/genres/", data={"name": "Мюзикл", "slug": "musical"}
+        )
+        response = client.get("/api/v1/genres/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            "Проверьте, что после изменения жанров прежний `ETag` "
+            "перестаёт совпадать."
+        )
+        assert response["ETag"] != etag
+
+    def test_02_detail_and_nested_lists(
+        self, client, admin_client, user_client
+    ):
+        titles, _, _ = create_titles(admin_client)
+        detail_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        reviews_url = f"{detail_url}reviews/"
+        detail_etag = client.get(detail_url)["ETag"]
+        reviews_etag = user_client.get(reviews_url)["ETag"]
+        assert user_client.get(
+            reviews_url, HTTP_IF_NONE_MATCH=reviews_etag
+        ).status_code == HTTPStatus.NOT_MODIFIED, (
+            "Проверьте, что условные GET-запросы работают и для "
+            "пользователей с токеном."
+        )
+
+        user_client.post(reviews_url, data={"text": "Отзыв", "score": 8})
+        assert client.get(
+            reviews_url, HTTP_IF_NONE_MATCH=reviews_etag
+        ).status_code == HTTPStatus.OK
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        assert response.status_code == HTTPStatus.OK, (
+            "Проверьте, что новый отзыв меняет `ETag` произведения: "
+            "от отзывов зависит рейтинг."
+        )
+        assert response.json()["rating"] == 8
+
+    def test_03_missing_target_is_not_modified(
+        self, client, admin_client, user_client
+    ):
+        titles, _, _ = create_titles(admin_client)
+        first, second = titles[0]["id"], titles[1]["id"]
+        etag = client.get(f"/api/v1/titles/{first}/")["ETag"]
+        for url in (f"/api/v1/titles/{first}/",
+                    f"/api/v1/titles/{first}/stats/"):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_MODIFIED, url
+        for url in ("/api/v1/titles/0/", "/api/v1/titles/0/stats/"):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                "Проверьте, что условный GET-запрос к несуществующему "
+                f"объекту (`{url}`) получает ответ 404, а не 304."
+            )
+
+        review = user_client.post(
+            f"/api/v1/titles/{first}/reviews/",
+            data={"text": "Отзыв", "score": 8},
+        ).json()
+        comments_url = (
+            f"/api/v1/titles/{first}/reviews/{review['id']}/comments/"
+        )
+        etag = client.get(comments_url)["ETag"]
+        assert client.get(
+            comments_url, HTTP_IF_NONE_MATCH=etag
+        ).status_code == HTTPStatus.NOT_MODIFIED
+        response = client.get(
+            f"/api/v1/titles/{second}/reviews/{review['id']}/comments/",
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            "Проверьте, что условный GET-запрос к комментариям отзыва на "
+            "другое произведение получает ответ 404."
+        )
+
+    def test_04_rebuild_aggregates_changes_etag(
+        self, client, admin_client, user_client
+    ):
+        from django.core.management import call_command
+        from reviews.models import Title
+
+        titles, _, _ = create_titles(admin_client)
+        detail_url = f'/api/v1/titles/{titles[0]["id"]}/'
+        user_client.post(
+            f"{detail_url}reviews/", data={"text": "Отзыв", "score": 8}
+        )
+        Title.objects.filter(pk=titles[0]["id"]).update(
+            rating_sum=2, rating=2, weighted_rating=2
+        )
+        response = client.get(detail_url)
+        assert response.json()["rating"] == 2
+        etag = response["ETag"]
+
+        call_command("rebuild_aggregates")
+        response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            "Проверьте, что `rebuild_aggregates`, исправив агрегаты, "
+            "меняет `ETag` произведения."
+        )
+        assert response.json()["rating"] == 8, (
+            "Проверьте, что после `rebuild_aggregates` кэш ответов не "
+            "отдаёт прежний рейтинг."
+        )
@@ -0,0 +1,124 @@
+import pytest
+
+from tests.utils import create_categories, create_genre, create_titles
+
+
+@pytest.mark.django_db(transaction=True)
+class Test16BulkCreate:
+    def test_01_titles(self, client, user_client, admin_client):
+        categories = create_categories(admin_client)
+        genres = create_genre(admin_client)
+        url = "/api/v1/titles/bulk/"
+        data = [
+            {
+                "name": "Первое",
+                "year": 2000,
+                "genre": [genres[0]["slug"], genres[1]["slug"]],
+                "category": categories[0]["slug"],
+            },
+            {
+                "name": "Второе",
+                "year": 2001,
+                "genre": [genres[2]["slug"]],
+                "category": categories[1]["slug"],
+                "description": "Описание",
+            },
+        ]
+        response = user_client.post(url, data=data, format="json")
+        assert response.status_code == 403, (
+            "Проверьте, что пакетно создавать произведения может только "
+            "администратор."
+        )
+
+        response = admin_client.post(url, data=data, format="json")
+        assert response.status_code == 201, (
+            f"Проверьте, что при POST запросе на `{url}` с корректными "
+            "данными возвращается статус 201."
+        )
+        outcomes = response.json()
+        assert [outcome["status"] for outcome in outcomes] == [
+            "created", "created"
+        ]
+        title = client.get(f'/api/v1/titles/{outcomes[0]["id"]}/').json()
+        assert title["name"] == "Первое"
+        assert {genre["slug"] for genre in title["genre"]} == {
+            genres[0]["slug"], genres[1]["slug"]
+        }, "Проверьте, что пакетное создание сохраняет жанры произведений."
+        assert client.get("/api/v1/titles/").json()["count"] == 2
+
+    def test_02_titles_partial(self, admin_client):
+        categories = create_categories(admin_client)
+        genres = create_genre(admin_client)
+        data = [
+            {
+                "name": "Верное",
+                "year": 2000,
+                "genre": [genres[0]["slug"]],
+                "category": categories[0]["slug"],
+            },
+            {
+                "name": "Неизвестный жанр",
+                "year": 2000,
+                "genre": ["unknown"],
+                "category": categories[0]["slug"],
+            },
+            {"name": "Без года", "genre": [genres[0]["slug"]]},
+        ]
+        response = admin_client.post(
+            "/api/v1/titles/bulk/", data=data, format="json"
+        )
+        assert response.status_code == 207, (
+            "Проверьте, что при частично корректном пакете возвращается "
+            "статус 207."
+        )
+        outcomes = response.json()
+        assert [outcome["status"] for outcome in outcomes] == [
+            "created", "error", "error"
+        ]
+        assert "genre" in outcomes[1]["errors"]
+        assert {"year", "category"} <= set(outcomes[2]["errors"])
+
+        response = admin_client.post(
+            "/api/v1/titles/bulk/", data=data[1:], format="json"
+        )
+        assert response.status_code == 400
+
+        response = admin_client.post(
+            "/api/v1/titles/bulk/", data=data[0], format="json"
+        )
+        assert response.status_code == 400, (
+            "Проверьте, что пакетное создание принимает только JSON-массив."
+        )
+
+    def test_03_reviews(self, admin_client, admin, user, user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/bulk/'
+        data = [
+            {"text": "От администратора", "score": 10},
+            {"text": "От пользователя", "score": 5, "author": user.username},
+            {"text": "Повтор", "score": 1, "author": user.username},
+            {"text": "Нет автора", "score": 1, "author": "nobody"},
+            {"text": "Плохая оценка", "score": 11},
+        ]
+        response = user_client.post(url, data=data, format="json")
+        assert response.status_code == 403
+
+        response = admin_client.post(url, data=data, format="json")
+        assert response.status_code == 207
+        assert [outcome["status"] for outcome in response.json()] == [
+            "created", "created", "error", "error", "error"
+        ], (
+            "Проверьте, что пакетное создание отзывов отклоняет второй "
+            "отзыв автора, неизвестных авторов и неверные оценки."
+        )
+
+        title = admin_client.get(f'/api/v1/titles/{titles[0]["id"]}/').json()
+        assert title["rating"] == 7, (
+            "Проверьте, что отзывы из пакета учитываются в рейтинге "
+            "произведения."
+        )
+        response = admin_client.post(url, data=data[:1], format="json")
+        assert response.status_code == 400, (
+            "Проверьте, что пакет не создаёт повторный отзыв автора на "
+            "то же произведение."
+        )
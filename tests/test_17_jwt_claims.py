@@ -0,0 +1,79 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+def obtain_client(user):
+    response = APIClient().post(
+        "/api/v1/auth/token/",
+        data={
+            "username": user.username,
+            "confirmation_code": str(user.confirmation_code),
+        },
+    )
+    assert response.status_code == 200
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+    return client
+
+
+def user_queries(context):
+    return [
+        query["sql"] for query in context.captured_queries
+        if "reviews_customuser" in query["sql"]
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test17JwtClaims:
+    def test_01_no_user_query(self, admin):
+        client = obtain_client(admin)
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                "/api/v1/genres/", data={"name": "Ужасы", "slug": "horror"}
+            )
+        assert response.status_code == 201
+        assert not user_queries(context), (
+            "Проверьте, что права администратора проверяются по claims "
+            "токена без запроса пользователя к БД."
+        )
+
+        response = client.get("/api/v1/users/me/")
+        assert response.json()["email"] == admin.email, (
+            "Проверьте, что `/users/me/` возвращает все поля пользователя."
+        )
+
+    def test_02_role_change(self, admin, admin_client, moderator):
+        client = obtain_client(moderator)
+        response = admin_client.patch(
+            f"/api/v1/users/{moderator.username}/", data={"role": "admin"}
+        )
+        assert response.status_code == 200
+        response = client.post(
+            "/api/v1/genres/", data={"name": "Ужасы", "slug": "horror"}
+        )
+        assert response.status_code == 201, (
+            "Проверьте, что изменение роли действует на уже выданные токены."
+        )
+
+        client = obtain_client(admin)
+        admin.is_active = False
+        admin.save()
+        response = client.get("/api/v1/users/me/")
+        assert response.status_code == 401, (
+            "Проверьте, что токен деактивированного пользователя перестаёт "
+            "действовать."
+        )
+
+    def test_03_claims_ttl(self, admin, settings):
+        client = obtain_client(admin)
+        settings.JWT_CLAIMS_TTL = 0
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(
+                "/api/v1/genres/", data={"name": "Ужасы", "slug": "horror"}
+            )
+        assert response.status_code == 201
+        assert user_queries(context), (
+            "Проверьте, что claims старше `JWT_CLAIMS_TTL` проверяются по БД."
+        )
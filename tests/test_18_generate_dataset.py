@@ -0,0 +1,80 @@
+import pytest
+from django.core.management import call_command
+
+OPTIONS = (
+    "--users", "50", "--categories", "3", "--genres", "5",
+    "--titles", "40", "--reviews", "400", "--comments", "200",
+    "--seed", "7", "--batch-size", "100",
+)
+
+
+def snapshot():
+    from reviews.models import Comment, GenreTitle, Review, Title
+
+    return (
+        list(Title.objects.order_by("pk").values_list(
+            "name", "year", "category_id", "rating_sum", "rating_count"
+        )),
+        list(GenreTitle.objects.order_by("title_id", "genre_id").values_list(
+            "title_id", "genre_id"
+        )),
+        list(Review.objects.order_by("pk").values_list(
+            "title_id", "author_id", "score", "pub_date"
+        )),
+        list(Comment.objects.order_by("pk").values_list(
+            "review_id", "author_id", "pub_date"
+        )),
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test18GenerateDataset:
+    def test_01_generate(self):
+        from reviews.models import Comment, CustomUser, Review, Title
+
+        call_command("generate_dataset", *OPTIONS)
+        assert CustomUser.objects.count() == 50
+        assert Title.objects.count() == 40
+        assert 300 < Review.objects.count() <= 400, (
+            "Проверьте, что `generate_dataset` создаёт примерно заданное "
+            "количество отзывов."
+        )
+        assert Comment.objects.exists()
+        call_command("rebuild_aggregates", "--check")
+
+        first = snapshot()
+        call_command("flush", "--no-input")
+        call_command("generate_dataset", *OPTIONS)
+        assert snapshot() == first, (
+            "Проверьте, что `generate_dataset` с одинаковым `--seed` "
+            "создаёт одинаковые данные."
+        )
+
+    def test_02_reference_date(self):
+        from datetime import datetime, timezone
+
+        from django.db.models import Max, Min
+        from reviews.models import Comment, Review, Title
+
+        call_command("generate_dataset", *OPTIONS, "--now", "2015-06-01")
+        reference = datetime(2015, 6, 1, tzinfo=timezone.utc)
+        latest = max(
+            model.objects.aggregate(latest=Max("pub_date"))["latest"]
+            for model in (Review, Comment)
+        )
+        assert latest <= reference, (
+            "Проверьте, что даты отзывов и комментариев `generate_dataset` "
+            "отсчитываются от `--now`, а не от текущего времени."
+        )
+        assert Title.objects.aggregate(year=Max("year"))["year"] <= 2015
+        assert Review.objects.aggregate(
+            earliest=Min("pub_date")
+        )["earliest"].year >= 2010
+
+    def test_03_api(self, client):
+        call_command("generate_dataset", *OPTIONS)
+        response = client.get("/api/v1/titles/")
+        assert response.status_code == 200
+        title = response.json()["results"][0]
+        response = client.get(f'/api/v1/titles/{title["id"]}/reviews/')
+        assert response.status_code == 200
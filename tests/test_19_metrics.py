@@ -0,0 +1,132 @@
+import json
+import os
+import time
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import create_titles
+
+TOKEN = "metrics-token"
+
+
+@pytest.fixture(autouse=True)
+def metrics_token(settings):
+    settings.METRICS_TOKEN = TOKEN
+
+
+def metric(client, name, labels=""):
+    text = client.get(
+        "/metrics/", HTTP_AUTHORIZATION=f"Bearer {TOKEN}"
+    ).content.decode()
+    prefix = f"yamdb_{name}{{{labels}}} " if labels else f"yamdb_{name} "
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return 0.0
+
+
+@pytest.mark.django_db(transaction=True)
+class Test19Metrics:
+    def test_01_route_metrics(self, client, admin_client):
+        titles, _, _ = create_titles(admin_client)
+        labels = 'route="title-list",method="GET"'
+        before = {
+            name: metric(client, name, labels)
+            for name in ("http_requests_total", "db_queries_total",
+                         "serializer_duration_seconds_total",
+                         "response_size_bytes_total")
+        }
+        response = admin_client.get("/api/v1/titles/")
+        assert response.status_code == 200
+
+        assert metric(client, "http_requests_total", labels) == (
+            before["http_requests_total"] + 1
+        ), (
+            "Проверьте, что `/metrics/` считает запросы по имени маршрута."
+        )
+        assert metric(client, "db_queries_total", labels) > (
+            before["db_queries_total"]
+        )
+        assert metric(client, "serializer_duration_seconds_total",
+                      labels) > before["serializer_duration_seconds_total"]
+        assert metric(client, "response_size_bytes_total", labels) == (
+            before["response_size_bytes_total"] + len(response.content)
+        )
+        assert metric(
+            client, "http_request_duration_seconds_bucket",
+            f'{labels},le="+Inf"',
+        ) == before["http_requests_total"] + 1
+
+        client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert metric(
+            client, "http_requests_total", 'route="title-detail",method="GET"'
+        ) > 0
+
+    def test_02_multiple_processes(self, client, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        labels = 'route="genre-list",method="GET"'
+        client.get("/api/v1/genres/")
+        own = metric(client, "http_requests_total", labels)
+        other = {
+            "routes": [["genre-list", "GET",
+                        [5, 0.5, [5] + [0] * 10, 10, 0.1, 0.2, 500]]],
+            "cache": {"hits": 1, "misses": 2, "evictions": 0,
+                      "entries": 3, "max_entries": 10},
+            "mail_queue_depth": 4,
+        }
+        (tmp_path / "metrics-other.json").write_text(json.dumps(other))
+        assert metric(client, "http_requests_total", labels) == own + 5, (
+            "Проверьте, что `/metrics/` суммирует счётчики всех процессов "
+            "из `METRICS_DIR`."
+        )
+        assert metric(client, "mail_queue_depth") >= 4
+
+    def test_03_requires_token(self, client, admin_client, settings):
+        for headers in ({}, {"HTTP_AUTHORIZATION": "Bearer wrong"}):
+            response = client.get("/metrics/", **headers)
+            assert response.status_code == HTTPStatus.FORBIDDEN, (
+                "Проверьте, что `/metrics/` без верного токена из "
+                "`METRICS_TOKEN` возвращает статус 403."
+            )
+        assert admin_client.get("/metrics/").status_code == (
+            HTTPStatus.FORBIDDEN
+        )
+        settings.METRICS_TOKEN = ""
+        response = client.get("/metrics/", HTTP_AUTHORIZATION="Bearer ")
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            "Проверьте, что без `METRICS_TOKEN` метрики недоступны."
+        )
+
+    def test_04_stale_files_are_retired(self, client, settings, tmp_path):
+        settings.METRICS_DIR = str(tmp_path)
+        labels = 'route="genre-list",method="GET"'
+        own = metric(client, "http_requests_total", labels)
+        stale = time.time() - settings.METRICS_STALE_AFTER - 1
+        for name, requests in (("first", 5), ("second", 2)):
+            path = tmp_path / f"metrics-{name}.json"
+            path.write_text(json.dumps({
+                "routes": [["genre-list", "GET",
+                            [requests, 0.5, [requests] + [0] * 10,
+                             10, 0.1, 0.2, 500]]],
+                "cache": {"hits": 1, "misses": 2, "evictions": 0,
+                          "entries": 3, "max_entries": 10},
+                "mail_queue_depth": 4,
+            }))
+            os.utime(path, (stale, stale))
+            assert metric(client, "http_requests_total", labels) == (
+                own + 7 if name == "second" else own + 5
+            ), (
+                "Проверьте, что счётчики завершившихся процессов остаются "
+                "в сумме."
+            )
+            assert not path.exists(), (
+                "Проверьте, что `/metrics/` удаляет файлы процессов, "
+                "которые не обновлялись `METRICS_STALE_AFTER` секунд."
+            )
+        assert metric(client, "http_requests_total", labels) == own + 7
+        assert metric(client, "response_cache_hits_total") >= 2
+        assert len(list(tmp_path.glob("metrics-*.json"))) == 1, (
+            "Проверьте, что в `METRICS_DIR` остаётся только файл текущего "
+            "процесса."
+        )
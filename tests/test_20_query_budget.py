@@ -0,0 +1,266 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import check_query_budget
+
+# Маршрут: URL, клиент и наибольшее число SQL-запросов для страницы из
+# одного объекта и полной страницы (PAGE_SIZE = 5). Бюджет включает
+# загрузку пользователя по токену без claims из фикстур.
+BUDGETS = {
+    "title-list": ("/api/v1/titles/", "user", {1: 4, 5: 4}),
+    "title-detail": ("/api/v1/titles/{title}/", "user", {1: 3, 5: 3}),
+    "title-stats": ("/api/v1/titles/{title}/stats/", "user", {1: 3, 5: 3}),
+    "title-stats-batch": (
+        "/api/v1/titles/stats/?ids={titles}", "user", {1: 3, 5: 3}
+    ),
+    "title-top": ("/api/v1/titles/top/", "user", {1: 3, 5: 3}),
+    "genre-list": ("/api/v1/genres/", "user", {1: 3, 5: 3}),
+    "category-list": ("/api/v1/categories/", "user", {1: 3, 5: 3}),
+    "reviews-list": (
+        "/api/v1/titles/{title}/reviews/", "user", {1: 4, 5: 4}
+    ),
+    "reviews-detail": (
+        "/api/v1/titles/{title}/reviews/{review}/", "user", {1: 3, 5: 3}
+    ),
+    "comments-list": (
+        "/api/v1/titles/{title}/reviews/{review}/comments/", "user",
+        {1: 4, 5: 4},
+    ),
+    "comments-detail": (
+        "/api/v1/titles/{title}/reviews/{review}/comments/{comment}/",
+        "user", {1: 3, 5: 3},
+    ),
+    "user-list": ("/api/v1/users/", "admin", {1: 3, 5: 3}),
+    "user-detail": ("/api/v1/users/{username}/", "admin", {1: 2, 5: 2}),
+    "user-me": ("/api/v1/users/me/", "user", {1: 1, 5: 1}),
+}
+
+
+# Изменяющий маршрут: метод, URL, клиент, тело запроса (функция от
+# объектов и их количества), ожидаемый статус и наибольшее число
+# SQL-запросов, когда у изменяемого объекта один и пять связанных
+# объектов (для пакетной загрузки - когда в пакете один и пять
+# элементов).
+WRITE_BUDGETS = {
+    "title-create": (
+        "post", "/api/v1/titles/", "admin",
+        lambda ids, count: {
+            "name": "Новое произведение", "year": 2000,
+            "genre": [f"genre-{ids['index']}"],
+            "category": f"category-{ids['index']}",
+        },
+        HTTPStatus.CREATED, {1: 5, 5: 5},
+    ),
+    "title-partial-update": (
+        "patch", "/api/v1/titles/{title}/", "admin",
+        lambda ids, count: {"name": "Новое название"},
+        HTTPStatus.OK, {1: 6, 5: 6},
+    ),
+    "title-destroy": (
+        "delete", "/api/v1/titles/{title}/", "admin", None,
+        HTTPStatus.NO_CONTENT, {1: 12, 5: 12},
+    ),
+    "title-bulk": (
+        "post", "/api/v1/titles/bulk/", "admin",
+        lambda ids, count: [
+            {
+                "name": f"Пакет {number}", "year": 2000,
+                "genre": [f"genre-{ids['index']}"],
+                "category": f"category-{ids['index']}",
+            }
+            for number in range(count)
+        ],
+        HTTPStatus.CREATED, {1: 7, 5: 7},
+    ),
+    "genre-create": (
+        "post", "/api/v1/genres/", "admin",
+        lambda ids, count: {
+            "name": "Новый жанр", "slug": f"new-genre-{ids['index']}"
+        },
+        HTTPStatus.CREATED, {1: 3, 5: 3},
+    ),
+    "genre-destroy": (
+        "delete", "/api/v1/genres/genre-{index}/", "admin", None,
+        HTTPStatus.NO_CONTENT, {1: 6, 5: 6},
+    ),
+    "category-create": (
+        "post", "/api/v1/categories/", "admin",
+        lambda ids, count: {
+            "name": "Новая категория",
+            "slug": f"new-category-{ids['index']}",
+        },
+        HTTPStatus.CREATED, {1: 3, 5: 3},
+    ),
+    "category-destroy": (
+        "delete", "/api/v1/categories/category-{index}/", "admin", None,
+        HTTPStatus.NO_CONTENT, {1: 6, 5: 6},
+    ),
+    "reviews-create": (
+        "post", "/api/v1/titles/{unreviewed}/reviews/", "user",
+        lambda ids, count: {"text": "Новый отзыв", "score": 7},
+        HTTPStatus.CREATED, {1: 11, 5: 11},
+    ),
+    "reviews-partial-update": (
+        "patch", "/api/v1/titles/{title}/reviews/{review}/", "admin",
+        lambda ids, count: {"score": 3},
+        HTTPStatus.OK, {1: 13, 5: 13},
+    ),
+    "reviews-destroy": (
+        "delete", "/api/v1/titles/{title}/reviews/{review}/", "admin",
+        None, HTTPStatus.NO_CONTENT, {1: 10, 5: 10},
+    ),
+    "reviews-bulk": (
+        "post", "/api/v1/titles/{unreviewed}/reviews/bulk/", "admin",
+        lambda ids, count: [
+            {"text": "Пакетный отзыв", "score": 8, "author": username}
+            for username in ids["usernames"]
+        ],
+        HTTPStatus.CREATED, {1: 16, 5: 16},
+    ),
+    "comments-create": (
+        "post", "/api/v1/titles/{title}/reviews/{review}/comments/", "user",
+        lambda ids, count: {"text": "Новый комментарий"},
+        HTTPStatus.CREATED, {1: 5, 5: 5},
+    ),
+    "comments-partial-update": (
+        "patch",
+        "/api/v1/titles/{title}/reviews/{review}/comments/{comment}/",
+        "admin", lambda ids, count: {"text": "Исправленный комментарий"},
+        HTTPStatus.OK, {1: 5, 5: 5},
+    ),
+    "comments-destroy": (
+        "delete",
+        "/api/v1/titles/{title}/reviews/{review}/comments/{comment}/",
+        "admin", None, HTTPStatus.NO_CONTENT, {1: 6, 5: 6},
+    ),
+    "auth-signup": (
+        "post", "/api/v1/auth/signup/", "guest",
+        lambda ids, count: {
+            "username": f"signup_{ids['index']}",
+            "email": f"signup_{ids['index']}@yamdb.fake",
+        },
+        HTTPStatus.OK, {1: 4, 5: 4},
+    ),
+    "auth-token": (
+        "post", "/api/v1/auth/token/", "guest",
+        lambda ids, count: {
+            "username": ids["username"],
+            "confirmation_code": ids["confirmation_code"],
+        },
+        HTTPStatus.OK, {1: 2, 5: 2},
+    ),
+}
+
+
+def create_objects(start, stop, ids=None):
+    """Объекты с номерами [start, stop) для каждого списка маршрутов."""
+    from reviews.models import (Category, Comment, CustomUser, Genre,
+                                GenreTitle, Review, Title)
+
+    for index in range(start, stop):
+        author = CustomUser.objects.create_user(
+            username=f"budget_{index}", email=f"budget_{index}@yamdb.fake"
+        )
+        category = Category.objects.create(
+            name=f"Категория {index}", slug=f"category-{index}"
+        )
+        genre = Genre.objects.create(
+            name=f"Жанр {index}", slug=f"genre-{index}"
+        )
+        title = Title.objects.create(
+            name=f"Произведение {index}", year=2000, category=category
+        )
+        GenreTitle.objects.create(title=title, genre=genre)
+        if ids is None:
+            review = Review.objects.create(
+                title=title, author=author, text="Отзыв", score=5
+            )
+            comment = Comment.objects.create(
+                review=review, author=author, text="Комментарий"
+            )
+            ids = {
+                "title": title.pk,
+                "titles": str(title.pk),
+                "review": review.pk,
+                "comment": comment.pk,
+                "username": author.username,
+            }
+            continue
+        ids["titles"] += f",{title.pk}"
+        # Оценка у каждого произведения - для рейтинга лучших.
+        Review.objects.create(title=title, author=author, text="Отзыв",
+                              score=index % 10 + 1)
+        review = Review.objects.create(
+            title_id=ids["title"], author=author, text="Отзыв", score=5
+        )
+        Comment.objects.create(
+            review_id=ids["review"], author=author, text="Комментарий"
+        )
+    return ids
+
+
+def create_write_objects(start, count):
+    """
+    Объекты create_objects с номерами [start, start + count): у первого
+    произведения count отзывов, у первого отзыва count комментариев.
+    Плюс произведение без отзывов для создания отзывов.
+    """
+    from reviews.models import CustomUser, Title
+
+    ids = create_objects(start, start + count)
+    usernames = [f"budget_{index}" for index in range(start, start + count)]
+    ids.update(
+        index=start,
+        usernames=usernames,
+        unreviewed=Title.objects.create(
+            name=f"Без отзывов {start}", year=2000
+        ).pk,
+        confirmation_code=str(CustomUser.objects.get(
+            username=ids["username"]
+        ).confirmation_code),
+    )
+    return ids
+
+
+@pytest.mark.django_db(transaction=True)
+class Test20QueryBudget:
+    @pytest.mark.parametrize("route", BUDGETS)
+    def test_01_budget(self, route, user_client, admin_client):
+        url, client_name, budgets = BUDGETS[route]
+        client = {"user": user_client, "admin": admin_client}[client_name]
+        created = 0
+        queries = {}
+        ids = None
+        for page_size, budget in sorted(budgets.items()):
+            ids = create_objects(created, page_size, ids)
+            created = page_size
+            queries[page_size] = check_query_budget(
+                client, url.format(**ids), budget
+            )
+        assert len(set(queries.values())) == 1, (
+            f"Проверьте, что число SQL-запросов к `{url}` не зависит от "
+            f"количества объектов на странице: {queries}."
+        )
+
+    @pytest.mark.parametrize("route", WRITE_BUDGETS)
+    def test_02_write_budget(self, route, client, user_client, admin_client):
+        method, url, client_name, body, status, budgets = WRITE_BUDGETS[route]
+        client = {
+            "guest": client, "user": user_client, "admin": admin_client
+        }[client_name]
+        created = 0
+        queries = {}
+        for count, budget in sorted(budgets.items()):
+            ids = create_write_objects(created, count)
+            created += count
+            queries[count] = check_query_budget(
+                client, url.format(**ids), budget, method=method,
+                data=body and body(ids, count), status=status,
+                warm_up="/api/v1/titles/",
+            )
+        assert len(set(queries.values())) == 1, (
+            f"Проверьте, что число SQL-запросов {method.upper()}-запроса к "
+            f"`{url}` не зависит от количества связанных объектов: "
+            f"{queries}."
+        )
@@ -0,0 +1,88 @@
+import sqlite3
+import threading
+
+import pytest
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+
+
+def make_connection(path, **options):
+    handler = ConnectionHandler({
+        "default": {
+            "ENGINE": "api_yamdb.sqlite",
+            "NAME": str(path),
+            "OPTIONS": options,
+        }
+    })
+    return handler["default"]
+
+
+def lock_database(path):
+    """Соединение в обход Django, держащее блокировку записи."""
+    holder = sqlite3.connect(
+        str(path), timeout=0, isolation_level=None, check_same_thread=False
+    )
+    holder.execute("BEGIN IMMEDIATE")
+    return holder
+
+
+@pytest.mark.django_db(transaction=True)
+class Test21SqliteProfile:
+    def test_01_pragmas(self, settings, tmp_path):
+        connection = make_connection(
+            tmp_path / "db.sqlite3", **settings.SQLITE_PRODUCTION_OPTIONS
+        )
+        expected = {
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,
+            "busy_timeout": 5000,
+            "temp_store": 2,
+        }
+        with connection.cursor() as cursor:
+            for pragma, value in expected.items():
+                cursor.execute(f"PRAGMA {pragma}")
+                assert cursor.fetchone()[0] == value, (
+                    f"Проверьте, что рабочий профиль БД задаёт PRAGMA "
+                    f"{pragma}."
+                )
+        connection.close()
+
+    def test_02_begin_immediate(self, tmp_path):
+        path = tmp_path / "db.sqlite3"
+        connection = make_connection(path)
+        connection.ensure_connection()
+        # Так транзакцию начинает transaction.atomic.
+        connection.set_autocommit(
+            False, force_begin_transaction_with_broken_autocommit=True
+        )
+        with pytest.raises(sqlite3.OperationalError):
+            # Транзакция без единой записи уже держит блокировку записи.
+            lock_database(path)
+        connection.rollback()
+        connection.set_autocommit(True)
+        connection.close()
+
+    def test_03_retry_locked(self, tmp_path):
+        path = tmp_path / "db.sqlite3"
+        options = {"timeout": 0, "lock_backoff": 0.02}
+        with make_connection(path).cursor() as cursor:
+            cursor.execute("CREATE TABLE numbers (value integer)")
+
+        holder = lock_database(path)
+        connection = make_connection(path, **options)
+        with pytest.raises(OperationalError):
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO numbers VALUES (1)")
+
+        connection = make_connection(path, lock_retries=8, **options)
+        threading.Timer(0.05, holder.execute, ("COMMIT",)).start()
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO numbers VALUES (2)")
+            cursor.execute("SELECT value FROM numbers")
+            assert cursor.fetchall() == [(2,)], (
+                "Проверьте, что запрос повторяется, пока база данных "
+                "заблокирована другим соединением."
+            )
+        holder.close()
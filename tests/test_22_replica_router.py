@@ -0,0 +1,126 @@
+import time
+from http import HTTPStatus
+
+import pytest
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_categories, create_genre, create_titles
+
+
+@pytest.fixture
+def replica(settings):
+    """Реплика - второе соединение к тестовой БД."""
+    connections.databases["replica"] = dict(
+        connections[DEFAULT_DB_ALIAS].settings_dict
+    )
+    settings.DATABASE_REPLICA_ALIAS = "replica"
+    yield connections["replica"]
+    connections["replica"].close()
+    del connections["replica"]
+    del connections.databases["replica"]
+
+
+def age_changes(seconds=60):
+    """Изменения ресурсов давно дошли до реплики."""
+    from django.core.cache import cache
+    from reviews import versions
+
+    cache.set_many({
+        versions.MODIFIED_KEY.format(resource): int(time.time()) - seconds
+        for resource in versions.RESOURCES
+    }, timeout=None)
+
+
+def count_queries(connection, client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True)
+class Test22ReplicaRouter:
+    def test_01_reads_go_to_replica(self, admin_client, user_client,
+                                    replica):
+        titles, _, _ = create_titles(admin_client)
+        age_changes()
+        urls = (
+            "/api/v1/titles/",
+            f"/api/v1/titles/{titles[0]['id']}/",
+            "/api/v1/genres/",
+            "/api/v1/categories/",
+            f"/api/v1/titles/{titles[0]['id']}/reviews/",
+        )
+        for url in urls:
+            assert count_queries(replica, user_client, url), (
+                f"Проверьте, что GET-запрос к `{url}` читает данные с "
+                "реплики БД."
+            )
+        assert not count_queries(
+            replica, user_client, "/api/v1/users/me/"
+        ), "Проверьте, что `/api/v1/users/me/` не читает с реплики БД."
+
+    def test_02_writes_go_to_primary(self, admin_client, replica):
+        create_categories(admin_client)
+        with CaptureQueriesContext(replica) as context:
+            response = admin_client.post(
+                "/api/v1/genres/", data={"name": "Жанр", "slug": "genre"}
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        assert not context.captured_queries, (
+            "Проверьте, что запросы на запись не обращаются к реплике БД."
+        )
+
+    def test_03_sticky_after_write(self, admin_client, user_client,
+                                   replica, settings):
+        create_genre(admin_client)
+        age_changes()
+        assert not count_queries(replica, admin_client, "/api/v1/genres/"), (
+            "Проверьте, что после записи пользователь читает из основной "
+            "БД."
+        )
+        assert count_queries(replica, user_client, "/api/v1/genres/"), (
+            "Проверьте, что запись одного пользователя не отключает "
+            "реплику для других."
+        )
+        settings.DATABASE_REPLICA_STICKY_SECONDS = 0
+        admin_client.post(
+            "/api/v1/genres/", data={"name": "Жанр", "slug": "other"}
+        )
+        age_changes()
+        assert count_queries(replica, admin_client, "/api/v1/genres/"), (
+            "Проверьте, что чтение из основной БД после записи ограничено "
+            "DATABASE_REPLICA_STICKY_SECONDS."
+        )
+
+    def test_04_fresh_changes_stay_on_replica(self, admin_client, client,
+                                               replica):
+        create_genre(admin_client)
+        age_changes()
+        assert count_queries(replica, client, "/api/v1/genres/")
+        admin_client.post(
+            "/api/v1/genres/", data={"name": "Жанр", "slug": "other"}
+        )
+        assert count_queries(replica, client, "/api/v1/genres/"), (
+            "Проверьте, что изменение ресурса не отключает реплику для "
+            "анонимов и других пользователей."
+        )
+        response = client.get("/api/v1/genres/")
+        assert response["X-Cache"] == "MISS", (
+            "Проверьте, что пока реплика может отставать от изменения "
+            "ресурса, прочитанный с неё ответ не сохраняется в кэш."
+        )
+        assert not response.has_header("ETag") and not response.has_header(
+            "Last-Modified"
+        ), (
+            "Проверьте, что ответ, прочитанный с возможно отстающей "
+            "реплики, не получает ETag новой версии."
+        )
+        age_changes()
+        response = client.get("/api/v1/genres/")
+        assert response.has_header("ETag")
+        assert client.get("/api/v1/genres/")["X-Cache"] == "HIT", (
+            "Проверьте, что после окна DATABASE_REPLICA_STICKY_SECONDS "
+            "ответы с реплики снова кэшируются."
+        )
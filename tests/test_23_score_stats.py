@@ -0,0 +1,99 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from tests.utils import create_single_review, create_titles
+
+
+def histogram(**counts):
+    result = {str(score): 0 for score in range(1, 11)}
+    result.update({score[1:]: count for score, count in counts.items()})
+    return result
+
+
+@pytest.mark.django_db(transaction=True)
+class Test23ScoreStats:
+    def test_01_stats_follow_reviews(self, admin_client, admin, user_client,
+                                     user, moderator_client):
+        from reviews.models import Review
+
+        titles, _, _ = create_titles(admin_client)
+        url = f"/api/v1/titles/{titles[0]['id']}/stats/"
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f"Проверьте, что GET-запрос к `{url}` возвращает статус 200."
+        )
+        assert response.json() == {
+            "title": titles[0]["id"], "count": 0, "mean": None,
+            "median": None, "histogram": histogram(),
+        }, "Проверьте статистику оценок произведения без отзывов."
+
+        for client, score in ((admin_client, 2), (user_client, 9),
+                              (moderator_client, 9)):
+            create_single_review(client, titles[0]["id"], "Отзыв", score)
+        assert user_client.get(url).json() == {
+            "title": titles[0]["id"], "count": 3, "mean": 20 / 3,
+            "median": 9.0, "histogram": histogram(_2=1, _9=2),
+        }, (
+            "Проверьте, что статистика оценок учитывает созданные отзывы."
+        )
+
+        review = Review.objects.get(author=user)
+        review.score = 4
+        review.save()
+        admin.delete()
+        assert user_client.get(url).json() == {
+            "title": titles[0]["id"], "count": 2, "mean": 6.5,
+            "median": 6.5, "histogram": histogram(_4=1, _9=1),
+        }, (
+            "Проверьте, что статистика оценок учитывает изменение и "
+            "удаление отзывов."
+        )
+
+        assert user_client.get(
+            "/api/v1/titles/100500/stats/"
+        ).status_code == HTTPStatus.NOT_FOUND, (
+            "Проверьте, что статистика несуществующего произведения "
+            "возвращает статус 404."
+        )
+
+    def test_02_batch(self, admin_client, user_client,
+                      django_assert_max_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[1]["id"], "Отзыв", 7)
+        ids = f"{titles[1]['id']},100500,{titles[0]['id']},{titles[1]['id']}"
+        with django_assert_max_num_queries(3):
+            response = user_client.get(f"/api/v1/titles/stats/?ids={ids}")
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert [item["title"] for item in data] == [
+            titles[1]["id"], titles[0]["id"]
+        ], (
+            "Проверьте, что пакетный запрос статистики возвращает "
+            "существующие произведения в порядке ?ids= без повторов."
+        )
+        assert data[0]["histogram"] == histogram(_7=1)
+        assert data[1]["count"] == 0
+
+        for ids in ("", "1,abc", ",".join(map(str, range(1, 102)))):
+            response = user_client.get(f"/api/v1/titles/stats/?ids={ids}")
+            assert response.status_code == HTTPStatus.BAD_REQUEST, (
+                f"Проверьте, что `?ids={ids[:20]}` возвращает статус 400."
+            )
+
+    def test_03_rebuild_fixes_histogram(self, admin_client, user_client):
+        from reviews.models import TitleScoreCount
+
+        titles, _, _ = create_titles(admin_client)
+        create_single_review(user_client, titles[0]["id"], "Отзыв", 3)
+        TitleScoreCount.objects.update(count=5)
+        with pytest.raises(CommandError):
+            call_command("rebuild_aggregates", "--check")
+        call_command("rebuild_aggregates")
+        response = user_client.get(f"/api/v1/titles/{titles[0]['id']}/stats/")
+        assert response.json()["histogram"] == histogram(_3=1), (
+            "Проверьте, что `rebuild_aggregates` пересчитывает гистограммы "
+            "оценок."
+        )
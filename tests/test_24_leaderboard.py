@@ -0,0 +1,106 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import page_query_plan
+
+URL = "/api/v1/titles/top/"
+
+
+@pytest.fixture
+def ranked_titles():
+    """Произведения с известными суммой и количеством оценок."""
+    from reviews import aggregates
+    from reviews.models import Category, Genre, GenreTitle, Title
+
+    books = Category.objects.create(name="Книги", slug="books")
+    films = Category.objects.create(name="Фильмы", slug="films")
+    drama = Genre.objects.create(name="Драма", slug="drama")
+    titles = {}
+    for name, category, score_sum, score_count in (
+        ("Шедевр", books, 10, 1),
+        ("Классика", books, 90, 10),
+        ("Хит", films, 170, 20),
+        ("Середняк", films, 50, 10),
+        ("Новинка", films, 0, 0),
+    ):
+        title = Title.objects.create(name=name, year=2000, category=category)
+        aggregates.apply_review_delta(title.pk, score_sum, score_count)
+        titles[name] = title.pk
+    for name in ("Шедевр", "Середняк", "Новинка"):
+        GenreTitle.objects.create(genre=drama, title_id=titles[name])
+    return titles
+
+
+def names(response):
+    assert response.status_code == HTTPStatus.OK
+    return [title["name"] for title in response.json()["results"]]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test24Leaderboard:
+    def test_01_ranking(self, client, settings, ranked_titles):
+        settings.RATING_PRIOR_MEAN = 7.0
+        settings.RATING_PRIOR_WEIGHT = 10
+        assert names(client.get(URL)) == [
+            "Шедевр", "Классика", "Хит", "Середняк"
+        ], (
+            "Проверьте, что рейтинг лучших сортирует произведения с "
+            "отзывами по убыванию средней оценки."
+        )
+        assert names(client.get(f"{URL}?min_reviews=10")) == [
+            "Классика", "Хит", "Середняк"
+        ], "Проверьте, что `?min_reviews=` отсекает произведения."
+        response = client.get(f"{URL}?rank=weighted")
+        assert names(response) == [
+            "Хит", "Классика", "Шедевр", "Середняк"
+        ], (
+            "Проверьте, что `?rank=weighted` сортирует по байесовской "
+            "оценке."
+        )
+        assert response.json()["results"][0]["weighted_rating"] == 8.0
+        assert response.json()["results"][0]["reviews_count"] == 20
+
+    def test_02_genre_and_category(self, client, ranked_titles):
+        assert names(client.get(f"{URL}?category=films")) == [
+            "Хит", "Середняк"
+        ], "Проверьте рейтинг лучших в категории."
+        assert names(client.get(f"{URL}?genre=drama")) == [
+            "Шедевр", "Середняк"
+        ], "Проверьте рейтинг лучших в жанре."
+        assert client.get(
+            f"{URL}?genre=unknown"
+        ).status_code == HTTPStatus.NOT_FOUND
+        assert client.get(
+            f"{URL}?rank=best"
+        ).status_code == HTTPStatus.BAD_REQUEST
+
+    def test_03_keyset_pages(self, client, monkeypatch, ranked_titles):
+        from api.pagination import KeysetPagination
+
+        monkeypatch.setattr(KeysetPagination, "page_size", 3)
+        seen = []
+        url = URL
+        while url:
+            response = client.get(url)
+            seen.extend(names(response))
+            url = response.json()["next"]
+        assert seen == ["Шедевр", "Классика", "Хит", "Середняк"], (
+            "Проверьте курсорную пагинацию рейтинга лучших."
+        )
+
+    @pytest.mark.parametrize("query", (
+        "", "?rank=weighted", "?min_reviews=5", "?category=films",
+        "?category=films&rank=weighted", "?genre=drama",
+    ))
+    def test_04_index_scan(self, client, ranked_titles, query):
+        plan = page_query_plan(client, f"{URL}{query}")
+        assert any("USING INDEX" in step and "rating_idx" in step
+                   or "weighted_idx" in step for step in plan), (
+            f"Проверьте, что страница `{URL}{query}` читается по индексу "
+            f"рейтинга: {plan}"
+        )
+        assert not any("TEMP B-TREE" in step for step in plan), (
+            f"Проверьте, что страница `{URL}{query}` не сортируется "
+            f"во временном B-дереве: {plan}"
+        )
@@ -0,0 +1,96 @@
+from http import HTTPStatus
+
+import pytest
+
+from tests.utils import page_query_plan
+
+URL = "/api/v1/titles/"
+
+
+@pytest.fixture
+def titles():
+    from reviews import aggregates
+    from reviews.models import Category, Title
+
+    books = Category.objects.create(name="Книги", slug="books")
+    films = Category.objects.create(name="Фильмы", slug="films")
+    for name, year, category, score in (
+        ("Буря", 1611, books, 6),
+        ("Аэлита", 1923, books, 9),
+        ("Вий", 1967, films, 7),
+        ("Гамлет", 1948, films, None),
+    ):
+        title = Title.objects.create(name=name, year=year, category=category)
+        if score:
+            aggregates.apply_review_delta(title.pk, score, 1)
+
+
+def names(client, query):
+    response = client.get(f"{URL}?{query}")
+    assert response.status_code == HTTPStatus.OK
+    return [title["name"] for title in response.json()["results"]]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test25TitleOrdering:
+    @pytest.mark.parametrize("query, expected", (
+        ("ordering=name", ["Аэлита", "Буря", "Вий", "Гамлет"]),
+        ("ordering=-name", ["Гамлет", "Вий", "Буря", "Аэлита"]),
+        ("ordering=year", ["Буря", "Аэлита", "Гамлет", "Вий"]),
+        ("ordering=-year", ["Вий", "Гамлет", "Аэлита", "Буря"]),
+        ("ordering=-rating", ["Аэлита", "Вий", "Буря", "Гамлет"]),
+        ("ordering=newest", ["Гамлет", "Вий", "Аэлита", "Буря"]),
+        ("ordering=-year&category=films", ["Вий", "Гамлет"]),
+        ("ordering=-year&pagination=cursor", ["Вий", "Гамлет", "Аэлита",
+                                              "Буря"]),
+    ))
+    def test_01_ordering(self, client, titles, query, expected):
+        assert names(client, query) == expected, (
+            f"Проверьте сортировку произведений `?{query}`."
+        )
+
+    def test_02_invalid_ordering(self, client, titles):
+        response = client.get(f"{URL}?ordering=description")
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            "Проверьте, что неизвестная сортировка возвращает статус 400."
+        )
+
+    @pytest.mark.parametrize("query, index", (
+        ("", "title_name_idx"),
+        ("ordering=name", "title_name_idx"),
+        ("ordering=-name", "title_name_idx"),
+        ("ordering=year", "title_year_idx"),
+        ("ordering=-year", "title_year_idx"),
+        ("ordering=rating", "title_rating_idx"),
+        ("ordering=-rating", "title_rating_idx"),
+        ("ordering=newest", None),
+        ("ordering=-year&category=films", "title_category_year_idx"),
+        ("ordering=-rating&category=films", "title_category_rating_idx"),
+        ("ordering=-year&pagination=cursor", "title_year_idx"),
+        ("ordering=-rating&pagination=cursor", "title_rating_idx"),
+        ("ordering=rating&pagination=cursor", "title_rating_idx"),
+    ))
+    def test_03_index_order(self, admin_client, titles, monkeypatch, query,
+                            index):
+        from api.pagination import KeysetPagination
+
+        # Страницы по одному произведению: курсор проходит и по NULL.
+        monkeypatch.setattr(KeysetPagination, "page_size", 1)
+        url = f"{URL}?{query}"
+        while url:
+            plan = page_query_plan(admin_client, url)
+            assert not any("TEMP B-TREE" in step for step in plan), (
+                f"Проверьте, что страница `{url}` не сортируется во "
+                f"временном B-дереве: {plan}"
+            )
+            if "cursor=" in url:
+                assert not any(step.startswith("SCAN") for step in plan), (
+                    f"Проверьте, что страница курсора `{url}` ищет "
+                    f"позицию по индексу, а не просматривает его: {plan}"
+                )
+            if index:
+                assert any(f"INDEX {index}" in step for step in plan), (
+                    f"Проверьте, что страница `{url}` читается по индексу "
+                    f"{index}: {plan}"
+                )
+            url = admin_client.get(url).json().get("next")
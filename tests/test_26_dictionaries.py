@@ -0,0 +1,142 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import create_titles
+
+
+def dictionary_queries(context):
+    return [
+        query["sql"] for query in context.captured_queries
+        if '"reviews_genre"' in query["sql"]
+        or '"reviews_category"' in query["sql"]
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test26Dictionaries:
+    def test_01_reads_and_writes_skip_dictionary_tables(
+        self, admin_client, user_client
+    ):
+        titles, categories, genres = create_titles(admin_client)
+        user_client.get("/api/v1/titles/")
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get("/api/v1/titles/")
+            assert response.status_code == HTTPStatus.OK
+            user_client.get(f"/api/v1/titles/{titles[0]['id']}/")
+            response = admin_client.post("/api/v1/titles/", data={
+                "name": "Новое",
+                "year": 2000,
+                "genre": [genre["slug"] for genre in genres],
+                "category": categories[0]["slug"],
+            })
+            assert response.status_code == HTTPStatus.CREATED
+        assert not dictionary_queries(context), (
+            "Проверьте, что чтение и создание произведений берут жанры и "
+            "категории из кэша процесса, а не из БД."
+        )
+        assert response.json()["genre"] == sorted(
+            genres, key=lambda genre: genre["name"]
+        )
+        assert response.json()["category"] == categories[0]
+
+    def test_02_version_invalidates_cache(self, admin_client, user_client):
+        from reviews import versions
+        from reviews.models import Genre
+
+        titles, _, genres = create_titles(admin_client)
+        url = f"/api/v1/titles/{titles[1]['id']}/"
+        user_client.get(url)
+        # Изменение в обход сигналов, как в другом процессе до того, как
+        # он повысил версию.
+        Genre.objects.filter(slug=genres[2]["slug"]).update(name="Трагедия")
+        assert user_client.get(url).json()["genre"][0]["name"] == (
+            genres[2]["name"]
+        )
+        versions.bump_version("genres")
+        assert user_client.get(url).json()["genre"][0]["name"] == (
+            "Трагедия"
+        ), "Проверьте, что новая версия жанров сбрасывает кэш процесса."
+
+        response = admin_client.post(
+            "/api/v1/genres/", data={"name": "Нуар", "slug": "noir"}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        response = admin_client.patch(url, data={"genre": ["noir"]})
+        assert response.status_code == HTTPStatus.OK, (
+            "Проверьте, что новый жанр доступен сразу после создания."
+        )
+        response = admin_client.patch(url, data={"genre": ["unknown"]})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_03_ttl_and_shared_versions(self, admin_client, settings):
+        from django.core.cache import caches
+        from reviews import dictionaries, versions
+        from reviews.models import Genre
+
+        titles, _, _ = create_titles(admin_client)
+        admin_client.post(
+            "/api/v1/genres/", data={"name": "Нуар", "slug": "noir"}
+        )
+        assert dictionaries.genres.by_slug(["noir"])
+        # Удаление в обход сигналов, как при потерянном повышении версии.
+        queryset = Genre.objects.filter(slug="noir")
+        queryset._raw_delete(queryset.db)
+        settings.DICTIONARY_CACHE_TTL = 0
+        response = admin_client.patch(
+            f"/api/v1/titles/{titles[1]['id']}/", data={"genre": ["noir"]}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            "Проверьте, что копия жанров перечитывается по истечении "
+            "`DICTIONARY_CACHE_TTL`, даже если версия не изменилась."
+        )
+
+        version = versions.get_version("genres")
+        # Отдельное подключение к кэшу, как в другом процессе.
+        other = caches.create_connection("default")
+        versions.bump_version("genres")
+        assert other.get(versions.VERSION_KEY.format("genres")) == (
+            version + 1
+        ), (
+            "Проверьте, что `CACHES['default']` - общий для процессов "
+            "бэкенд, а не память процесса."
+        )
+
+    def test_04_cache_calls_do_not_grow_with_page(
+        self, admin_client, user_client, monkeypatch
+    ):
+        from api_yamdb.sqlite.cache import SQLiteCache
+        from reviews.models import Title
+
+        titles, _, _ = create_titles(admin_client)
+        statements = []
+        connect = SQLiteCache._connection
+
+        def counting_connection(backend):
+            statements.append(1)
+            return connect(backend)
+
+        monkeypatch.setattr(SQLiteCache, "_connection", counting_connection)
+
+        def count_statements(url):
+            user_client.get(url)
+            statements.clear()
+            assert user_client.get(url).status_code == HTTPStatus.OK
+            return len(statements)
+
+        calls = {len(titles): count_statements("/api/v1/titles/")}
+        title = Title.objects.get(pk=titles[0]["id"])
+        for number in range(3):
+            copy = Title.objects.create(
+                name=f"Копия {number}", year=2000,
+                category_id=title.category_id,
+            )
+            copy.genre.set(title.genre.all())
+        calls[len(titles) + 3] = count_statements("/api/v1/titles/")
+        assert len(set(calls.values())) == 1, (
+            "Проверьте, что версии жанров и категорий читаются из общего "
+            "кэша один раз на страницу, а не на каждое произведение: "
+            f"{calls}."
+        )
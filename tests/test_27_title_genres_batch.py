@@ -0,0 +1,76 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+URL = "/api/v1/titles/"
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Category, Genre
+
+    Category.objects.create(name="Книги", slug="books")
+    return [
+        Genre.objects.create(name=f"Жанр {index}", slug=f"genre-{index}").slug
+        for index in range(10)
+    ]
+
+
+def count_queries(request, *args, **kwargs):
+    with CaptureQueriesContext(connection) as context:
+        response = request(*args, **kwargs)
+    assert response.status_code in (HTTPStatus.OK, HTTPStatus.CREATED), (
+        response.json()
+    )
+    return len(context.captured_queries), response
+
+
+@pytest.mark.django_db(transaction=True)
+class Test27TitleGenresBatch:
+    def test_01_constant_queries(self, admin_client, genres):
+        from reviews.models import GenreTitle
+
+        def create(count):
+            return count_queries(admin_client.post, URL, data={
+                "name": "Произведение", "year": 2000,
+                "genre": genres[:count], "category": "books",
+            }, format="json")
+
+        # Первый запрос заполняет справочники в памяти процесса.
+        create(1)
+        one, _ = create(1)
+        ten, response = create(10)
+        assert one == ten, (
+            "Проверьте, что число SQL-запросов при создании произведения "
+            f"не зависит от числа жанров: 1 жанр - {one}, 10 - {ten}."
+        )
+
+        _, response = create(1)
+        url = f"{URL}{response.json()['id']}/"
+        # Каждое изменение и удаляет, и добавляет связи с жанрами.
+        patches = [
+            count_queries(admin_client.patch, url,
+                          data={"genre": slugs}, format="json")[0]
+            for slugs in (genres[1:2], genres[2:7], genres[7:10] + genres[:2])
+        ]
+        assert len(set(patches)) == 1, (
+            "Проверьте, что число SQL-запросов при изменении жанров "
+            f"произведения не зависит от их числа: {patches}."
+        )
+        assert set(GenreTitle.objects.filter(
+            title_id=response.json()["id"]
+        ).values_list("genre__slug", flat=True)) == set(
+            genres[7:10] + genres[:2]
+        )
+
+    def test_02_unknown_slugs(self, admin_client, genres):
+        response = admin_client.post(URL, data={
+            "name": "Произведение", "year": 2000,
+            "genre": [genres[0], "missing", "absent"], "category": "books",
+        }, format="json")
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json()["genre"] == [
+            "Жанры не найдены: missing, absent."
+        ], "Проверьте, что ошибка перечисляет все неизвестные жанры."
@@ -0,0 +1,130 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tests.utils import page_query_plan
+
+
+@pytest.fixture
+def titles(admin):
+    from reviews.models import Category, Review, Title
+
+    category = Category.objects.create(name="Книги", slug="books")
+    first, second = (
+        Title.objects.create(name=name, year=2000, category=category)
+        for name in ("Первое", "Второе")
+    )
+    review = Review.objects.create(
+        title=first, author=admin, text="Отзыв", score=7
+    )
+    return first, second, review
+
+
+def table_queries(context, table):
+    return [
+        query["sql"] for query in context.captured_queries
+        if query["sql"].startswith("SELECT")
+        and f'FROM "{table}"' in query["sql"]
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+class Test28NestedParents:
+    def test_01_comment_title_mismatch(self, user_client, titles):
+        first, second, review = titles
+        wrong = f"/api/v1/titles/{second.pk}/reviews/{review.pk}/comments/"
+        for response in (
+            user_client.get(wrong),
+            user_client.post(wrong, data={"text": "Комментарий"}),
+        ):
+            assert response.status_code == HTTPStatus.NOT_FOUND, (
+                "Проверьте, что комментарии к отзыву на другое произведение "
+                "возвращают статус 404."
+            )
+        right = f"/api/v1/titles/{first.pk}/reviews/{review.pk}/comments/"
+        response = user_client.post(right, data={"text": "Комментарий"})
+        assert response.status_code == HTTPStatus.CREATED, response.json()
+
+    def test_02_parent_loaded_once(self, user_client, titles):
+        first, _, review = titles
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                f"/api/v1/titles/{first.pk}/reviews/",
+                data={"text": "Отзыв", "score": 5},
+            )
+        assert response.status_code == HTTPStatus.CREATED, response.json()
+        assert len(table_queries(context, "reviews_title")) == 1, (
+            "Проверьте, что при создании отзыва произведение загружается "
+            "одним запросом."
+        )
+        assert not table_queries(context, "reviews_review"), (
+            "Проверьте, что повторный отзыв не ищется отдельным запросом "
+            "перед вставкой."
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                f"/api/v1/titles/{first.pk}/reviews/{review.pk}/comments/",
+                data={"text": "Комментарий"},
+            )
+        assert response.status_code == HTTPStatus.CREATED, response.json()
+        assert len(table_queries(context, "reviews_review")) == 1, (
+            "Проверьте, что отзыв и его принадлежность произведению "
+            "проверяются одним запросом."
+        )
+
+    def test_03_duplicate_review(self, admin_client, titles):
+        from reviews.models import Review, Title
+
+        first, _, _ = titles
+        response = admin_client.post(
+            f"/api/v1/titles/{first.pk}/reviews/",
+            data={"text": "Ещё отзыв", "score": 1},
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            "Проверьте, что повторный отзыв автора на произведение "
+            "возвращает статус 400."
+        )
+        assert "non_field_errors" in response.json()
+        assert Review.objects.filter(title=first).count() == 1
+        title = Title.objects.get(pk=first.pk)
+        assert (title.rating_count, title.rating_sum) == (1, 7), (
+            "Проверьте, что отклонённый отзыв не меняет рейтинг произведения."
+        )
+
+    @pytest.mark.parametrize("kind, index", (
+        ("reviews", "review_title_pub_date_idx"),
+        ("comments", "comment_review_pub_date_idx"),
+    ))
+    def test_04_list_index_order(self, user_client, django_user_model,
+                                 titles, monkeypatch, kind, index):
+        from api.pagination import KeysetPagination
+        from reviews.models import Comment, Review
+
+        first, _, review = titles
+        reader = django_user_model.objects.create_user(
+            username="reader", email="reader@yamdb.fake"
+        )
+        Review.objects.create(title=first, author=reader, text="Ещё",
+                              score=3)
+        for text in ("Первый", "Второй"):
+            Comment.objects.create(review=review, author=reader, text=text)
+        monkeypatch.setattr(KeysetPagination, "page_size", 1)
+
+        url = f"/api/v1/titles/{first.pk}/reviews/"
+        if kind == "comments":
+            url = f"{url}{review.pk}/comments/"
+        following = user_client.get(f"{url}?pagination=cursor").json()["next"]
+        assert following, "Проверьте, что у первой страницы есть `next`."
+        for page in (url, f"{url}?pagination=cursor", following):
+            plan = page_query_plan(user_client, page)
+            assert not any("TEMP B-TREE" in step for step in plan), (
+                f"Проверьте, что страница `{page}` не сортируется во "
+                f"временном B-дереве: {plan}"
+            )
+            assert any(f"INDEX {index}" in step for step in plan), (
+                f"Проверьте, что страница `{page}` читается по индексу "
+                f"{index}: {plan}"
+            )
@@ -0,0 +1,103 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import CommandError, call_command
+
+
+@pytest.fixture
+def reviews(admin, moderator, user):
+    from reviews.models import Category, Comment, Review, Title
+
+    category = Category.objects.create(name="Книги", slug="books")
+    title = Title.objects.create(name="Произведение", year=2000,
+                                 category=category)
+    first = Review.objects.create(title=title, author=admin, text="Отзыв",
+                                  score=8)
+    second = Review.objects.create(title=title, author=user, text="Отзыв",
+                                   score=4)
+    for author in (moderator, user, user):
+        Comment.objects.create(review=first, author=author, text="Текст")
+    Comment.objects.create(review=second, author=moderator, text="Текст")
+    return title, first, second
+
+
+def counters(title, *reviews):
+    from reviews.models import Review, Title
+
+    return (
+        Title.objects.get(pk=title.pk).rating_count,
+        [Review.objects.get(pk=review.pk).comments_count
+         for review in reviews],
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class Test29StoredCounters:
+    def test_01_api_fields(self, user_client, reviews):
+        title, first, _ = reviews
+        response = user_client.get(f"/api/v1/titles/{title.pk}/")
+        assert response.json()["reviews_count"] == 2, (
+            "Проверьте, что произведение возвращает количество отзывов в "
+            "поле `reviews_count`."
+        )
+        response = user_client.get(
+            f"/api/v1/titles/{title.pk}/reviews/{first.pk}/"
+        )
+        assert response.json()["comments_count"] == 3, (
+            "Проверьте, что отзыв возвращает количество комментариев в "
+            "поле `comments_count`."
+        )
+
+        url = f"/api/v1/titles/{title.pk}/reviews/{first.pk}/comments/"
+        comment_id = user_client.post(url, data={"text": "Ещё"}).json()["id"]
+        response = user_client.get(f"/api/v1/titles/{title.pk}/reviews/")
+        assert response.json()["results"][0]["comments_count"] == 4, (
+            "Проверьте, что новый комментарий сразу виден в счётчике "
+            "отзыва, в том числе в закэшированном списке."
+        )
+        response = user_client.delete(f"{url}{comment_id}/")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert counters(title, first) == (2, [3])
+
+    def test_02_cascades(self, user, moderator, reviews):
+        title, first, second = reviews
+        user.delete()
+        assert counters(title, first) == (1, [1]), (
+            "Проверьте, что удаление пользователя вычитает его отзывы и "
+            "комментарии из счётчиков."
+        )
+        moderator.delete()
+        assert counters(title, first) == (1, [0])
+
+    def test_03_stale_instance_save(self, moderator, reviews):
+        from reviews.models import Comment, Review, Title
+
+        title, first, second = reviews
+        stale_title = Title.objects.get(pk=title.pk)
+        stale_review = Review.objects.get(pk=first.pk)
+        Comment.objects.create(review=first, author=moderator, text="Текст")
+        second.delete()
+
+        stale_title.name = "Новое название"
+        stale_title.save()
+        stale_review.text = "Новый текст"
+        stale_review.save()
+        assert counters(title, stale_review) == (1, [4]), (
+            "Проверьте, что сохранение объекта, загруженного до изменения "
+            "счётчиков, не перезаписывает их."
+        )
+
+    def test_04_rebuild_command(self, reviews):
+        from reviews.models import Review, Title
+
+        title, first, second = reviews
+        Review.objects.filter(pk=first.pk).update(comments_count=0)
+        Title.objects.filter(pk=title.pk).update(rating_count=7)
+        with pytest.raises(CommandError):
+            call_command("rebuild_aggregates", "--check")
+        call_command("rebuild_aggregates")
+        call_command("rebuild_aggregates", "--check")
+        assert counters(title, first, second) == (2, [3, 1]), (
+            "Проверьте, что `rebuild_aggregates` пересчитывает количество "
+            "отзывов и комментариев."
+        )
@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture(params=(True, False), ids=("sqlite-3.35", "sqlite-3.23"))
+def backends(request, tmp_path, monkeypatch):
+    """
+    Два подключения к одному файлу; без RETURNING и UPSERT - как на
+    SQLite старше 3.24.
+    """
+    from api_yamdb.sqlite import cache
+    from api_yamdb.sqlite.cache import SQLiteCache
+
+    if not request.param:
+        monkeypatch.setattr(cache, "HAS_RETURNING", False)
+        monkeypatch.setattr(cache, "HAS_UPSERT", False)
+    location = tmp_path / "cache.sqlite3"
+    params = {"OPTIONS": {"MAX_ENTRIES": 10000}}
+    return (SQLiteCache(location, params), SQLiteCache(location, params))
+
+
+class Test30SQLiteCache:
+    def test_01_values_and_expiry(self, backends):
+        first, second = backends
+        first.set_many({"version": 5, "time": 1.5, "flag": True,
+                        "data": {"a": [1]}})
+        assert second.get_many(["version", "time", "flag", "data",
+                                "missing"]) == {
+            "version": 5, "time": 1.5, "flag": True, "data": {"a": [1]},
+        }, "Проверьте, что значения кэша видны другому подключению."
+        assert second.get("flag") is True
+
+        assert not first.add("version", 7)
+        first.set("short", 1, timeout=0)
+        assert first.get("short") is None
+        assert first.add("short", 2), (
+            "Проверьте, что `add` заменяет запись с истёкшим сроком."
+        )
+        assert second.get("short") == 2
+        second.delete("short")
+        assert not first.has_key("short")
+        with pytest.raises(ValueError):
+            first.incr("short")
+
+    def test_02_concurrent_incr(self, backends):
+        first, second = backends
+        first.set("version", 0, timeout=None)
+
+        def bump(backend):
+            for _ in range(100):
+                backend.incr("version")
+
+        threads = [threading.Thread(target=bump, args=(backend,))
+                   for backend in (first, second) * 2]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert first.get("version") == 400, (
+            "Проверьте, что параллельные `incr` не теряют повышения."
+        )
+
+    def test_03_concurrent_writers(self, backends, monkeypatch):
+        from api_yamdb.sqlite.cache import CULL_EVERY, SQLiteCache
+
+        first, second = backends
+        culls = []
+        cull = SQLiteCache._cull
+
+        def counting_cull(backend):
+            culls.append(backend)
+            cull(backend)
+
+        monkeypatch.setattr(SQLiteCache, "_cull", counting_cull)
+        errors = []
+
+        def write(backend, prefix):
+            try:
+                for number in range(CULL_EVERY):
+                    backend.set(f"{prefix}-{number}", number, timeout=None)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [
+            threading.Thread(target=write, args=(backend, f"{name}-{index}"))
+            for index in range(4)
+            for name, backend in (("first", first), ("second", second))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, errors
+        assert culls.count(first) == culls.count(second) == 4, (
+            "Проверьте, что параллельные записи через одно подключение "
+            "запускают очистку ровно раз в `CULL_EVERY` записей."
+        )
+        assert first.get_many(
+            [f"second-0-{number}" for number in range(CULL_EVERY)]
+        ) == {
+            f"second-0-{number}": number for number in range(CULL_EVERY)
+        }, "Проверьте, что параллельные записи не теряются."
@@ -1,5 +1,9 @@
+import re
 from http import HTTPStatus
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 check_name_and_slug_patterns = (
     (
         {"name": "a" * 256 + "simbols", "slug": "longname"},
@@ -291,3 +295,49 @@ def check_fields(obj_type, url_pattern, obj, expected_data, detail=False):
         f"данные {obj_types[obj_type]}{results_in_msg}. Поле `id` не "
         "найдено или не является целым числом."
     )
+
+
+def check_query_budget(client, url, budget, method="get", data=None,
+                       status=HTTPStatus.OK, warm_up=None):
+    """
+    Запрос `method` к `url` укладывается в `budget` SQL-запросов. Первый
+    GET-запрос к `warm_up` (для GET - к самому `url`) заполняет
+    справочники в памяти процесса и не считается.
+    """
+    client.get(warm_up or url)
+    body = {} if method == "get" else {"data": data, "format": "json"}
+    with CaptureQueriesContext(connection) as context:
+        response = getattr(client, method)(url, **body)
+    assert response.status_code == status, (
+        f"{method.upper()}-запрос к `{url}` вернул статус "
+        f"{response.status_code} вместо {status}: {response.data}"
+    )
+    queries = [query["sql"] for query in context.captured_queries]
+    assert len(queries) <= budget, (
+        f"{method.upper()}-запрос к `{url}` выполнил {len(queries)} "
+        f"SQL-запросов при бюджете {budget}:\n" + "\n".join(queries)
+    )
+    return len(queries)
+
+
+def page_query_plan(client, url):
+    """
+    План SQLite (EXPLAIN QUERY PLAN) для запросов страницы списка,
+    выполненных GET-запросом к `url`: шаги всех запросов подряд.
+    """
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == HTTPStatus.OK, (
+        f"GET-запрос к `{url}` вернул статус {response.status_code}."
+    )
+    pages = [
+        query["sql"] for query in context.captured_queries
+        if re.search(r"ORDER BY .* LIMIT \d+( OFFSET \d+)?$", query["sql"])
+    ]
+    assert pages, f"GET-запрос к `{url}` не выбрал страницу списка."
+    plan = []
+    with connection.cursor() as cursor:
+        for page in pages:
+            cursor.execute(f"EXPLAIN QUERY PLAN {page}")
+            plan += [row[-1] for row in cursor.fetchall()]
+    return plan